@@ -5,9 +5,12 @@
 """
 
 import sys
+import argparse
+import hashlib
+import threading
 import logging
 import yaml
-import time
+from typing import Optional
 from pathlib import Path
 from datetime import datetime
 from selenium.webdriver.common.by import By
@@ -23,6 +26,18 @@ from data_reader import DataReader
 from form_filler import FormFiller
 from result_exporter import ResultExporter
 from login_handler import LoginHandler
+from dict_cache import DictCache
+from session_bridge import SessionBridge
+from dict_index import DictIndex, DICT_TABLES, snapshot_dict_table
+from dict_client import DictClient
+from worker_pool import WorkerPool
+from driver_watchdog import DriverWatchdog
+from row_journal import RowJournal
+from fill_plan import FillPlan, PlanError
+from unit_registry import UnitRegistry
+from page_waiter import PageWaiter
+from page_agent import PageAgent
+from direct_submitter import DirectSubmitter
 from gui import show_config_gui, show_confirmation_dialog
 
 
@@ -53,7 +68,8 @@ def load_config(config_path: str = "config/config.yaml") -> dict:
         return yaml.safe_load(f)
 
 
-def handle_confirmation(driver, confirmation_config: dict, timeout: int = 30) -> None:
+def handle_confirmation(driver, confirmation_config: dict, timeout: int = 30,
+                        page_waiter: PageWaiter = None) -> None:
     """
     处理登录后的确认提示（如弹窗、对话框等）
 
@@ -61,6 +77,7 @@ def handle_confirmation(driver, confirmation_config: dict, timeout: int = 30) ->
         driver: WebDriver 实例
         confirmation_config: 确认提示配置
         timeout: 超时时间（秒）
+        page_waiter: 页面等待器（可选）
     """
     logger = logging.getLogger(__name__)
 
@@ -78,20 +95,16 @@ def handle_confirmation(driver, confirmation_config: dict, timeout: int = 30) ->
     try:
         confirmation_type = confirmation_config.get("type", "element")
         wait_time = confirmation_config.get("wait_time", 2)
+        waiter = page_waiter or PageWaiter(driver, timeout)
 
         logger.info("等待确认提示出现...")
-        time.sleep(wait_time)
 
         if confirmation_type == "alert":
-            # 处理浏览器原生 alert 弹窗
+            # 处理浏览器原生 alert 弹窗（wait_time 为等待弹窗出现的最长时间）
             try:
-                alert = driver.switch_to.alert
-                alert_text = alert.text
-                logger.info(f"检测到 Alert 弹窗: {alert_text}")
-                alert.accept()  # 点击确认
-                logger.info("已点击 Alert 确认按钮")
+                waiter.accept_alert(timeout=wait_time)
             except Exception as e:
-                logger.debug(f"未检测到 Alert 弹窗: {e}")
+                logger.debug(f"处理 Alert 弹窗失败: {e}")
 
         elif confirmation_type == "element":
             # 处理页面元素类型的确认按钮
@@ -121,11 +134,13 @@ def handle_confirmation(driver, confirmation_config: dict, timeout: int = 30) ->
                 )
                 logger.debug("确认按钮已可见")
 
-                # 直接使用 JavaScript 点击（避免元素遮挡问题）
+                # 通过页面代理点击（避免元素遮挡问题）
                 logger.info("使用 JavaScript 点击确认按钮...")
-                driver.execute_script("arguments[0].click();", confirm_button)
+                if not PageAgent(driver).click("确认按钮", button_config):
+                    raise Exception("页面代理点击确认按钮失败")
                 logger.info("已点击确认按钮")
-                time.sleep(1)  # 等待确认完成
+                waiter.gone(confirm_button, timeout=wait_time)  # 等待确认提示关闭
+                waiter.settled()
 
             except TimeoutException:
                 logger.warning(f"超时：未找到确认按钮 (定位器: {locator_type}={locator_value})")
@@ -145,7 +160,8 @@ def handle_confirmation(driver, confirmation_config: dict, timeout: int = 30) ->
                                 logger.info(f"尝试点击第 {i+1} 个元素...")
                                 driver.execute_script("arguments[0].click();", elem)
                                 logger.info(f"成功点击第 {i+1} 个元素")
-                                time.sleep(1)
+                                waiter.gone(elem, timeout=wait_time)
+                                waiter.settled()
                                 break
                         except Exception as elem_error:
                             logger.debug(f"点击第 {i+1} 个元素失败: {elem_error}")
@@ -161,7 +177,7 @@ def handle_confirmation(driver, confirmation_config: dict, timeout: int = 30) ->
         # 不抛出异常，允许程序继续执行
 
 
-def select_month(driver, month_config: dict, timeout: int = 30) -> None:
+def select_month(driver, month_config: dict, timeout: int = 30, page_waiter: PageWaiter = None) -> None:
     """
     选择上报月份
 
@@ -169,6 +185,7 @@ def select_month(driver, month_config: dict, timeout: int = 30) -> None:
         driver: WebDriver 实例
         month_config: 月份选择配置
         timeout: 超时时间（秒）
+        page_waiter: 页面等待器（可选）
     """
     logger = logging.getLogger(__name__)
 
@@ -206,23 +223,22 @@ def select_month(driver, month_config: dict, timeout: int = 30) -> None:
 
         by = LOCATOR_MAP.get(locator_type, By.ID)
         wait = WebDriverWait(driver, timeout)
+        waiter = page_waiter or PageWaiter(driver, timeout)
+
+        agent = PageAgent(driver)
 
         # 查找月份输入框
         logger.info(f"查找月份输入框: {locator_type}={locator_value}")
-        month_input = wait.until(
+        wait.until(
             EC.presence_of_element_located((by, locator_value))
         )
         logger.debug("月份输入框已找到")
 
-        # 使用 JavaScript 设置值（因为是 readonly 的 input）
+        # 通过页面代理设置值并触发 input/change 事件（因为是 readonly 的 input）
         logger.info(f"设置月份为: {target_month}")
-        driver.execute_script(
-            "arguments[0].value = arguments[1]; arguments[0].dispatchEvent(new Event('input')); arguments[0].dispatchEvent(new Event('change'));",
-            month_input,
-            target_month
-        )
-
-        time.sleep(0.5)  # 等待值设置完成
+        error = agent.fill([PageAgent.field("月份", target_month, element_config)]).get("月份")
+        if error:
+            raise Exception(f"设置月份失败: {error}")
         logger.info("月份值设置完成")
 
         # 点击确认按钮
@@ -236,25 +252,21 @@ def select_month(driver, month_config: dict, timeout: int = 30) -> None:
                 logger.info(f"查找月份确认按钮: {button_locator_type}={button_locator_value}")
 
                 try:
-                    confirm_button = wait.until(
+                    wait.until(
                         EC.presence_of_element_located((button_by, button_locator_value))
                     )
                     logger.debug("确认按钮已找到")
 
-                    # 使用 JavaScript 点击（避免元素遮挡问题）
-                    driver.execute_script("arguments[0].click();", confirm_button)
+                    # 通过页面代理点击（避免元素遮挡问题）
+                    if not agent.click("月份确认按钮", {"locator": button_locator_type, "value": button_locator_value}):
+                        raise Exception("页面代理点击失败")
                     logger.info("已点击月份确认按钮")
-                    time.sleep(1)  # 等待 alert 弹窗出现
 
                     # 处理 alert 弹窗
                     try:
                         logger.info("等待 Alert 弹窗...")
-                        alert = driver.switch_to.alert
-                        alert_text = alert.text
-                        logger.info(f"检测到 Alert 弹窗: {alert_text}")
-                        alert.accept()  # 点击确认
-                        logger.info("已点击 Alert 确认按钮")
-                        time.sleep(0.5)  # 等待 alert 关闭
+                        waiter.accept_alert()
+                        waiter.settled()
                     except Exception as alert_error:
                         logger.debug(f"未检测到 Alert 弹窗或处理失败: {alert_error}")
 
@@ -276,7 +288,7 @@ def select_month(driver, month_config: dict, timeout: int = 30) -> None:
         # 不抛出异常，允许程序继续执行
 
 
-def click_entry_button(driver, entry_button_config: dict, timeout: int = 30) -> None:
+def click_entry_button(driver, entry_button_config: dict, timeout: int = 30, page_waiter: PageWaiter = None) -> None:
     """
     点击录入按钮
 
@@ -284,6 +296,7 @@ def click_entry_button(driver, entry_button_config: dict, timeout: int = 30) ->
         driver: WebDriver 实例
         entry_button_config: 录入按钮配置
         timeout: 超时时间（秒）
+        page_waiter: 页面等待器（可选）
     """
     logger = logging.getLogger(__name__)
 
@@ -298,9 +311,8 @@ def click_entry_button(driver, entry_button_config: dict, timeout: int = 30) ->
     }
 
     try:
-        wait_time = entry_button_config.get("wait_time", 2)
-        logger.info(f"等待录入按钮出现（{wait_time}秒）...")
-        time.sleep(wait_time)
+        waiter = page_waiter or PageWaiter(driver, timeout)
+        logger.info("等待录入按钮出现...")
 
         # 获取按钮定位信息
         locator_type = entry_button_config.get("locator", "xpath")
@@ -315,7 +327,7 @@ def click_entry_button(driver, entry_button_config: dict, timeout: int = 30) ->
 
         # 查找录入按钮
         logger.info(f"查找录入按钮: {locator_type}={locator_value}")
-        entry_button = wait.until(
+        wait.until(
             EC.presence_of_element_located((by, locator_value))
         )
         logger.debug("录入按钮已找到")
@@ -326,11 +338,12 @@ def click_entry_button(driver, entry_button_config: dict, timeout: int = 30) ->
         )
         logger.debug("录入按钮已可见")
 
-        # 使用 JavaScript 点击（避免元素遮挡问题）
+        # 通过页面代理点击（避免元素遮挡问题）
         logger.info("点击录入按钮...")
-        driver.execute_script("arguments[0].click();", entry_button)
+        if not PageAgent(driver).click("录入按钮", {"locator": locator_type, "value": locator_value}):
+            raise Exception("页面代理点击录入按钮失败")
         logger.info("已点击录入按钮")
-        time.sleep(1)  # 等待页面响应
+        waiter.settled()  # 等待页面响应
 
     except TimeoutException:
         logger.error(f"超时：找不到录入按钮 (定位器: {locator_type}={locator_value})")
@@ -339,7 +352,7 @@ def click_entry_button(driver, entry_button_config: dict, timeout: int = 30) ->
         # 不抛出异常，允许程序继续执行
 
 
-def click_function_button(driver, function_button_config: dict, timeout: int = 30) -> None:
+def click_function_button(driver, function_button_config: dict, timeout: int = 30, page_waiter: PageWaiter = None) -> None:
     """
     点击具体功能按钮（门诊/急诊）
 
@@ -347,6 +360,7 @@ def click_function_button(driver, function_button_config: dict, timeout: int = 3
         driver: WebDriver 实例
         function_button_config: 功能按钮配置
         timeout: 超时时间（秒）
+        page_waiter: 页面等待器（可选）
     """
     logger = logging.getLogger(__name__)
 
@@ -361,9 +375,8 @@ def click_function_button(driver, function_button_config: dict, timeout: int = 3
     }
 
     try:
-        wait_time = function_button_config.get("wait_time", 2)
-        logger.info(f"等待功能按钮出现（{wait_time}秒）...")
-        time.sleep(wait_time)
+        waiter = page_waiter or PageWaiter(driver, timeout)
+        logger.info("等待功能按钮出现...")
 
         # 获取功能类型
         function_type = function_button_config.get("type", "outpatient")
@@ -388,7 +401,7 @@ def click_function_button(driver, function_button_config: dict, timeout: int = 3
 
         # 查找功能按钮
         logger.info(f"查找功能按钮: {locator_type}={locator_value}")
-        function_button = wait.until(
+        wait.until(
             EC.presence_of_element_located((by, locator_value))
         )
         logger.debug("功能按钮已找到")
@@ -399,11 +412,12 @@ def click_function_button(driver, function_button_config: dict, timeout: int = 3
         )
         logger.debug("功能按钮已可见")
 
-        # 使用 JavaScript 点击（避免元素遮挡问题）
+        # 通过页面代理点击（避免元素遮挡问题）
         logger.info(f"点击功能按钮 ({function_type})...")
-        driver.execute_script("arguments[0].click();", function_button)
+        if not PageAgent(driver).click("功能按钮", {"locator": locator_type, "value": locator_value}):
+            raise Exception("页面代理点击功能按钮失败")
         logger.info(f"已点击功能按钮 ({function_type})")
-        time.sleep(1)  # 等待页面响应
+        waiter.settled()  # 等待页面响应
 
     except TimeoutException:
         logger.error(f"超时：找不到功能按钮 (定位器: {locator_type}={locator_value})")
@@ -412,56 +426,554 @@ def click_function_button(driver, function_button_config: dict, timeout: int = 3
         # 不抛出异常，允许程序继续执行
 
 
-def main():
-    """主函数"""
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="自动化表单填写程序")
+    parser.add_argument(
+        "--clear-dict-cache",
+        choices=["diag", "drug", "all"],
+        help="清除字典查询缓存（diag=诊断, drug=药品, all=全部）后退出"
+    )
+    parser.add_argument(
+        "--snapshot-dict",
+        action="store_true",
+        help="登录后抓取诊断/药品字典并生成本地索引，完成后退出"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="并行处理的浏览器数量（覆盖配置文件 worker_pool.workers）"
+    )
+    parser.add_argument(
+        "--measure-page-load",
+        action="store_true",
+        help="分别以普通模式和精简模式打开页面，对比页面加载耗时后退出"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="根据进度日志跳过上次运行已完成的行，继续处理剩余数据"
+    )
+    return parser.parse_args(argv)
+
+
+def create_dict_cache(cache_config: dict):
+    """
+    根据配置创建字典查询缓存
+
+    Args:
+        cache_config: 字典缓存配置
+
+    Returns:
+        DictCache 实例，未启用或创建失败时返回 None
+    """
     logger = logging.getLogger(__name__)
 
+    if not cache_config.get("enabled", True):
+        logger.info("字典缓存未启用")
+        return None
+
     try:
-        # 加载配置
-        logger.info("=" * 60)
-        logger.info("自动化表单填写程序启动")
-        logger.info("=" * 60)
+        return DictCache(
+            db_path=cache_config.get("path", "cache/dict_cache.sqlite3"),
+            ttl=cache_config.get("ttl_days", 30) * 86400,
+            max_entries=cache_config.get("max_entries", 20000),
+            negative_ttl=cache_config.get("negative_ttl_hours", 24) * 3600
+        )
+    except Exception as e:
+        logger.warning(f"创建字典缓存失败，将直接查询接口: {e}")
+        return None
 
-        config = load_config()
-        setup_logging(config)
 
-        # 显示GUI收集用户输入
-        logger.info("显示配置界面...")
-        user_config = show_config_gui()
+def create_row_journal(journal_config: dict, function_type: str):
+    """
+    根据配置创建处理进度日志
 
-        if user_config is None:
-            logger.info("用户取消操作，程序退出")
-            return
+    Args:
+        journal_config: 进度日志配置
+        function_type: 功能类型（每种功能使用单独的日志文件）
 
-        # 使用GUI配置覆盖config中的值
-        config['login']['username'] = user_config['username']
-        config['login']['password'] = user_config['password']
-        config['month_selection']['month'] = user_config['month']
-        config['function_button']['type'] = user_config['function_type']
-        config['browser']['headless'] = user_config['headless']
+    Returns:
+        RowJournal 实例，未启用时返回 None
+    """
+    logger = logging.getLogger(__name__)
 
-        # 更新对应功能的数据文件路径
-        function_type = user_config['function_type']
-        config['functions'][function_type]['data']['input_file'] = user_config['input_file']
+    if not journal_config.get("enabled", True):
+        logger.info("处理进度日志未启用")
+        return None
 
-        logger.info(f"用户配置: 功能类型={function_type}, 月份={user_config['month']}, 文件={user_config['input_file']}")
-        logger.info("=" * 60)
+    journal_dir = Path(journal_config.get("dir", "cache/journal"))
+    return RowJournal(str(journal_dir / f"{function_type}.jsonl"))
 
-        # 初始化组件
-        logger.info("初始化组件...")
 
-        # 1. 浏览器驱动管理器
-        browser_config = config.get("browser", {})
-        driver_manager = DriverManager(
-            headless=browser_config.get("headless", False),
-            window_size=browser_config.get("window_size", "1920,1080")
+def create_dict_index(index_config: dict):
+    """
+    根据配置创建本地字典索引
+
+    Args:
+        index_config: 本地字典索引配置
+
+    Returns:
+        DictIndex 实例，未启用时返回 None
+    """
+    if not index_config.get("enabled", True):
+        return None
+
+    return DictIndex(
+        index_dir=index_config.get("dir", "cache/dict_index"),
+        limit=index_config.get("limit", 50)
+    )
+
+
+def create_unit_registry(mapping_config: dict) -> UnitRegistry:
+    """
+    根据配置创建详情页下拉框映射，并与页面 HTML 中的选项核对
+
+    Args:
+        mapping_config: unit_mapping 配置
+
+    Returns:
+        UnitRegistry 实例
+
+    Raises:
+        ValueError: 映射与页面选项不一致
+    """
+    logger = logging.getLogger(__name__)
+    registry = UnitRegistry(mapping_config)
+    if not registry.field_groups:
+        logger.warning("未配置 unit_mapping，抗菌药详情页的单位、途径和频率将不会填写")
+
+    html_file = mapping_config.get("html_file")
+    if html_file and Path(html_file).exists():
+        problems = registry.validate_html(html_file)
+        if problems:
+            raise ValueError("unit_mapping 与页面选项不一致:\n" + "\n".join(problems))
+        logger.info(f"单位映射已与页面选项核对: {html_file}")
+    elif html_file:
+        logger.warning(f"页面文件不存在，跳过单位映射核对: {html_file}")
+    return registry
+
+
+def create_dict_client(session_bridge: SessionBridge, client_config: dict) -> DictClient:
+    """
+    根据配置创建字典查询客户端
+
+    Args:
+        session_bridge: 已同步 Cookie 的会话桥
+        client_config: 字典查询客户端配置
+
+    Returns:
+        DictClient 实例
+    """
+    return DictClient(
+        session_bridge,
+        timeout=client_config.get("timeout", 10),
+        max_concurrency=client_config.get("max_concurrency", 4),
+        max_retries=client_config.get("max_retries", 3),
+        backoff_base=client_config.get("backoff_base", 0.5),
+        backoff_max=client_config.get("backoff_max", 8.0)
+    )
+
+
+def create_direct_submitter(session_bridge: SessionBridge, submit_config: dict):
+    """
+    根据配置创建表单直接提交器
+
+    Args:
+        session_bridge: 已同步 Cookie 的会话桥
+        submit_config: 直接提交配置
+
+    Returns:
+        DirectSubmitter 实例，未启用或未配置接口地址时返回 None
+    """
+    logger = logging.getLogger(__name__)
+
+    if not submit_config.get("enabled", False):
+        return None
+    if not submit_config.get("url"):
+        logger.warning("已启用直接提交但未配置接口地址，使用浏览器填写")
+        return None
+
+    return DirectSubmitter(
+        session_bridge,
+        url=submit_config["url"],
+        timeout=submit_config.get("timeout", 10),
+        extra_fields=submit_config.get("extra_fields"),
+        success_pattern=submit_config.get("success_pattern"),
+        failure_pattern=submit_config.get("failure_pattern")
+    )
+
+
+def create_page_waiter(driver, browser_config: dict) -> PageWaiter:
+    """
+    根据浏览器配置创建页面等待器
+
+    Args:
+        driver: WebDriver 实例
+        browser_config: 浏览器配置
+
+    Returns:
+        PageWaiter 实例
+    """
+    wait_config = browser_config.get("wait", {})
+    return PageWaiter(
+        driver,
+        timeout=browser_config.get("timeout", 30),
+        poll_interval=wait_config.get("poll_interval", 0.1),
+        alert_timeout=wait_config.get("alert_timeout", 3),
+        settle_timeout=wait_config.get("settle_timeout", 10),
+        min_pacing=wait_config.get("min_pacing", 0.3),
+        dom_ready=browser_config.get("page_load_strategy", "normal") != "normal",
+        network_idle=wait_config.get("network_idle", False),
+        network_quiet=wait_config.get("network_quiet", 0.2)
+    )
+
+
+def run_dict_snapshot(config: dict) -> None:
+    """
+    登录后按拼音首字母遍历字典接口，生成诊断/药品的本地索引
+
+    Args:
+        config: 完整配置
+    """
+    logger = logging.getLogger(__name__)
+
+    browser_config = config.get("browser", {})
+    login_config = config.get("login", {})
+    index_config = config.get("dict_index", {})
+    snapshot_config = index_config.get("snapshot", {})
+
+    driver_manager = create_driver_manager(
+        browser_config, login_config.get("session", {}), username=login_config.get("username")
+    )
+
+    try:
+        driver = driver_manager.create_driver()
+        page_waiter = create_page_waiter(driver, browser_config)
+
+        login_handler = LoginHandler(
+            driver=driver,
+            login_config=login_config,
+            timeout=browser_config.get("timeout", 30),
+            page_waiter=page_waiter,
+            user_data_dir=driver_manager.user_data_dir
         )
+        if not login_handler.login():
+            raise Exception("登录失败，无法生成字典快照")
+
+        session_bridge = SessionBridge(driver, login_url=login_config.get("login_url"))
+        session_bridge.sync()
+
+        dict_client = create_dict_client(session_bridge, config.get("dict_client", {}))
+        form_filler = FormFiller(
+            driver=driver,
+            form_elements={},
+            timeout=browser_config.get("timeout", 30),
+            session_bridge=session_bridge,
+            dict_client=dict_client,
+            page_waiter=page_waiter
+        )
+
+        for dict_table in DICT_TABLES:
+            logger.info(f"开始抓取字典: {dict_table}")
+            records = snapshot_dict_table(
+                lambda keyword, table=dict_table: form_filler.query_dict(table, keyword, use_index=False),
+                dict_table,
+                result_limit=snapshot_config.get("result_limit", 100),
+                max_prefix_length=snapshot_config.get("max_prefix_length", 3),
+                interval=snapshot_config.get("interval", 0.1)
+            )
+            DictIndex.build(index_config.get("dir", "cache/dict_index"), dict_table, records)
+
+        logger.info("字典快照生成完成")
+
+    finally:
+        if 'dict_client' in locals():
+            dict_client.close()
+        driver_manager.quit_driver()
+
+
+def create_form_filler(driver, page_waiter: PageWaiter, session_bridge: SessionBridge, config: dict,
+                       function_config: dict, dict_cache, dict_index, dict_client: DictClient,
+                       record_lock=None, unit_registry: UnitRegistry = None, prefetched: dict = None) -> FormFiller:
+    """
+    为一个浏览器会话创建表单填写器
+
+    Args:
+        driver: WebDriver 实例
+        page_waiter: 页面等待器
+        session_bridge: 该浏览器会话的 Cookie 同步桥（用于直接提交）
+        config: 完整配置
+        function_config: 当前功能（门诊/急诊）的配置
+        dict_cache: 字典查询缓存（各会话共用）
+        dict_index: 本地字典索引（各会话共用）
+        dict_client: 字典查询客户端（各会话共用）
+        record_lock: 提交到识别新增记录之间的互斥锁（多浏览器并行时使用）
+        unit_registry: 详情页下拉框映射（各会话共用）
+        prefetched: 字典预取结果存储（各会话共用）
+
+    Returns:
+        FormFiller 实例
+    """
+    browser_config = config.get("browser", {})
+    return FormFiller(
+        driver=driver,
+        form_elements=function_config.get("form_elements", {}),
+        timeout=browser_config.get("timeout", 30),
+        antibiotic_config=function_config.get("antibiotic_handling", {}),
+        dict_cache=dict_cache,
+        session_bridge=session_bridge,
+        dict_index=dict_index,
+        dict_client=dict_client,
+        page_waiter=page_waiter,
+        direct_submitter=create_direct_submitter(session_bridge, function_config.get("direct_submit", {})),
+        detail_submitter=create_direct_submitter(
+            session_bridge,
+            function_config.get("antibiotic_detail", {}).get("direct_save", {})
+        ),
+        record_lock=record_lock,
+        unit_registry=unit_registry,
+        prefetched=prefetched
+    )
+
+
+def process_row(form_filler: FormFiller, exporter: ResultExporter, index: int, total_count: Optional[int],
+                row_data: dict, plan: FillPlan, journal: RowJournal = None, fingerprint: str = None) -> dict:
+    """
+    填写并提交一行数据，处理新增记录的抗菌药信息
+
+    Args:
+        form_filler: 表单填写器
+        exporter: 结果导出器（用于生成结果条目）
+        index: 行号（从 1 开始）
+        total_count: 总行数（逐行读取时为预估值，未知时为 None）
+        row_data: 行数据（用于生成结果条目）
+        plan: 该行的填写计划
+        journal: 处理进度日志（可选），提交前和处理完成后各记录一次；
+            已发出提交后失败的行仍记为"提交中"，--resume 时提示人工核对而不是重新提交
+        fingerprint: 行指纹（使用进度日志时必填）
+
+    Returns:
+        结果条目
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"\n处理第 {index}/{total_count or '?'} 条数据...")
+
+    result = None
+    try:
+        if journal:
+            journal.record(fingerprint, index, RowJournal.STATUS_STARTED)
+
+        # 填写表单（包含提交）
+        fill_success = form_filler.fill_form(plan)
 
+        if not fill_success:
+            raise Exception("表单填写或提交失败")
+        else:
+            # 表单填写成功之后，还需要对新增的记录录入一些信息
+            logger.info("开始处理抗菌药信息...")
+            antibiotic_success = form_filler.handle_antibiotic_info(plan)
+
+            if not antibiotic_success:
+                logger.warning("抗菌药信息处理失败，但继续执行")
+            else:
+                logger.info("抗菌药信息处理成功")
+
+        # 记录成功结果
+        result = exporter.create_result_entry(
+            row_data=row_data,
+            status="成功",
+            message="表单提交成功"
+        )
+        logger.info(f"第 {index} 条数据处理成功")
+
+    except Exception as e:
+        # 记录失败结果；已发出提交时服务器可能已保存，需要人工核对
+        logger.error(f"第 {index} 条数据处理失败: {e}")
+        message = str(e)
+        if form_filler.submit_started:
+            message = f"提交后失败，服务器可能已保存，请人工核对是否已录入: {e}"
+        result = exporter.create_result_entry(
+            row_data=row_data,
+            status="失败",
+            message=message
+        )
+
+    finally:
+        form_filler.release_record_lock()
+        if journal and result is not None:
+            status = result["处理状态"]
+            if status != "成功" and form_filler.submit_started:
+                status = RowJournal.STATUS_STARTED
+            journal.record(fingerprint, index, status, result["处理消息"])
+
+    # 保证最小提交间隔，避免提交太快
+    if result["处理状态"] == "成功":
+        form_filler.waiter.pace()
+    return result
+
+
+def create_watchdog(create_session, session=None, watchdog_config: dict = None, worker_id: int = 0) -> DriverWatchdog:
+    """
+    为一个工作会话创建浏览器看门狗
+
+    Args:
+        create_session: 创建 (DriverManager, FormFiller) 会话的函数（启动浏览器、登录并导航到录入页面）
+        session: 已创建的会话（可选）
+        watchdog_config: 看门狗配置
+        worker_id: 工作会话编号
+
+    Returns:
+        DriverWatchdog 实例（未启用时 max_restarts 为 0，只检查不重启）
+    """
+    watchdog_config = watchdog_config or {}
+    return DriverWatchdog(
+        create_session=create_session,
+        close_session=lambda session: session[0].quit_driver(),
+        driver_of=lambda session: session[0].driver,
+        session=session,
+        heartbeat_timeout=watchdog_config.get("heartbeat_timeout", 5),
+        max_restarts=watchdog_config.get("max_restarts", 3) if watchdog_config.get("enabled", True) else 0,
+        name=f"工作会话 {worker_id} "
+    )
+
+
+def create_driver_manager(browser_config: dict, session_config: dict, worker_id: int = 0,
+                          username: Optional[str] = None) -> DriverManager:
+    """
+    根据配置创建浏览器驱动管理器
+
+    Args:
+        browser_config: 浏览器配置
+        session_config: 登录会话保存配置（login.session）
+        worker_id: 工作会话编号，多个浏览器各自使用带编号的用户数据目录
+        username: 登录账号，每个账号使用各自的用户数据目录（为空时不使用用户数据目录）
+
+    Returns:
+        DriverManager 实例
+    """
+    user_data_dir = None
+    if session_config.get("enabled", False) and session_config.get("user_data_dir") and username:
+        # 目录中保留着登录状态，按账号区分，更换账号时不会沿用上一个账号的会话
+        account = hashlib.sha1(str(username).encode("utf-8")).hexdigest()[:12]
+        user_data_dir = str(Path(session_config["user_data_dir"]) / f"user_{account}")
+        if worker_id > 0:
+            user_data_dir = str(Path(user_data_dir) / f"worker{worker_id}")
+
+    lean_config = browser_config.get("lean", {})
+    return DriverManager(
+        headless=browser_config.get("headless", False),
+        window_size=browser_config.get("window_size", "1920,1080"),
+        user_data_dir=user_data_dir,
+        lean=lean_config.get("enabled", False),
+        blocked_urls=lean_config.get("blocked_urls"),
+        page_load_strategy=browser_config.get("page_load_strategy", "normal"),
+        performance_log=browser_config.get("wait", {}).get("network_idle", False),
+        driver_path=browser_config.get("driver_path") or None,
+        driver_cache=browser_config.get("driver_cache", "cache/driver_cache.json")
+    )
+
+
+def format_page_load(stats: dict) -> str:
+    """页面加载统计转换为日志文字"""
+    load_ms = stats.get("load_ms")
+    return (
+        f"加载 {load_ms:.0f} ms" if load_ms is not None else "加载未完成"
+    ) + f", 资源 {stats.get('resources', 0)} 个, 传输 {stats.get('transfer_kb', 0):.1f} KB"
+
+
+def run_page_load_benchmark(config: dict) -> None:
+    """
+    分别以普通模式和精简模式启动浏览器，多次打开登录页和登录后的页面，对比加载耗时
+
+    Args:
+        config: 完整配置
+    """
+    logger = logging.getLogger(__name__)
+
+    browser_config = config.get("browser", {})
+    lean_config = browser_config.get("lean", {})
+    login_config = config.get("login", {})
+    rounds = lean_config.get("measure_rounds", 3)
+    success_indicator = login_config.get("success_indicator", {})
+    measure_urls = lean_config.get("measure_urls") or (
+        [success_indicator["value"]] if success_indicator.get("type") == "url_contains" else []
+    )
+
+    medians = {}
+    for lean in (False, True):
+        mode = "精简模式" if lean else "普通模式"
+        # 固定使用 normal 策略：eager/none 下读取计时时 load 事件常未结束，慢页面的样本会被丢弃，中位数有偏
+        mode_config = dict(browser_config, page_load_strategy="normal", lean=dict(lean_config, enabled=lean))
+        driver_manager = create_driver_manager(mode_config, {})
+        try:
+            driver = driver_manager.create_driver()
+            page_waiter = create_page_waiter(driver, mode_config)
+            samples = []
+
+            def measure(url: str) -> None:
+                for _ in range(rounds):
+                    driver.get(url)
+                    page_waiter.settled()
+                    if not page_waiter.check(DriverManager.page_loaded):
+                        logger.warning(f"{mode} {url}: 等待页面加载完成超时")
+                    stats = DriverManager.page_load_stats(driver)
+                    logger.info(f"{mode} {url}: {format_page_load(stats)}")
+                    if stats.get("load_ms") is not None:
+                        samples.append(stats["load_ms"])
+
+            measure(login_config.get("login_url"))
+            if measure_urls:
+                login_handler = LoginHandler(
+                    driver=driver,
+                    login_config=dict(login_config, session={}),
+                    timeout=browser_config.get("timeout", 30),
+                    page_waiter=page_waiter
+                )
+                if login_handler.login():
+                    for url in measure_urls:
+                        measure(url)
+                else:
+                    logger.warning(f"{mode} 登录失败，只测量登录页")
+        finally:
+            driver_manager.quit_driver()
+
+        medians[mode] = sorted(samples)[len(samples) // 2] if samples else None
+
+    logger.info("=" * 60)
+    for mode, median in medians.items():
+        logger.info(f"{mode} 页面加载耗时中位数: {median:.0f} ms" if median is not None else f"{mode} 没有有效的测量结果")
+    normal, lean = medians["普通模式"], medians["精简模式"]
+    if normal and lean is not None:
+        logger.info(f"精简模式每次页面加载节省 {normal - lean:.0f} ms（{(normal - lean) / normal * 100:.1f}%）")
+
+
+def prepare_browser_session(config: dict, worker_id: int = 0):
+    """
+    启动浏览器并完成登录、确认提示、月份选择、录入按钮和功能按钮导航
+
+    Args:
+        config: 完整配置
+        worker_id: 工作会话编号（从 0 开始）
+
+    Returns:
+        (DriverManager, WebDriver, PageWaiter, SessionBridge)，失败时关闭浏览器并抛出异常
+    """
+    logger = logging.getLogger(__name__)
+
+    # 1. 浏览器驱动管理器
+    browser_config = config.get("browser", {})
+    login_config = config.get("login", {})
+    driver_manager = create_driver_manager(
+        browser_config, login_config.get("session", {}), worker_id, login_config.get("username")
+    )
+
+    try:
         # 2. 创建驱动
         driver = driver_manager.create_driver()
+        page_waiter = create_page_waiter(driver, browser_config)
 
-        # 3. 登录
-        login_config = config.get("login", {})
+        # 3. 登录（已保存的登录会话仍有效时跳过登录表单）
         logger.info("=" * 60)
         logger.info("开始登录流程")
         logger.info("=" * 60)
@@ -469,13 +981,20 @@ def main():
         login_handler = LoginHandler(
             driver=driver,
             login_config=login_config,
-            timeout=browser_config.get("timeout", 30)
+            timeout=browser_config.get("timeout", 30),
+            page_waiter=page_waiter,
+            user_data_dir=driver_manager.user_data_dir,
+            worker_id=worker_id
         )
         login_success = login_handler.login()
 
         if not login_success:
             raise Exception("登录失败，程序终止")
 
+        # 登录成功后同步一次浏览器 Cookie，所有 HTTP 接口共用该会话
+        session_bridge = SessionBridge(driver, login_url=login_config.get("login_url"))
+        session_bridge.sync()
+
         logger.info("=" * 60)
         logger.info("登录流程完成")
         logger.info("=" * 60)
@@ -486,10 +1005,15 @@ def main():
         logger.info("处理登录后的确认提示")
         logger.info("=" * 60)
 
+        # 沿用登录会话时提示不一定出现，只短暂等待
+        confirmation_timeout = browser_config.get("timeout", 30)
+        if login_handler.session_restored:
+            confirmation_timeout = confirmation_config.get("wait_time", 2)
         handle_confirmation(
             driver=driver,
             confirmation_config=confirmation_config,
-            timeout=browser_config.get("timeout", 30)
+            timeout=confirmation_timeout,
+            page_waiter=page_waiter
         )
 
         logger.info("=" * 60)
@@ -505,7 +1029,8 @@ def main():
         select_month(
             driver=driver,
             month_config=month_config,
-            timeout=browser_config.get("timeout", 30)
+            timeout=browser_config.get("timeout", 30),
+            page_waiter=page_waiter
         )
 
         logger.info("=" * 60)
@@ -521,7 +1046,8 @@ def main():
         click_entry_button(
             driver=driver,
             entry_button_config=entry_button_config,
-            timeout=browser_config.get("timeout", 30)
+            timeout=browser_config.get("timeout", 30),
+            page_waiter=page_waiter
         )
 
         logger.info("=" * 60)
@@ -537,13 +1063,87 @@ def main():
         click_function_button(
             driver=driver,
             function_button_config=function_button_config,
-            timeout=browser_config.get("timeout", 30)
+            timeout=browser_config.get("timeout", 30),
+            page_waiter=page_waiter
         )
 
         logger.info("=" * 60)
         logger.info("功能按钮点击完成")
         logger.info("=" * 60)
 
+        try:
+            logger.info(f"录入页面{format_page_load(DriverManager.page_load_stats(driver))}")
+        except Exception as e:
+            logger.debug(f"读取页面加载统计失败: {e}")
+
+    except Exception:
+        driver_manager.quit_driver()
+        raise
+
+    return driver_manager, driver, page_waiter, session_bridge
+
+
+def main():
+    """主函数"""
+    logger = logging.getLogger(__name__)
+
+    try:
+        # 加载配置
+        logger.info("=" * 60)
+        logger.info("自动化表单填写程序启动")
+        logger.info("=" * 60)
+
+        args = parse_args()
+        config = load_config()
+        setup_logging(config)
+
+        # 清除字典缓存后直接退出
+        if args.clear_dict_cache:
+            dict_cache = create_dict_cache(config.get("dict_cache", {}))
+            if dict_cache:
+                namespace = {"diag": "dict_diag", "drug": "dict_drug", "all": None}[args.clear_dict_cache]
+                dict_cache.invalidate(namespace)
+            return
+
+        # 生成本地字典索引后直接退出
+        if args.snapshot_dict:
+            run_dict_snapshot(config)
+            return
+
+        # 对比页面加载耗时后直接退出
+        if args.measure_page_load:
+            run_page_load_benchmark(config)
+            return
+
+        # 显示GUI收集用户输入
+        logger.info("显示配置界面...")
+        user_config = show_config_gui()
+
+        if user_config is None:
+            logger.info("用户取消操作，程序退出")
+            return
+
+        # 使用GUI配置覆盖config中的值
+        config['login']['username'] = user_config['username']
+        config['login']['password'] = user_config['password']
+        config['month_selection']['month'] = user_config['month']
+        config['function_button']['type'] = user_config['function_type']
+        config['browser']['headless'] = user_config['headless']
+
+        # 更新对应功能的数据文件路径
+        function_type = user_config['function_type']
+        config['functions'][function_type]['data']['input_file'] = user_config['input_file']
+
+        logger.info(f"用户配置: 功能类型={function_type}, 月份={user_config['month']}, 文件={user_config['input_file']}")
+        logger.info("=" * 60)
+
+        # 初始化组件
+        logger.info("初始化组件...")
+
+        # 1-9. 启动浏览器、登录并导航到录入页面
+        function_button_config = config.get("function_button", {})
+        driver_manager, driver, page_waiter, session_bridge = prepare_browser_session(config)
+
         # 10. 根据功能类型初始化数据读取器、结果导出器和表单填写器
         function_type = function_button_config.get("type", "outpatient")
         logger.info("=" * 60)
@@ -561,11 +1161,17 @@ def main():
         data_config = current_function_config.get("data", {})
         logger.info(f"数据文件: {data_config.get('input_file')}")
 
-        # 初始化数据读取器
+        # 初始化数据读取器，读取表头并校验必需的列（之后从表头处继续逐行读取，不重复解析）
+        schema_config = data_config.get("schema", {})
         reader = DataReader(
             file_path=data_config.get("input_file"),
-            sheet_name=data_config.get("sheet_name", "Sheet1")
+            sheet_name=data_config.get("sheet_name", "Sheet1"),
+            chunk_size=data_config.get("chunk_size", 200),
+            required_columns=schema_config.get("required_columns"),
+            column_types=schema_config.get("column_types")
         )
+        if not reader.validate_columns():
+            raise ValueError("数据文件缺少必需的列，请检查输入文件")
 
         # 初始化结果导出器
         exporter = ResultExporter(
@@ -578,13 +1184,28 @@ def main():
         logger.info(f"表单字段数量: {len(form_elements_config)}")
         logger.info(f"抗菌药处理: {'启用' if antibiotic_config.get('enabled', False) else '禁用'}")
 
-        form_filler = FormFiller(
-            driver=driver,
-            form_elements=form_elements_config,
-            timeout=browser_config.get("timeout", 30),
-            antibiotic_config=antibiotic_config
+        # 初始化字典查询缓存、本地字典索引和字典查询客户端（所有工作会话共用）
+        dict_cache = create_dict_cache(config.get("dict_cache", {}))
+        dict_index = create_dict_index(config.get("dict_index", {}))
+        dict_client = create_dict_client(session_bridge, config.get("dict_client", {}))
+        unit_registry = create_unit_registry(config.get("unit_mapping", {}))
+        prefetched = {}  # 字典预取结果，主会话预取后所有工作会话直接使用
+
+        # 多个浏览器共用同一个结果表格，提交到识别出新增记录之间需要互斥
+        worker_count = args.workers or config.get("worker_pool", {}).get("workers", 1)
+        record_lock = threading.Lock() if worker_count > 1 else None
+
+        form_filler = create_form_filler(
+            driver, page_waiter, session_bridge, config, current_function_config,
+            dict_cache, dict_index, dict_client, record_lock, unit_registry, prefetched
         )
+        # 每个工作会话由看门狗管理，浏览器崩溃或无响应时自动重启（create_session 在下方定义）
+        watchdog_config = config.get("watchdog", {})
+        workers = [create_watchdog(
+            lambda: create_session(0, session_bridge), (driver_manager, form_filler), watchdog_config
+        )]
 
+        logger.info(f"表单提交方式: {'接口直接提交（失败时回退浏览器）' if form_filler.direct_submitter else '浏览器填写'}")
         logger.info("功能配置初始化完成")
 
         # 11. 读取数据并处理
@@ -610,64 +1231,201 @@ def main():
 
         logger.info("用户确认完成，开始读取数据...")
 
-        logger.info("读取输入数据...")
-        data_list = reader.read_data()
-        total_count = len(data_list)
-        logger.info(f"共读取 {total_count} 条数据")
-
-        # 处理每条数据
-        results = []
-        success_count = 0
-        fail_count = 0
-
-        for index, row_data in enumerate(data_list, start=1):
-            logger.info(f"\n处理第 {index}/{total_count} 条数据...")
-
-            try:
-                # 填写表单（包含提交）
-                fill_success = form_filler.fill_form(row_data)
-
-                if not fill_success:
-                    raise Exception("表单填写或提交失败")
-                else:
-                    # 表单填写成功之后，还需要对新增的记录录入一些信息
-                    logger.info("开始处理抗菌药信息...")
-                    antibiotic_success = form_filler.handle_antibiotic_info(row_data)
-
-                    if not antibiotic_success:
-                        logger.warning("抗菌药信息处理失败，但继续执行")
+        # 数据逐批读取：每批先预取字典再交给工作池，第一批读完即可开始填写
+        total_count = reader.count_rows()
+        logger.info(f"读取输入数据（预计 {total_count if total_count is not None else '未知'} 条）...")
+
+        # 处理进度日志：续传时跳过已完成的行，否则把旧日志另存后重新开始
+        journal = create_row_journal(config.get("journal", {}), function_type)
+        journal_entries = {}
+        if journal and args.resume:
+            journal_entries = journal.load()
+            logger.info(f"续传模式: 读取到 {len(journal_entries)} 条处理记录（日志: {journal.journal_path}）")
+        elif journal:
+            journal.rotate()
+
+        prefetch_config = config.get("dict_prefetch", {})
+        statuses = []  # 每行的处理状态，结果条目本身逐行写入结果文件
+        seen_fingerprints = {}
+
+        pool_stopped = threading.Event()  # 工作池停止（没有可用的浏览器）后剩余的行不再预取和编译
+
+        def iter_tasks():
+            """逐批读取数据行，跳过续传时已处理的行，预取字典后逐行返回 (行号, 行数据, 指纹, 填写计划)；
+            工作池停止后剩余的行直接返回，填写计划为 None"""
+            for chunk in reader.iter_chunks():
+                tasks = []
+                for row_data in chunk:
+                    row_index = len(statuses)
+                    statuses.append(None)
+                    fingerprint = RowJournal.fingerprint(row_data, seen_fingerprints)
+                    entry = journal_entries.get(fingerprint)
+                    resume_status = RowJournal.resume_status(entry)
+                    errors = reader.validate_row(row_data)
+
+                    if resume_status == RowJournal.STATUS_SUCCESS:
+                        result = exporter.create_result_entry(
+                            row_data=row_data,
+                            status="成功",
+                            message=f"上次运行已完成（{entry['time']}）"
+                        )
+                    elif resume_status == RowJournal.STATUS_STARTED:
+                        # 上次运行在这一行发出提交后中断或失败，服务器可能已保存，不自动重新提交
+                        result = exporter.create_result_entry(
+                            row_data=row_data,
+                            status="失败",
+                            message=f"上次运行已发出提交但结果未知，请人工核对是否已录入（{entry.get('message') or entry['time']}）"
+                        )
+                    elif errors:
+                        result = exporter.create_result_entry(
+                            row_data=row_data,
+                            status="失败",
+                            message=f"数据校验失败: {'; '.join(errors)}"
+                        )
                     else:
-                        logger.info("抗菌药信息处理成功")
+                        tasks.append((row_index, row_data, fingerprint))
+                        continue
+                    exporter.write_result(row_index, result)
+                    statuses[row_index] = result["处理状态"]
+
+                if pool_stopped.is_set():
+                    for row_index, row_data, fingerprint in tasks:
+                        yield row_index, row_data, fingerprint, None
+                    continue
+
+                # 预先并发解析这一批的诊断和药品，编译填写计划时不再等待字典接口
+                if prefetch_config.get("enabled", True) and tasks:
+                    try:
+                        form_filler.prefetch_dictionaries([task[1] for task in tasks])
+                    except Exception as e:
+                        logger.warning(f"字典预取失败，将在编译填写计划时查询: {e}")
 
-                # 记录成功结果
-                result = exporter.create_result_entry(
-                    row_data=row_data,
-                    status="成功",
-                    message="表单提交成功"
+                # 整批向量化解析用法用量，无法解析的行在填写前汇总输出
+                dosages = [None] * len(tasks)
+                if tasks:
+                    try:
+                        dosages = form_filler.parse_dosages(
+                            [task[1] for task in tasks], [task[0] + 1 for task in tasks]
+                        )
+                    except Exception as e:
+                        logger.warning(f"批量解析用法用量失败，将逐行解析: {e}")
+
+                # 编译填写计划，数据有误的行直接记为失败，不进入浏览器
+                for (row_index, row_data, fingerprint), dosage in zip(tasks, dosages):
+                    if pool_stopped.is_set():
+                        yield row_index, row_data, fingerprint, None
+                        continue
+                    try:
+                        plan = form_filler.compile_plan(row_data, dosage)
+                    except PlanError as e:
+                        logger.error(f"第 {row_index + 1} 条数据无法处理: {e}")
+                        exporter.write_result(row_index, exporter.create_result_entry(
+                            row_data=row_data,
+                            status="失败",
+                            message=f"数据错误: {e}"
+                        ))
+                        statuses[row_index] = "失败"
+                        continue
+                    yield row_index, row_data, fingerprint, plan
+
+        # 处理每条数据（worker_count > 1 时由多个已登录的浏览器并行处理）
+        def create_session(worker_id: int, bridge: SessionBridge = None):
+            worker_manager, worker_driver, worker_waiter, worker_bridge = prepare_browser_session(config, worker_id)
+            if bridge is not None:
+                # 沿用已有的 Cookie 同步桥（字典查询客户端持有），改为从新浏览器同步
+                with bridge.driver_lock:
+                    bridge.driver = worker_driver
+                    bridge.sync()
+                worker_bridge = bridge
+            worker_filler = create_form_filler(
+                worker_driver, worker_waiter, worker_bridge, config, current_function_config,
+                dict_cache, dict_index, dict_client, record_lock, unit_registry, prefetched
+            )
+            return worker_manager, worker_filler
+
+        def create_worker(worker_id: int) -> DriverWatchdog:
+            watchdog = create_watchdog(
+                lambda: create_session(worker_id), create_session(worker_id), watchdog_config, worker_id
+            )
+            workers.append(watchdog)
+            return watchdog
+
+        if worker_count > 1:
+            logger.info(f"启用多浏览器并行处理: {worker_count} 个工作会话")
+
+        def run_row(worker: DriverWatchdog, task: tuple) -> str:
+            # 处理一行期间持有浏览器锁，字典查询需要刷新 Cookie 时等待这一行结束后再读取浏览器
+            with worker.session[1].session_bridge.driver_lock:
+                return run_row_locked(worker, task)
+
+        def run_row_locked(worker: DriverWatchdog, task: tuple) -> str:
+            row_index, row_data, fingerprint, plan = task
+            try:
+                # 处理前检查浏览器，崩溃或卡死时先重启，避免这一行在失效的会话上等待超时
+                worker.ensure_alive()
+                result = process_row(
+                    worker.session[1], exporter, row_index + 1, total_count, row_data, plan,
+                    journal, fingerprint
                 )
-                results.append(result)
-                success_count += 1
-                logger.info(f"第 {index} 条数据处理成功")
-
-                # 等待一下，避免提交太快
-                time.sleep(1)
 
+                # 处理失败且浏览器已失效：重启后从这一行继续；已发出提交的行服务器可能已保存，不自动重试
+                if result["处理状态"] == "失败" and not worker.heartbeat():
+                    submitted = worker.session[1].submit_started
+                    worker.restart()
+                    if submitted:
+                        result["处理消息"] = "浏览器在提交后异常退出，请人工核对是否已录入"
+                        if journal:
+                            # 记为"提交中"，--resume 时同样提示人工核对而不是重新提交
+                            journal.record(fingerprint, row_index + 1, RowJournal.STATUS_STARTED, result["处理消息"])
+                    else:
+                        logger.info(f"浏览器已重启，重新处理第 {row_index + 1} 条数据")
+                        result = process_row(
+                            worker.session[1], exporter, row_index + 1, total_count, row_data, plan,
+                            journal, fingerprint
+                        )
             except Exception as e:
-                # 记录失败结果
-                result = exporter.create_result_entry(
+                # 浏览器无法重启：这一行记为失败，该工作会话停止领取数据行
+                exporter.write_result(row_index, exporter.create_result_entry(
                     row_data=row_data,
                     status="失败",
-                    message=str(e)
-                )
-                results.append(result)
-                fail_count += 1
-                logger.error(f"第 {index} 条数据处理失败: {e}")
-
-
-        # 导出结果
+                    message=f"浏览器异常且无法重启: {e}"
+                ))
+                statuses[row_index] = "失败"
+                raise
+
+            exporter.write_result(row_index, result)
+            statuses[row_index] = result["处理状态"]
+            return statuses[row_index]
+
+        pool = WorkerPool(
+            worker_count,
+            create_worker=create_worker,
+            process_row=run_row,
+            close_worker=lambda worker: worker.close()
+        )
+        tasks = iter_tasks()
+        pool.run(tasks, primary=workers[0])
+        pool_stopped.set()
+
+        # 所有工作会话都不可用时未处理的行记为失败（不再预取和编译），--resume 时重新处理
+        for row_index, row_data, fingerprint, _ in tasks:
+            result = exporter.create_result_entry(
+                row_data=row_data,
+                status="失败",
+                message="未处理（没有可用的浏览器会话）"
+            )
+            exporter.write_result(row_index, result)
+            if journal:
+                journal.record(fingerprint, row_index + 1, RowJournal.STATUS_FAILED, result["处理消息"])
+            statuses[row_index] = "失败"
+        total_count = len(statuses)
+        success_count = sum(1 for status in statuses if status == "成功")
+        fail_count = total_count - success_count
+
+        # 导出结果（把逐行写入的临时文件转换为最终文件）
         logger.info("\n" + "=" * 60)
         logger.info("处理完成，导出结果...")
-        export_success = exporter.export_results(results)
+        export_success = exporter.finalize()
 
         # 获取结果文件的绝对路径
         result_file_path = exporter.output_file.absolute() if export_success else None
@@ -680,6 +1438,38 @@ def main():
         logger.info(f"成功率: {success_count / total_count * 100:.2f}%")
         if result_file_path:
             logger.info(f"结果文件: {result_file_path}")
+        if dict_cache:
+            for namespace, counter in dict_cache.stats.items():
+                logger.info(
+                    f"字典缓存 {namespace}: 命中 {counter['hits']} 次, "
+                    f"命中未找到记录 {counter['negative_hits']} 次, 未命中 {counter['misses']} 次"
+                )
+        fillers = [worker.session[1] for worker in workers]
+        restart_count = sum(worker.restarts for worker in workers)
+        if restart_count:
+            logger.info(f"浏览器自动重启: {restart_count} 次")
+        if form_filler.dosage_issue_count:
+            logger.info(f"用法用量无法解析: {form_filler.dosage_issue_count} 项（详见解析报告）")
+        unknown_units = unit_registry.unknown_report()
+        if unknown_units:
+            logger.warning(
+                f"无法识别的单位/途径/频率 {sum(unit_registry.unknown.values())} 次（未填写，可添加到 unit_mapping 的 aliases）:\n"
+                + "\n".join(unknown_units)
+            )
+        if form_filler.direct_submitter:
+            logger.info(f"接口直接提交: {sum(f.direct_submitter.submit_count for f in fillers)} 条")
+        if form_filler.detail_submitter:
+            logger.info(f"接口直接保存抗菌药详情: {sum(f.detail_submitter.submit_count for f in fillers)} 条")
+        if session_bridge.refresh_count:
+            logger.info(f"HTTP 会话刷新次数: {session_bridge.refresh_count}")
+        client_metrics = dict_client.metrics()
+        if client_metrics['requests']:
+            logger.info(
+                f"字典接口: 请求 {client_metrics['requests']} 次, 重试 {client_metrics['retries']} 次, "
+                f"失败 {client_metrics['failures']} 次, 合并重复查询 {client_metrics['coalesced']} 次, "
+                f"耗时 p50={client_metrics['p50_ms']:.0f}ms "
+                f"p95={client_metrics['p95_ms']:.0f}ms max={client_metrics['max_ms']:.0f}ms"
+            )
         logger.info("=" * 60)
 
         # 显示GUI确认对话框，等待用户上报
@@ -758,6 +1548,18 @@ def main():
             pass
 
     finally:
+        if 'journal' in locals() and journal:
+            journal.close()
+        if 'workers' in locals():
+            # 0 号会话重启后 driver_manager 已被替换，这里统一关闭各工作会话当前的浏览器
+            for worker in workers:
+                worker.close()
+        if 'dict_cache' in locals() and dict_cache:
+            dict_cache.close()
+        if 'dict_index' in locals() and dict_index:
+            dict_index.close()
+        if 'dict_client' in locals() and dict_client:
+            dict_client.close()
         logger.info("程序结束")
 
 
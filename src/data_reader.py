@@ -1,86 +1,300 @@
 """
 数据读取模块
-支持读取 Excel 和 CSV 文件
+支持读取 Excel 和 CSV 文件；iter_rows/iter_chunks 逐行读取，内存占用与文件大小无关
 """
 
+import itertools
 import pandas as pd
 import logging
+import re
+from openpyxl import load_workbook
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Any
 
 logger = logging.getLogger(__name__)
 
+# 以文本格式存储的数字，如 "5"、"197.18"、"-0.5"
+NUMERIC_TEXT_PATTERN = re.compile(r'[+-]?\d+(\.\d*)?')
+
 
 class DataReader:
     """数据读取器"""
 
-    def __init__(self, file_path: str, sheet_name: str = "Sheet1"):
+    # column_types 支持的类型
+    TYPE_NAMES = {"int": "整数", "float": "数字", "str": "文本"}
+
+    def __init__(self, file_path: str, sheet_name: str = "Sheet1", chunk_size: int = 200,
+                 required_columns: Optional[List[str]] = None, column_types: Optional[Dict[str, str]] = None):
         """
         初始化数据读取器
 
         Args:
             file_path: 数据文件路径
             sheet_name: Excel sheet 名称（仅用于 Excel 文件）
+            chunk_size: iter_chunks 每批的行数（CSV 同时作为 pandas 的 chunksize）
+            required_columns: 必需的列名（规范化后的列名，如 "抗菌药"）
+            column_types: 列的数据类型 {列名: int/float/str}，用于逐行校验
         """
         self.file_path = Path(file_path)
         self.sheet_name = sheet_name
+        self.chunk_size = chunk_size
+        self.required_columns = list(required_columns or [])
+        self.column_types = dict(column_types or {})
+        self.columns: Optional[List[str]] = None  # 规范化后的列名（读取表头后设置）
+        self._rows: Optional[Iterator[tuple]] = None  # 已读取表头、尚未读取的数据行
+        self._workbook = None
+
+        unknown_types = set(self.column_types.values()) - set(self.TYPE_NAMES)
+        if unknown_types:
+            raise ValueError(f"不支持的列类型: {unknown_types}")
 
         if not self.file_path.exists():
             raise FileNotFoundError(f"数据文件不存在: {self.file_path}")
 
-    def read_data(self) -> List[Dict]:
+    @staticmethod
+    def normalize_column(name: Any) -> str:
         """
-        读取数据文件
+        规范化列名：多行表头只保留第一行并去除首尾空白（如 "抗菌药\\n有/无" -> "抗菌药"，"诊断     " -> "诊断"）
+
+        Args:
+            name: 原始列名
 
         Returns:
-            数据列表，每行数据转换为字典
+            规范化后的列名
+        """
+        return str(name).split("\n")[0].strip()
+
+    def read_header(self) -> List[str]:
+        """
+        打开数据文件并读取表头（只解析一次，之后 iter_rows 从表头之后继续读取）
+
+        Returns:
+            规范化后的列名列表
 
         Raises:
             ValueError: 不支持的文件格式
         """
+        if self._rows is not None:
+            return self.columns
+
         file_extension = self.file_path.suffix.lower()
 
         try:
-            if file_extension in ['.xlsx', '.xls']:
+            if file_extension == '.xlsx':
+                logger.info(f"逐行读取 Excel 文件: {self.file_path}")
+                self._workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+                rows = self._workbook[self.sheet_name].iter_rows(values_only=True)
+                header = next(rows, ())
+                rows = self._iter_sheet_values(rows)
+            elif file_extension == '.csv':
+                logger.info(f"分块读取 CSV 文件: {self.file_path}")
+                chunks = pd.read_csv(self.file_path, chunksize=self.chunk_size)
+                first = next(chunks)
+                header = tuple(first.columns)
+                rows = self._iter_frame_values(itertools.chain([first], chunks))
+            elif file_extension == '.xls':
+                # .xls 格式无法流式解析，整表读取一次
                 logger.info(f"读取 Excel 文件: {self.file_path}")
                 df = pd.read_excel(self.file_path, sheet_name=self.sheet_name)
-            elif file_extension == '.csv':
-                logger.info(f"读取 CSV 文件: {self.file_path}")
-                df = pd.read_csv(self.file_path)
+                header = tuple(df.columns)
+                rows = self._iter_frame_values([df])
             else:
                 raise ValueError(f"不支持的文件格式: {file_extension}")
 
-            # 将 DataFrame 转换为字典列表
-            data_list = df.to_dict('records')
-            logger.info(f"成功读取 {len(data_list)} 条数据")
-
-            return data_list
-
         except Exception as e:
             logger.error(f"读取数据文件失败: {e}")
+            self._close()
             raise
 
-    def validate_columns(self, required_columns: List[str]) -> bool:
+        self.columns = self._column_names(header)
+        self._rows = rows
+        logger.debug(f"数据文件列: {self.columns}")
+        return self.columns
+
+    def read_data(self) -> List[Dict]:
+        """
+        读取数据文件
+
+        Returns:
+            数据列表，每行数据转换为字典
+
+        Raises:
+            ValueError: 不支持的文件格式
+        """
+        return list(self.iter_rows())
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        逐行读取数据文件（生成器，读到第一行即可开始处理）
+
+        .xlsx 使用 openpyxl 只读模式逐行解析（按第一批数据推断数字列，列中的数字文本转换为 int/float）；.csv 使用 pandas 分块读取；
+        .xls 格式不支持流式解析，整表读取后逐行返回。列名已规范化，空单元格为 None，全空的行被跳过。
+
+        Yields:
+            每行数据的字典，key 为规范化后的列名
+
+        Raises:
+            ValueError: 不支持的文件格式
+        """
+        columns = self.read_header()
+        rows, self._rows = self._rows, None
+
+        count = 0
+        try:
+            for values in rows:
+                if all(value is None or value == "" for value in values):
+                    continue
+                count += 1
+                yield dict(zip(columns, values))
+        finally:
+            self._close()
+        logger.info(f"成功读取 {count} 条数据")
+
+    def iter_chunks(self, chunk_size: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按批读取数据文件
+
+        Args:
+            chunk_size: 每批的行数，为 None 时使用初始化时的 chunk_size
+
+        Yields:
+            每批数据行列表（最后一批可能不足 chunk_size 行）
         """
-        验证数据文件是否包含必需的列
+        size = chunk_size or self.chunk_size
+        chunk = []
+        for row in self.iter_rows():
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def count_rows(self) -> Optional[int]:
+        """
+        估算数据行数（用于显示进度，不读取数据内容）
+
+        Returns:
+            .xlsx 按工作表尺寸估算的行数（可能包含末尾空行），其他格式返回 None
+        """
+        self.read_header()
+        if self._workbook is None:
+            return None
+        max_row = self._workbook[self.sheet_name].max_row
+        return max_row - 1 if max_row else None
+
+    def _close(self) -> None:
+        """关闭只读模式打开的工作簿"""
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+    def _iter_sheet_values(self, rows) -> Iterator[tuple]:
+        """
+        逐行返回 openpyxl 读取的值，按第一批数据（chunk_size 行）推断各列类型
+
+        与 pandas 按整列推断类型一致：一列中所有非空值都是数字（或文本格式的数字）时，该列的数字文本转换为
+        int/float（出现小数时整列为 float）；有文字的列保持原样（如编码形式的科室不会被转换为数字）。
+        第一批之后才出现的值沿用推断结果，不再改变列的类型
+        """
+        sample = list(itertools.islice(rows, self.chunk_size))
+        numeric_columns = self._numeric_columns(sample)
+        for values in itertools.chain(sample, rows):
+            if numeric_columns:
+                values = tuple(
+                    self._convert_numeric(value, numeric_columns[i]) if i in numeric_columns else value
+                    for i, value in enumerate(values)
+                )
+            yield values
+
+    @staticmethod
+    def _is_number(value: Any) -> bool:
+        """是否为数值（不含布尔值）"""
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    @classmethod
+    def _numeric_columns(cls, sample: List[tuple]) -> Dict[int, type]:
+        """
+        找出含有数字文本且全部非空值都是数字的列
 
         Args:
-            required_columns: 必需的列名列表
+            sample: 用于推断的数据行
 
         Returns:
-            True 如果所有必需列都存在
+            {列序号: int 或 float}
         """
-        try:
-            if self.file_path.suffix.lower() in ['.xlsx', '.xls']:
-                df = pd.read_excel(self.file_path, sheet_name=self.sheet_name, nrows=1)
+        columns: Dict[int, type] = {}
+        width = max((len(values) for values in sample), default=0)
+        for i in range(width):
+            cells = [values[i] for values in sample if i < len(values) and values[i] not in (None, "")]
+            if not any(isinstance(value, str) for value in cells):
+                continue
+            if not all(cls._is_number(value) or (isinstance(value, str) and NUMERIC_TEXT_PATTERN.fullmatch(value))
+                       for value in cells):
+                continue
+            is_float = any(isinstance(value, float) or (isinstance(value, str) and "." in value) for value in cells)
+            columns[i] = float if is_float else int
+        return columns
+
+    @classmethod
+    def _convert_numeric(cls, value: Any, column_type: type) -> Any:
+        """
+        按推断的列类型转换一个单元格（无法转换的值原样返回）
+
+        Args:
+            value: 单元格的值
+            column_type: int 或 float
+
+        Returns:
+            转换后的值
+        """
+        if isinstance(value, str) and NUMERIC_TEXT_PATTERN.fullmatch(value):
+            return float(value) if column_type is float or "." in value else int(value)
+        if column_type is float and cls._is_number(value):
+            return float(value)
+        return value
+
+    @staticmethod
+    def _iter_frame_values(frames) -> Iterator[tuple]:
+        """逐行返回 DataFrame（或分块迭代器）中的值，NaN 转换为 None"""
+        for df in frames:
+            df = df.astype(object).where(df.notna(), None)
+            yield from df.itertuples(index=False, name=None)
+
+    @classmethod
+    def _column_names(cls, header: tuple) -> List[str]:
+        """表头转换为规范化的列名：空表头命名为 Unnamed: n，重复列名追加 .1、.2（与 pandas 一致）"""
+        columns = []
+        seen: Dict[str, int] = {}
+        for i, value in enumerate(header):
+            name = cls.normalize_column(value) if value is not None else ""
+            if not name:
+                name = f"Unnamed: {i}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
             else:
-                df = pd.read_csv(self.file_path, nrows=1)
+                seen[name] = 0
+            columns.append(name)
+        return columns
+
+    def validate_columns(self, required_columns: Optional[List[str]] = None) -> bool:
+        """
+        验证数据文件是否包含必需的列（使用已读取的表头，不重新解析文件）
 
-            existing_columns = set(df.columns)
-            missing_columns = set(required_columns) - existing_columns
+        Args:
+            required_columns: 必需的列名列表，为 None 时使用初始化时的 required_columns
+
+        Returns:
+            True 如果所有必需列都存在
+        """
+        try:
+            existing_columns = set(self.read_header())
+            required = self.required_columns if required_columns is None else required_columns
+            missing_columns = [column for column in required if column not in existing_columns]
 
             if missing_columns:
-                logger.error(f"数据文件缺少以下列: {missing_columns}")
+                logger.error(f"数据文件缺少以下列: {missing_columns}（现有列: {self.columns}）")
                 return False
 
             logger.info("数据文件列验证通过")
@@ -89,3 +303,35 @@ class DataReader:
         except Exception as e:
             logger.error(f"验证列失败: {e}")
             return False
+
+    def validate_row(self, row: Dict[str, Any]) -> List[str]:
+        """
+        按 column_types 校验一行数据（空值不校验）
+
+        Args:
+            row: 行数据
+
+        Returns:
+            错误信息列表，校验通过时为空列表
+        """
+        errors = []
+        for column, type_name in self.column_types.items():
+            value = row.get(column)
+            if value is None or str(value).strip() == "":
+                continue
+            if not self._matches_type(value, type_name):
+                errors.append(f"{column} 应为{self.TYPE_NAMES[type_name]}: {value}")
+        return errors
+
+    @staticmethod
+    def _matches_type(value: Any, type_name: str) -> bool:
+        """判断值是否符合类型（数字列允许内容为数字的文本）"""
+        if type_name == "str":
+            return True
+        if isinstance(value, bool):
+            return False
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return False
+        return type_name == "float" or number.is_integer()
@@ -0,0 +1,264 @@
+"""
+字典查询缓存模块
+使用 SQLite 持久化保存诊断/药品字典的查询结果，跨运行复用
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DictCache:
+    """字典查询持久化缓存"""
+
+    # 未找到结果（负缓存）在数据库中的存储内容
+    NEGATIVE_PAYLOAD = "null"
+
+    def __init__(self, db_path: Optional[str] = "cache/dict_cache.sqlite3",
+                 ttl: float = 30 * 86400, max_entries: int = 20000,
+                 negative_ttl: float = 86400):
+        """
+        初始化字典缓存
+
+        Args:
+            db_path: SQLite 文件路径，为 None 时仅在内存中缓存（不跨运行保存）
+            ttl: 缓存有效期（秒）
+            max_entries: 最大缓存条目数，超出后按最近访问时间淘汰
+            negative_ttl: "未找到"结果的缓存有效期（秒），通常比 ttl 短，以便字典补录后能尽快查到
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._touched: Dict[tuple, float] = {}  # 待写回的访问时间，避免每次命中都写库
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+        if db_path:
+            self.db_path = Path(db_path)
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            database = str(self.db_path)
+        else:
+            self.db_path = None
+            database = ":memory:"
+
+        self._conn = sqlite3.connect(database, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dict_cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_dict_cache_accessed ON dict_cache (accessed_at)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM dict_cache").fetchone()[0]
+
+        logger.info(f"字典缓存已加载: {database}（{self._count} 条）")
+
+    @staticmethod
+    def normalize_key(keyword: str) -> str:
+        """
+        规范化查询关键词作为缓存键（全角转半角、去除空白、小写）
+
+        Args:
+            keyword: 原始关键词
+
+        Returns:
+            规范化后的关键词
+        """
+        text = unicodedata.normalize("NFKC", str(keyword))
+        return re.sub(r"\s+", "", text).lower()
+
+    def _ttl_for(self, payload: str) -> float:
+        """根据缓存内容返回对应的有效期"""
+        return self.negative_ttl if payload == self.NEGATIVE_PAYLOAD else self.ttl
+
+    def lookup(self, namespace: str, keyword: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        读取缓存，区分"未缓存"和"已缓存的未找到结果"
+
+        Args:
+            namespace: 命名空间（如 dict_diag、dict_drug）
+            keyword: 查询关键词
+
+        Returns:
+            (是否命中, 缓存的结果字典)；命中负缓存时返回 (True, None)
+        """
+        key = self.normalize_key(keyword)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM dict_cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+
+            if row is None:
+                self._record(namespace, "misses")
+                return False, None
+
+            payload, created_at = row
+            if now - created_at > self._ttl_for(payload):
+                self._conn.execute(
+                    "DELETE FROM dict_cache WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                )
+                self._conn.commit()
+                self._count -= 1
+                self._record(namespace, "misses")
+                logger.debug(f"缓存已过期: {namespace}/{key}")
+                return False, None
+
+            self._touched[(namespace, key)] = now
+            self._record(namespace, "negative_hits" if payload == self.NEGATIVE_PAYLOAD else "hits")
+
+        return True, json.loads(payload)
+
+    def get(self, namespace: str, keyword: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存
+
+        Args:
+            namespace: 命名空间（如 dict_diag、dict_drug）
+            keyword: 查询关键词
+
+        Returns:
+            缓存的结果字典，未命中、已过期或为负缓存时返回 None
+        """
+        return self.lookup(namespace, keyword)[1]
+
+    def has(self, namespace: str, keyword: str) -> bool:
+        """
+        判断缓存中是否存在未过期的条目（不计入命中统计）
+
+        Args:
+            namespace: 命名空间
+            keyword: 查询关键词
+
+        Returns:
+            True 如果存在未过期的缓存
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM dict_cache WHERE namespace = ? AND key = ?",
+                (namespace, self.normalize_key(keyword))
+            ).fetchone()
+        return row is not None and time.time() - row[1] <= self._ttl_for(row[0])
+
+    def set(self, namespace: str, keyword: str, value: Optional[Dict[str, Any]]) -> None:
+        """
+        写入缓存
+
+        Args:
+            namespace: 命名空间
+            keyword: 查询关键词
+            value: 要缓存的结果字典，为 None 时表示"未找到"（按 negative_ttl 过期）
+        """
+        key = self.normalize_key(keyword)
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO dict_cache (namespace, key, payload, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, payload, now, now)
+            )
+            # INSERT OR REPLACE 覆盖已有行时 COUNT 不变，这里用近似计数，淘汰时再校准
+            if cursor.rowcount > 0:
+                self._count += 1
+            self._touched.pop((namespace, key), None)
+
+            if self._count > self.max_entries:
+                self._evict()
+
+            self._conn.commit()
+
+    def invalidate(self, namespace: Optional[str] = None, keyword: Optional[str] = None) -> int:
+        """
+        显式失效缓存
+
+        Args:
+            namespace: 命名空间，为 None 时清空所有命名空间
+            keyword: 查询关键词，为 None 时清空整个命名空间
+
+        Returns:
+            删除的条目数
+        """
+        with self._lock:
+            if namespace is None:
+                cursor = self._conn.execute("DELETE FROM dict_cache")
+                self._touched.clear()
+            elif keyword is None:
+                cursor = self._conn.execute("DELETE FROM dict_cache WHERE namespace = ?", (namespace,))
+                self._touched = {k: v for k, v in self._touched.items() if k[0] != namespace}
+            else:
+                key = self.normalize_key(keyword)
+                cursor = self._conn.execute(
+                    "DELETE FROM dict_cache WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                )
+                self._touched.pop((namespace, key), None)
+
+            self._conn.commit()
+            deleted = cursor.rowcount
+            self._count = max(self._count - deleted, 0)
+
+        logger.info(f"字典缓存已失效 {deleted} 条（命名空间: {namespace or '全部'}，关键词: {keyword or '全部'}）")
+        return deleted
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰超出上限的条目（调用方需持有锁）"""
+        self._flush_touched()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM dict_cache").fetchone()[0]
+        if self._count <= self.max_entries:
+            return
+
+        # 一次多淘汰 10%，避免每次写入都触发淘汰
+        excess = self._count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM dict_cache WHERE rowid IN ("
+            " SELECT rowid FROM dict_cache ORDER BY accessed_at ASC LIMIT ?)",
+            (excess,)
+        )
+        self._count -= excess
+        logger.info(f"字典缓存超出上限，已淘汰 {excess} 条")
+
+    def _flush_touched(self) -> None:
+        """把内存中的访问时间写回数据库（调用方需持有锁）"""
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE dict_cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            [(accessed_at, ns, key) for (ns, key), accessed_at in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def _record(self, namespace: str, outcome: str) -> None:
+        """记录命中/负缓存命中/未命中次数（调用方需持有锁）"""
+        counter = self.stats.setdefault(namespace, {"hits": 0, "negative_hits": 0, "misses": 0})
+        counter[outcome] += 1
+
+    def close(self) -> None:
+        """写回访问时间并关闭数据库"""
+        with self._lock:
+            try:
+                self._flush_touched()
+                self._conn.commit()
+                self._conn.close()
+            except Exception as e:
+                logger.warning(f"关闭字典缓存失败: {e}")
@@ -0,0 +1,306 @@
+"""
+字典查询客户端模块
+基于 asyncio 的字典接口客户端：连接池复用、并发上限、抖动指数退避重试、请求耗时统计
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Any, List, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from session_bridge import SessionBridge, SessionExpiredError
+from dict_index import DICT_TABLES
+
+logger = logging.getLogger(__name__)
+
+
+class DictClient:
+    """字典查询异步客户端（同时提供同步调用接口）"""
+
+    # 字典查询接口
+    SEARCH_URL = "http://y.chinadtc.org.cn/entering/dict/search_dict"
+
+    # 字典查询接口请求头（Cookie 由 SessionBridge 统一管理）
+    HEADERS = {
+        'Accept': '*/*',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36',
+    }
+
+    # 视为临时故障、可以重试的 HTTP 状态码
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    # 耗时统计只保留最近的请求数，避免长时间运行时无限增长
+    LATENCY_WINDOW = 10000
+
+    def __init__(
+        self,
+        session_bridge: SessionBridge,
+        timeout: float = 10,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0
+    ):
+        """
+        初始化字典查询客户端
+
+        Args:
+            session_bridge: 已同步 Cookie 的会话桥
+            timeout: 单次请求超时时间（秒）
+            max_concurrency: 最大并发请求数（同时也是连接池大小）
+            max_retries: 临时故障的最大重试次数
+            backoff_base: 退避基础时长（秒），第 n 次重试最多等待 backoff_base * 2^n
+            backoff_max: 单次退避的最长等待时间（秒）
+        """
+        self.session_bridge = session_bridge
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # 连接池大小与并发数一致，保持长连接复用
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        session_bridge.session.mount("http://", adapter)
+        session_bridge.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="dict-client")
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}  # 进行中的查询，相同查询合并为一次请求
+        self._loop = None
+        self._loop_thread = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.latencies: Deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+        self.request_count = 0
+        self.retry_count = 0
+        self.failure_count = 0
+        self.coalesced_count = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """获取当前事件循环对应的并发信号量"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    def _post(self, dict_table: str, keyword: str) -> requests.Response:
+        """发送一次字典查询请求（阻塞，在线程池中执行）"""
+        table_config = DICT_TABLES[dict_table]
+
+        # 构造表单数据（multipart/form-data格式）
+        data = {
+            'dict_table': dict_table,
+            'search_field': table_config['search_field'],
+            'order_field': table_config['order_field'],
+            'szimu': keyword
+        }
+
+        # 将data转换成multipart形式
+        # 每个字段作为元组，第二个元素为None表示不是文件
+        files = [(key, (None, value)) for key, value in data.items()]
+
+        # 发送请求，不设置Content-Type，让requests自动设置（包含boundary）
+        return self.session_bridge.post(self.SEARCH_URL, files=files, headers=self.HEADERS, timeout=self.timeout)
+
+    def _backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（全抖动指数退避）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def search(self, dict_table: str, keyword: str) -> List[Dict[str, Any]]:
+        """
+        查询字典；同一事件循环中相同的并发查询只发送一次请求，其余调用等待同一结果
+
+        Args:
+            dict_table: 字典表名（dict_diag / dict_drug）
+            keyword: 查询关键词
+
+        Returns:
+            字典记录列表
+
+        Raises:
+            参见 _search_with_retry()
+        """
+        loop = asyncio.get_running_loop()
+        key = (dict_table, keyword)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            self.coalesced_count += 1
+            logger.debug(f"合并进行中的字典查询: {dict_table}/{keyword}")
+            return await asyncio.shield(inflight)
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._search_with_retry(dict_table, keyword)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 标记异常已读取，没有其他等待者时避免告警
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _search_with_retry(self, dict_table: str, keyword: str) -> List[Dict[str, Any]]:
+        """
+        发送字典查询请求，临时故障时按抖动指数退避重试
+
+        Args:
+            dict_table: 字典表名（dict_diag / dict_drug）
+            keyword: 查询关键词
+
+        Returns:
+            字典记录列表
+
+        Raises:
+            requests.RequestException: 请求失败（临时故障重试耗尽或非临时故障）
+            SessionExpiredError: 会话失效（401、被重定向到登录页，或返回了非 JSON 的登录页/错误页）
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+
+        while True:
+            async with self._semaphore():
+                generation = self.session_bridge.generation
+                started = time.perf_counter()
+                try:
+                    response = await loop.run_in_executor(self._executor, self._post, dict_table, keyword)
+                    error = None
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    response, error = None, e
+                finally:
+                    self.latencies.append(time.perf_counter() - started)
+                    self.request_count += 1
+
+            transient = error is not None or response.status_code in self.RETRY_STATUS
+            if transient and attempt < self.max_retries:
+                delay = self._backoff(attempt)
+                attempt += 1
+                self.retry_count += 1
+                reason = error or f"HTTP {response.status_code}"
+                logger.warning(f"字典查询临时失败（{reason}），{delay:.2f} 秒后第 {attempt} 次重试: {dict_table}/{keyword}")
+                await asyncio.sleep(delay)
+                continue
+
+            if error is not None:
+                self.failure_count += 1
+                raise error
+
+            try:
+                response.raise_for_status()
+            except requests.HTTPError:
+                self.failure_count += 1
+                raise
+
+            try:
+                return response.json()
+            except ValueError:
+                # 会话失效时部分页面不重定向，直接以 200 返回登录页或错误页；与 401 一样交给调用方刷新 Cookie 后重试
+                self.failure_count += 1
+                logger.warning(f"字典查询响应不是 JSON（可能是登录页或错误页），按会话失效处理: {dict_table}/{keyword}")
+                raise SessionExpiredError(generation) from None
+
+    async def search_many(
+        self, queries: List[Tuple[str, str]]
+    ) -> List[Union[List[Dict[str, Any]], Exception]]:
+        """
+        批量并发查询字典（并发数受 max_concurrency 限制）
+
+        Args:
+            queries: [(字典表名, 关键词), ...]
+
+        Returns:
+            与 queries 一一对应的结果列表，单个查询失败时对应位置为异常对象
+        """
+        return await asyncio.gather(
+            *(self.search(dict_table, keyword) for dict_table, keyword in queries),
+            return_exceptions=True
+        )
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动后台事件循环线程（同步接口使用）"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="dict-client-loop", daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def search_sync(self, dict_table: str, keyword: str) -> List[Dict[str, Any]]:
+        """同步查询字典，参见 search()；会话失效时在调用线程刷新 Cookie 后重试"""
+        loop = self._ensure_loop()
+        return self.session_bridge.call(
+            lambda: asyncio.run_coroutine_threadsafe(self.search(dict_table, keyword), loop).result()
+        )
+
+    def search_many_sync(
+        self, queries: List[Tuple[str, str]]
+    ) -> List[Union[List[Dict[str, Any]], Exception]]:
+        """同步批量查询字典，参见 search_many()；会话失效的查询在调用线程刷新 Cookie 后重试一次"""
+        loop = self._ensure_loop()
+        results = asyncio.run_coroutine_threadsafe(self.search_many(queries), loop).result()
+
+        expired = [i for i, result in enumerate(results) if isinstance(result, SessionExpiredError)]
+        if expired:
+            # 刷新需要读取浏览器，不能在线程池中进行，回到调用线程刷新后重查这些关键词
+            self.session_bridge.refresh(results[expired[0]].generation)
+            retried = asyncio.run_coroutine_threadsafe(
+                self.search_many([queries[i] for i in expired]), loop
+            ).result()
+            for i, result in zip(expired, retried):
+                results[i] = result
+        return results
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        请求耗时统计
+
+        Returns:
+            包含请求数、重试数、失败数、合并数及最近 LATENCY_WINDOW 次请求耗时分位数（毫秒）的字典
+        """
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {
+                'requests': 0,
+                'retries': self.retry_count,
+                'failures': self.failure_count,
+                'coalesced': self.coalesced_count,
+            }
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            'requests': self.request_count,
+            'retries': self.retry_count,
+            'failures': self.failure_count,
+            'coalesced': self.coalesced_count,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': latencies[-1] * 1000,
+        }
+
+    def close(self) -> None:
+        """停止后台事件循环并关闭线程池"""
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop_thread.join(timeout=5)
+                self._loop.close()
+                self._loop = None
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,294 @@
+"""
+本地字典索引模块
+把诊断/药品字典快照为按关键字排序的本地索引文件，按拼音首字母或名称前缀离线查询
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import string
+import threading
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 字典表配置：查询字段（拼音首字母）、排序字段（ID）、名称字段
+DICT_TABLES = {
+    'dict_diag': {
+        'search_field': 'diag_pym',
+        'order_field': 'diag_id',
+        'name_field': 'diag_name',
+    },
+    'dict_drug': {
+        'search_field': 'drug_pym',
+        'order_field': 'drug_id',
+        'name_field': 'drug_name',
+    },
+}
+
+
+def normalize_index_key(text: Any) -> str:
+    """
+    规范化索引关键字（全角转半角、去除空白、小写）
+
+    Args:
+        text: 拼音首字母或名称
+
+    Returns:
+        规范化后的关键字
+    """
+    text = unicodedata.normalize("NFKC", str(text))
+    return re.sub(r"\s+", "", text).lower()
+
+
+class _TableIndex:
+    """单个字典表的索引文件（首次查询时才映射到内存）"""
+
+    def __init__(self, index_path: Path, offsets_path: Path):
+        self.index_path = index_path
+        self.offsets_path = offsets_path
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._offsets: Optional[array] = None
+        self._load_lock = threading.Lock()  # 多个工作线程可能同时首次查询
+
+    def _load(self) -> None:
+        """映射索引文件并读取行偏移表（偏移表读完后才设置 _mm，其他线程不会看到未加载完的索引）"""
+        with self._load_lock:
+            if self._mm is not None:
+                return
+            offsets = array('Q')
+            with open(self.offsets_path, 'rb') as f:
+                offsets.frombytes(f.read())
+            self._file = open(self.index_path, 'rb')
+            self._offsets = offsets
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        logger.info(f"已加载字典索引: {self.index_path}（{len(self._offsets)} 条）")
+
+    def _key_at(self, i: int) -> bytes:
+        start = self._offsets[i]
+        return self._mm[start:self._mm.find(b'\t', start)]
+
+    def _record_at(self, i: int) -> Dict[str, Any]:
+        start = self._offsets[i]
+        tab = self._mm.find(b'\t', start)
+        end = self._mm.find(b'\n', tab)
+        return json.loads(self._mm[tab + 1:end])
+
+    def prefix_search(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        查询关键字以 prefix 开头的记录
+
+        Args:
+            prefix: 规范化后的前缀
+            limit: 最多返回的记录数（按关键字匹配数计）
+
+        Returns:
+            匹配的记录列表（可能包含重复记录）
+        """
+        if self._mm is None:
+            self._load()
+
+        target = prefix.encode('utf-8')
+        lo, hi = 0, len(self._offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        records = []
+        i = lo
+        while i < len(self._offsets) and len(records) < limit and self._key_at(i).startswith(target):
+            records.append(self._record_at(i))
+            i += 1
+        return records
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+
+class DictIndex:
+    """本地字典索引（诊断/药品）"""
+
+    def __init__(self, index_dir: str = "cache/dict_index", limit: int = 50):
+        """
+        初始化本地字典索引
+
+        Args:
+            index_dir: 索引文件目录
+            limit: 单次查询最多返回的记录数
+        """
+        self.index_dir = Path(index_dir)
+        self.limit = limit
+        self._tables: Dict[str, Optional[_TableIndex]] = {}
+
+    def _table(self, dict_table: str) -> Optional[_TableIndex]:
+        """获取字典表索引，索引文件不存在时返回 None"""
+        if dict_table not in self._tables:
+            index_path = self.index_dir / f"{dict_table}.idx"
+            offsets_path = self.index_dir / f"{dict_table}.off"
+            if index_path.exists() and offsets_path.exists():
+                self._tables[dict_table] = _TableIndex(index_path, offsets_path)
+            else:
+                logger.debug(f"本地字典索引不存在: {index_path}")
+                self._tables[dict_table] = None
+        return self._tables[dict_table]
+
+    def search(self, dict_table: str, keyword: str) -> List[Dict[str, Any]]:
+        """
+        按拼音首字母或名称前缀查询字典
+
+        Args:
+            dict_table: 字典表名（dict_diag / dict_drug）
+            keyword: 查询关键词
+
+        Returns:
+            匹配的字典记录，按 ID 排序（与接口 order_field 一致）；索引不存在或未命中时返回空列表
+        """
+        table = self._table(dict_table)
+        prefix = normalize_index_key(keyword)
+        if table is None or not prefix:
+            return []
+
+        order_field = DICT_TABLES[dict_table]['order_field']
+        unique = {}
+        for record in table.prefix_search(prefix, self.limit * 2):
+            unique.setdefault(str(record.get(order_field)), record)
+
+        results = list(unique.values())
+        results.sort(key=lambda r: _order_key(r.get(order_field)))
+        return results[:self.limit]
+
+    def close(self) -> None:
+        """释放已映射的索引文件"""
+        for table in self._tables.values():
+            if table is not None:
+                table.close()
+        self._tables.clear()
+
+    @staticmethod
+    def build(index_dir: str, dict_table: str, records: List[Dict[str, Any]]) -> int:
+        """
+        根据字典记录生成索引文件（同时以拼音首字母和名称作为关键字）
+
+        Args:
+            index_dir: 索引文件目录
+            dict_table: 字典表名
+            records: 字典记录列表
+
+        Returns:
+            写入的关键字条数
+        """
+        table_config = DICT_TABLES[dict_table]
+        entries = []
+        for record in records:
+            payload = json.dumps(record, ensure_ascii=False)
+            keys = {
+                normalize_index_key(record.get(table_config['search_field']) or ''),
+                normalize_index_key(record.get(table_config['name_field']) or ''),
+            }
+            for key in keys:
+                if key:
+                    entries.append((key.encode('utf-8'), payload.encode('utf-8')))
+
+        # UTF-8 字节序与码点顺序一致，查询时按字节二分即可
+        entries.sort(key=lambda entry: entry[0])
+
+        directory = Path(index_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        index_path = directory / f"{dict_table}.idx"
+        offsets_path = directory / f"{dict_table}.off"
+
+        offsets = array('Q')
+        position = 0
+        with open(f"{index_path}.tmp", 'wb') as f:
+            for key, payload in entries:
+                line = key + b'\t' + payload + b'\n'
+                offsets.append(position)
+                f.write(line)
+                position += len(line)
+        with open(f"{offsets_path}.tmp", 'wb') as f:
+            f.write(offsets.tobytes())
+
+        # 先替换偏移表再替换索引，任一失败都不会留下不匹配的组合被加载
+        os.replace(f"{offsets_path}.tmp", offsets_path)
+        os.replace(f"{index_path}.tmp", index_path)
+
+        logger.info(f"已生成字典索引: {index_path}（{len(records)} 条记录，{len(entries)} 个关键字）")
+        return len(entries)
+
+
+def _order_key(value: Any):
+    """ID 排序键：数字按数值排序，其余按字符串排序"""
+    try:
+        return (0, int(value), '')
+    except (TypeError, ValueError):
+        return (1, 0, str(value))
+
+
+def snapshot_dict_table(
+    query: Callable[[str], List[Dict[str, Any]]],
+    dict_table: str,
+    result_limit: int = 100,
+    max_prefix_length: int = 3,
+    interval: float = 0.0
+) -> List[Dict[str, Any]]:
+    """
+    按拼音首字母前缀遍历字典接口，抓取整张字典表
+
+    接口没有"全量导出"，因此依次查询 a-z、0-9 前缀；当某个前缀返回条数达到 result_limit
+    （可能被接口截断）时，再细分为更长的前缀继续查询。
+
+    Args:
+        query: 查询函数，参数为关键词，返回字典记录列表
+        dict_table: 字典表名
+        result_limit: 接口单次返回条数上限
+        max_prefix_length: 最长细分前缀长度
+        interval: 每次请求之间的间隔（秒），避免对服务器造成压力
+
+    Returns:
+        去重后的全部字典记录
+    """
+    order_field = DICT_TABLES[dict_table]['order_field']
+    alphabet = string.ascii_lowercase + string.digits
+    records: Dict[str, Dict[str, Any]] = {}
+    pending = list(alphabet)
+    request_count = 0
+    truncated: List[str] = []  # 已达到最长前缀仍返回 result_limit 条的前缀，其余记录未能抓取
+
+    while pending:
+        prefix = pending.pop(0)
+        results = query(prefix) or []
+        request_count += 1
+        for record in results:
+            records.setdefault(str(record.get(order_field)), record)
+
+        if len(results) >= result_limit:
+            if len(prefix) < max_prefix_length:
+                pending.extend(prefix + ch for ch in alphabet)
+            else:
+                truncated.append(prefix)
+                logger.warning(f"字典 {dict_table} 前缀 '{prefix}' 返回 {len(results)} 条，已达最长前缀长度，结果可能被截断")
+
+        if interval:
+            time.sleep(interval)
+
+    logger.info(f"字典 {dict_table} 快照完成：{request_count} 次请求，{len(records)} 条记录")
+    if truncated:
+        logger.warning(
+            f"字典 {dict_table} 快照不完整：{len(truncated)} 个前缀的结果被截断（{', '.join(truncated)}），"
+            f"可增大 dict_index.snapshot.max_prefix_length 后重新生成"
+        )
+    return list(records.values())
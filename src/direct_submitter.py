@@ -0,0 +1,175 @@
+"""
+直接提交模块
+按 form_elements 配置把一行数据组装成与页面 saveOutpatient 相同的表单参数，
+使用已登录的 HTTP 会话直接提交，不经过浏览器逐个填写
+"""
+
+import logging
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from session_bridge import SessionBridge, SessionExpiredError
+
+logger = logging.getLogger(__name__)
+
+
+class DirectSubmitError(Exception):
+    """直接提交失败"""
+
+    def __init__(self, message: str, fallback: bool = True):
+        """
+        Args:
+            message: 错误信息
+            fallback: 是否可以安全地改用浏览器重新提交（请求可能已被服务器处理时为 False，避免重复录入）
+        """
+        super().__init__(message)
+        self.fallback = fallback
+
+
+class DirectSubmitter:
+    """表单直接提交器"""
+
+    # 不作为请求参数的元素类型
+    SKIP_TYPES = ("button",)
+
+    def __init__(self, session_bridge: SessionBridge, url: str, timeout: float = 10,
+                 extra_fields: Optional[Dict[str, Any]] = None, success_pattern: Optional[str] = None,
+                 failure_pattern: Optional[str] = None):
+        """
+        初始化直接提交器
+
+        Args:
+            session_bridge: 已同步浏览器 Cookie 的会话桥
+            url: 表单保存接口地址
+            timeout: 请求超时时间（秒）
+            extra_fields: 页面上固定提交的字段（如隐藏字段），优先级低于表单字段
+            success_pattern: 响应内容需匹配的正则，为空时仅检查 HTTP 状态码
+            failure_pattern: 明确表示未保存的响应内容正则，匹配时才回退到浏览器提交
+        """
+        self.session_bridge = session_bridge
+        self.url = url
+        self.timeout = timeout
+        self.extra_fields = {k: '' if v is None else str(v) for k, v in (extra_fields or {}).items()}
+        self.success_pattern = re.compile(success_pattern) if success_pattern else None
+        self.failure_pattern = re.compile(failure_pattern) if failure_pattern else None
+        self.select_options: Optional[Dict[str, Dict[str, str]]] = None  # {字段名: {选项文本: 选项值}}
+        self.submit_count = 0
+
+    @staticmethod
+    def connection_not_established(error: requests.RequestException) -> bool:
+        """
+        判断请求是否在建立连接阶段就失败（请求一定没有发出，可以安全地改用浏览器提交）
+
+        requests.ConnectionError 也包装了发送后连接被中断（Connection aborted、RemoteDisconnected），
+        此时服务器可能已经收到完整请求，只有连接超时、无法建立连接（含域名解析失败）才算未发出
+
+        Args:
+            error: 请求异常
+
+        Returns:
+            True 如果连接未建立
+        """
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = error.args[0] if error.args else None
+        reason = getattr(reason, "reason", reason)  # 重试耗尽时 urllib3 包装为 MaxRetryError
+        return isinstance(reason, NewConnectionError)
+
+    @staticmethod
+    def param_name(config: Dict) -> Optional[str]:
+        """
+        获取元素对应的请求参数名（配置了 param 时优先使用，否则使用 id/name 定位值）
+
+        Args:
+            config: 元素配置
+
+        Returns:
+            参数名，无法确定时返回 None
+        """
+        if config.get("param"):
+            return config["param"]
+        if config.get("locator", "id") in ("id", "name"):
+            return config.get("value")
+        return None
+
+    def _param_value(self, field_name: str, field_value: Any, config: Dict) -> str:
+        """按元素类型把字段值转换为提交值（单选框、下拉框转换为选项值）"""
+        value = str(field_value)
+        element_type = config.get("type", "input")
+
+        if element_type in ("radio", "select"):
+            options = config.get("options", {})
+            if value in options:
+                return str(options[value])
+            page_options = (self.select_options or {}).get(field_name, {})
+            if value not in page_options.values() and value in page_options:
+                return page_options[value]
+        return value
+
+    def build_payload(self, fields: List[Tuple[str, Any, Dict]]) -> Dict[str, str]:
+        """
+        组装提交参数
+
+        Args:
+            fields: [(字段名, 字段值, 元素配置), ...]，与浏览器填写使用同一份字段列表
+
+        Returns:
+            表单参数字典
+
+        Raises:
+            DirectSubmitError: 字段无法映射为请求参数
+        """
+        payload = dict(self.extra_fields)
+        for field_name, field_value, config in fields:
+            if config.get("type", "input") in self.SKIP_TYPES:
+                continue
+            param = self.param_name(config)
+            if not param:
+                raise DirectSubmitError(f"字段 {field_name} 无法确定请求参数名，请在配置中添加 param")
+            payload[param] = self._param_value(field_name, field_value, config)
+        return payload
+
+    def submit(self, fields: List[Tuple[str, Any, Dict]]) -> str:
+        """
+        直接提交表单
+
+        Args:
+            fields: [(字段名, 字段值, 元素配置), ...]
+
+        Returns:
+            响应内容
+
+        Raises:
+            DirectSubmitError: 提交失败
+        """
+        payload = self.build_payload(fields)
+        logger.debug(f"直接提交表单: {payload}")
+
+        try:
+            response = self.session_bridge.call(self.session_bridge.post, self.url, data=payload, timeout=self.timeout)
+        except SessionExpiredError:
+            # 会话失效的请求被重定向到登录页或返回 401，服务器没有保存
+            raise DirectSubmitError("会话已失效")
+        except requests.RequestException as e:
+            if self.connection_not_established(e):
+                # 连接未建立，服务器一定没有处理该请求
+                raise DirectSubmitError(f"连接失败: {e}")
+            # 请求已发出（或可能已发出）但未收到响应，服务器可能已经保存
+            raise DirectSubmitError(f"请求失败，服务器可能已保存: {e}", fallback=False)
+
+        if response.status_code >= 500:
+            raise DirectSubmitError(f"服务器错误 HTTP {response.status_code}，服务器可能已保存", fallback=False)
+        if response.status_code >= 400:
+            raise DirectSubmitError(f"HTTP {response.status_code}")
+        if self.failure_pattern and self.failure_pattern.search(response.text):
+            # 服务器明确答复未保存
+            raise DirectSubmitError(f"服务器未保存: {response.text[:200]}")
+        if self.success_pattern and not self.success_pattern.search(response.text):
+            # 服务器已处理请求但响应无法确认结果，可能已经保存
+            raise DirectSubmitError(f"响应不符合成功条件，服务器可能已保存: {response.text[:200]}", fallback=False)
+
+        self.submit_count += 1
+        return response.text
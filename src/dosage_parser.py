@@ -0,0 +1,155 @@
+"""
+用法用量解析模块
+对一批数据的 用法用量、规格、数量 列做向量化解析（pandas str.extract），一次得到单次剂量、用法频率和总用量，
+逐行填写时只需按行号取值；无法解析的行汇总成报告，在填写前输出
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# 单次剂量和单位，例如: "100mg", "0.25g", "1片"
+DOSE_PATTERN = re.compile(r'(\d+\.?\d*)\s*(mg|g|克|毫克|片|粒|支|包|袋|瓶|ml|毫升|滴|万单位)', re.IGNORECASE)
+# 用法频率，支持: qd, bid, tid, qid, q2h, q4h, q6h, q8h, q12h, qn (每晚)
+FREQUENCY_PATTERN = re.compile(r'\b(qd|bid|tid|qid|q2h|q4h|q6h|q8h|q12h|qn|st|即刻|1日|2日|3日|4日|每晚)\b', re.IGNORECASE)
+# 数量的值与单位（从开头匹配），例如 "2.00 盒"
+QUANTITY_PATTERN = re.compile(r'^(\d+\.?\d*)\s*(个|盒|瓶|支|片|粒|包|袋|箱|克|g|mg|毫克|ml|毫升)?')
+# 规格中的基础含量与单位，例如 "50mg*12" 中的 "50mg"
+SPEC_BASE_PATTERN = re.compile(r'(\d+\.?\d*)\s*(mg|g|毫克|克|ml|毫升)')
+# 规格中的包装内单位数量，例如 "50mg*12"、"0.25g×12片" 中的 12
+SPEC_MULTIPLIER_PATTERN = re.compile(r'[x×*]\s*(\d+)')
+# 无法按规格计算时，直接使用数量作为总用量（单位集合与规格计算不同，沿用原有规则）
+QUANTITY_FALLBACK_PATTERN = re.compile(r'^(\d+\.?\d*)\s*(个|盒|瓶|支|片|粒|包|袋|克|g|mg|毫克)?')
+
+PACKAGE_UNITS = ['盒', '瓶', '包', '袋', '箱']
+DIRECT_UNITS = ['片', '粒', '支', '个', '']
+MASS_UNITS = {'克': 'g', 'g': 'g', '毫克': 'mg', 'mg': 'mg', '毫升': 'ml', 'ml': 'ml'}
+
+RESULT_COLUMNS = ['dose_value', 'dose_unit', 'frequency', 'total_amount', 'total_unit']
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """转换为去除首尾空白的字符串列，空值为空字符串"""
+    return series.where(series.notna(), '').astype(str).str.strip()
+
+
+def _format_amount(value: float) -> str:
+    """总用量保留最多两位小数（去除无意义的 .0）"""
+    if abs(value - round(value)) < 1e-9:
+        return str(int(round(value)))
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def parse_dosage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    向量化解析用法用量、规格和数量
+
+    Args:
+        df: 包含 dosage（用法用量）、spec（规格）、quantity（数量）列的 DataFrame，
+            各列在解析前统一去除首尾空白，调用方无需预先处理
+
+    Returns:
+        与 df 索引一致的 DataFrame，包含 dose_value、dose_unit、frequency、total_amount、total_unit 列（无法解析为空字符串）
+    """
+    dosage = _text(df['dosage'])
+    spec_raw = _text(df['spec'])
+    quantity_raw = _text(df['quantity'])
+
+    result = pd.DataFrame(index=df.index)
+
+    # 1. 单次剂量与频率
+    dose = dosage.str.extract(DOSE_PATTERN)
+    result['dose_value'] = dose[0].fillna('')
+    result['dose_unit'] = dose[1].fillna('').str.lower()
+    result['frequency'] = dosage.str.extract(FREQUENCY_PATTERN)[0].fillna('').str.lower()
+
+    # 2. 总用量 = 规格中每单位含量 × 包装内单位数量 × 购买数量
+    spec = spec_raw.str.lower()
+    quantity = quantity_raw.str.lower()
+    qty = quantity.str.extract(QUANTITY_PATTERN)
+    qty_value = pd.to_numeric(qty[0], errors='coerce')
+    qty_unit = qty[1].fillna('')
+    base = spec.str.extract(SPEC_BASE_PATTERN)
+    base_value = pd.to_numeric(base[0], errors='coerce')
+    base_unit = base[1].fillna('')
+    pieces_per_pkg = pd.to_numeric(spec.str.extract(SPEC_MULTIPLIER_PATTERN)[0], errors='coerce').fillna(1)
+
+    computable = (spec != '') & (quantity != '') & qty_value.notna() & base_value.notna()
+    is_mass_qty = computable & qty_unit.isin(list(MASS_UNITS))
+    total_pieces = pd.Series(
+        np.select(
+            [qty_unit.isin(PACKAGE_UNITS), qty_unit.isin(DIRECT_UNITS)],
+            [qty_value * pieces_per_pkg, qty_value],
+            default=np.nan
+        ),
+        index=df.index
+    )
+    is_spec_total = computable & ~is_mass_qty & total_pieces.notna()
+
+    total_amount = pd.Series('', index=df.index, dtype=object)
+    total_unit = pd.Series('', index=df.index, dtype=object)
+    # 数量本身是质量或体积（克/g/mg/ml）时，直接作为总量
+    total_amount[is_mass_qty] = qty_value[is_mass_qty].astype(str)
+    total_unit[is_mass_qty] = qty_unit[is_mass_qty].map(MASS_UNITS)
+    spec_total = base_value[is_spec_total] * total_pieces[is_spec_total]
+    total_amount[is_spec_total] = spec_total.map(_format_amount)
+    total_unit[is_spec_total] = base_unit[is_spec_total].map(MASS_UNITS).fillna('')
+
+    # 3. 无法按规格计算时回退到数量，再回退到单次剂量
+    fallback = quantity_raw.str.extract(QUANTITY_FALLBACK_PATTERN)
+    use_quantity = (total_amount == '') & fallback[0].notna()
+    total_amount[use_quantity] = fallback[0][use_quantity]
+    has_unit = use_quantity & fallback[1].notna()
+    total_unit[has_unit] = fallback[1][has_unit]
+
+    use_dose = (total_amount == '') & (result['dose_value'] != '')
+    total_amount[use_dose] = result['dose_value'][use_dose]
+    total_unit[use_dose] = result['dose_unit'][use_dose]
+
+    result['total_amount'] = total_amount
+    result['total_unit'] = total_unit
+    return result
+
+
+def parse_dosages(rows: List[Dict[str, Optional[str]]]) -> List[Dict[str, str]]:
+    """
+    解析一批行的用法用量
+
+    Args:
+        rows: 每行的 {'dosage': ..., 'spec': ..., 'quantity': ...}（值可为 None 或带首尾空白）
+
+    Returns:
+        与 rows 顺序一致的解析结果列表
+    """
+    if not rows:
+        return []
+    df = pd.DataFrame(rows, columns=['dosage', 'spec', 'quantity'])
+    return parse_dosage_frame(df)[RESULT_COLUMNS].to_dict('records')
+
+
+def dosage_issues(source: Dict[str, Optional[str]], parsed: Dict[str, str]) -> List[str]:
+    """
+    检查一行的解析结果，列出无法解析的内容
+
+    Args:
+        source: 该行的 {'dosage': ..., 'spec': ..., 'quantity': ...}
+        parsed: parse_dosages() 的解析结果
+
+    Returns:
+        问题描述列表，没有问题时为空列表
+    """
+    issues = []
+    if source.get('dosage'):
+        if not parsed['dose_value']:
+            issues.append(f"用法用量无法解析剂量: {source['dosage']}")
+        if not parsed['frequency']:
+            issues.append(f"用法用量无法解析频率: {source['dosage']}")
+    if (source.get('spec') or source.get('quantity')) and not parsed['total_amount']:
+        issues.append(f"无法计算总用量: 规格={source.get('spec')}, 数量={source.get('quantity')}")
+    return issues
@@ -2,28 +2,110 @@
 浏览器驱动管理模块
 """
 
+import json
 import logging
+import os
+import platform
+import sys
+import threading
 from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.selenium_manager import SeleniumManager
 
 logger = logging.getLogger(__name__)
 
+# 项目目录中各平台的 ChromeDriver（Chrome for Testing 的压缩包解压后的目录结构）
+BUNDLED_DRIVERS = {
+    ("win32", ""): "chromedriver-win64/chromedriver.exe",
+    ("linux", ""): "chromedriver-linux64/chromedriver",
+    ("darwin", "arm64"): "chromedriver-mac-arm64/chromedriver",
+    ("darwin", ""): "chromedriver-mac-x64/chromedriver",
+}
+
+# 精简模式下默认屏蔽的资源（CDP Network.setBlockedURLs 通配符）：图片、字体、音视频和统计脚本
+DEFAULT_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.bmp", "*.ico", "*.webp", "*.svg",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp3", "*.mp4", "*.webm", "*.ogg", "*.wav", "*.flv",
+    "*google-analytics.com*", "*googletagmanager.com*", "*hm.baidu.com*", "*cnzz.com*", "*51.la*",
+]
+
+# 精简模式下的 Chrome 启动参数：关闭扩展、后台联网和首次运行流程
+LEAN_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--blink-settings=imagesEnabled=false",
+]
+
+# 当前页面的加载耗时和资源统计（Navigation Timing / Resource Timing）
+_PAGE_LOAD_STATS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? nav.transferSize : 0;
+for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+return {
+    load_ms: nav && nav.loadEventEnd > 0 ? nav.loadEventEnd - nav.startTime : null,
+    dom_ready_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+    resources: resources.length,
+    transfer_kb: bytes / 1024
+};
+"""
+
+# 页面 load 事件是否已处理完（readyState 为 complete 后 loadEventEnd 才会写入）
+_PAGE_LOADED_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+return document.readyState === 'complete' && !!nav && nav.loadEventEnd > 0;
+"""
+
 
 class DriverManager:
     """浏览器驱动管理器"""
 
-    def __init__(self, headless: bool = False, window_size: str = "1920,1080"):
+    # normal: 等待全部子资源加载完成；eager: DOM 就绪即返回；none: 导航开始后立即返回
+    PAGE_LOAD_STRATEGIES = ("normal", "eager", "none")
+
+    # 多个浏览器同时启动时，驱动查找和缓存读写只进行一次
+    _resolve_lock = threading.Lock()
+
+    def __init__(self, headless: bool = False, window_size: str = "1920,1080", user_data_dir: Optional[str] = None,
+                 lean: bool = False, blocked_urls: Optional[List[str]] = None,
+                 page_load_strategy: str = "normal", performance_log: bool = False,
+                 driver_path: Optional[str] = None, driver_cache: Optional[str] = None):
         """
         初始化驱动管理器
 
         Args:
             headless: 是否无头模式
             window_size: 浏览器窗口大小
+            user_data_dir: Chrome 用户数据目录（可选，保留登录状态；同一目录不能被两个浏览器同时使用）
+            lean: 是否启用精简模式（不加载图片、字体、音视频和统计脚本，关闭扩展和后台联网）
+            blocked_urls: 精简模式下屏蔽的 URL 通配符，为 None 时使用 DEFAULT_BLOCKED_URLS
+            page_load_strategy: 页面加载策略（normal/eager/none），影响 driver.get 和点击跳转时阻塞多久
+            performance_log: 是否开启性能日志（PageWaiter 据此读取 CDP Network 事件判断网络空闲）
+            driver_path: 指定的 ChromeDriver 路径（可选，优先使用）
+            driver_cache: Selenium Manager 查找结果的缓存文件（可选，缓存后启动时不再查找，离线也可使用）
+
+        Raises:
+            ValueError: 不支持的页面加载策略
         """
+        if page_load_strategy not in self.PAGE_LOAD_STRATEGIES:
+            raise ValueError(f"不支持的页面加载策略: {page_load_strategy}（可选 {'/'.join(self.PAGE_LOAD_STRATEGIES)}）")
         self.headless = headless
         self.window_size = window_size
+        self.user_data_dir = user_data_dir
+        self.lean = lean
+        self.blocked_urls = list(DEFAULT_BLOCKED_URLS if blocked_urls is None else blocked_urls)
+        self.page_load_strategy = page_load_strategy
+        self.performance_log = performance_log
+        self.driver_path = driver_path
+        self.driver_cache = Path(driver_cache) if driver_cache else None
         self.driver = None
 
     def create_driver(self) -> webdriver.Chrome:
@@ -34,26 +116,14 @@ class DriverManager:
             配置好的 Chrome WebDriver 实例
 
         Raises:
-            FileNotFoundError: 找不到 chromedriver.exe
+            FileNotFoundError: 找不到 ChromeDriver
             Exception: 启动驱动失败
         """
-        # 查找 chromedriver.exe
-        project_root = Path(__file__).parent.parent
-        driver_path = project_root / "chromedriver-win64" / "chromedriver.exe"
-
-        if not driver_path.exists():
-            raise FileNotFoundError(
-                f"找不到 ChromeDriver: {driver_path}\n"
-                f"请将 chromedriver.exe 放到项目目录"
-            )
-
-        logger.info(f"使用 ChromeDriver: {driver_path}")
-
         # 配置 Chrome 选项
         chrome_options = Options()
 
         if self.headless:
-            chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--headless=new")
             logger.info("启用无头模式")
 
         chrome_options.add_argument(f"--window-size={self.window_size}")
@@ -61,19 +131,199 @@ class DriverManager:
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
 
+        if self.user_data_dir:
+            profile_dir = Path(self.user_data_dir).absolute()
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+            logger.info(f"使用浏览器用户数据目录: {profile_dir}")
+
+        if self.lean:
+            for argument in LEAN_ARGUMENTS:
+                chrome_options.add_argument(argument)
+            # 2 = 禁止加载图片
+            chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+            logger.info("启用精简模式（不加载图片、字体、音视频和统计脚本）")
+
+        chrome_options.page_load_strategy = self.page_load_strategy
+        if self.page_load_strategy != "normal":
+            logger.info(f"页面加载策略: {self.page_load_strategy}")
+        if self.performance_log:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
         # 禁用自动化提示
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
 
+        with self._resolve_lock:
+            driver_path, source = self.resolve_driver(chrome_options)
+        logger.info(f"使用 ChromeDriver（{source}）: {driver_path}")
+
+        try:
+            self.driver = webdriver.Chrome(service=Service(str(driver_path)), options=chrome_options)
+        except Exception as e:
+            if source != "缓存":
+                logger.error(f"启动 ChromeDriver 失败: {e}")
+                raise
+            # 浏览器升级后缓存的驱动可能不再匹配，清除缓存后重新查找一次
+            logger.warning(f"使用缓存的 ChromeDriver 启动失败，重新查找驱动: {e}")
+            with self._resolve_lock:
+                self._clear_cache()
+                chrome_options.binary_location = ""
+                driver_path, source = self.resolve_driver(chrome_options)
+            try:
+                self.driver = webdriver.Chrome(service=Service(str(driver_path)), options=chrome_options)
+            except Exception as retry_error:
+                logger.error(f"启动 ChromeDriver 失败: {retry_error}")
+                raise
+
+        browser_version = self.driver.capabilities.get("browserVersion", "")
+        logger.info(f"ChromeDriver 启动成功（Chrome {browser_version}）")
+        if source == "Selenium Manager":
+            with self._resolve_lock:
+                self._save_cache(driver_path, chrome_options.binary_location, browser_version)
+
+        if self.lean and self.blocked_urls:
+            self._block_urls()
+        return self.driver
+
+    def resolve_driver(self, chrome_options: Options) -> Tuple[str, str]:
+        """
+        查找 ChromeDriver：依次使用指定路径、项目目录中当前平台的驱动、缓存的 Selenium Manager 结果，最后调用 Selenium Manager
+
+        Args:
+            chrome_options: Chrome 选项（使用缓存或 Selenium Manager 结果时会设置浏览器路径）
+
+        Returns:
+            (驱动路径, 来源说明)
+
+        Raises:
+            FileNotFoundError: 找不到 ChromeDriver
+        """
+        if self.driver_path:
+            if not Path(self.driver_path).exists():
+                raise FileNotFoundError(f"找不到配置的 ChromeDriver: {self.driver_path}")
+            return self.driver_path, "配置路径"
+
+        bundled = self.bundled_driver_path()
+        if bundled and bundled.exists():
+            return str(bundled), "项目目录"
+
+        cached = self._load_cache()
+        if cached:
+            if cached.get("browser_path"):
+                chrome_options.binary_location = cached["browser_path"]
+            return cached["driver_path"], "缓存"
+
+        logger.info("项目目录中没有当前平台的 ChromeDriver，通过 Selenium Manager 查找（首次可能需要联网下载）...")
+        try:
+            driver_path = SeleniumManager().driver_location(chrome_options)
+        except Exception as e:
+            raise FileNotFoundError(
+                f"找不到 ChromeDriver: {e}\n"
+                f"请将 ChromeDriver 放到项目目录的 {bundled.parent.name if bundled else 'chromedriver'}/ 中，"
+                f"或在配置文件中设置 browser.driver_path"
+            ) from e
+        return driver_path, "Selenium Manager"
+
+    @staticmethod
+    def bundled_driver_path() -> Optional[Path]:
+        """
+        项目目录中当前平台的 ChromeDriver 路径
+
+        Returns:
+            驱动路径（不检查是否存在），不支持的平台返回 None
+        """
+        system = "linux" if sys.platform.startswith("linux") else sys.platform
+        machine = platform.machine().lower()
+        relative = BUNDLED_DRIVERS.get((system, machine)) or BUNDLED_DRIVERS.get((system, ""))
+        if not relative:
+            return None
+        return Path(__file__).parent.parent / relative
+
+    @staticmethod
+    def _platform_key() -> str:
+        """缓存对应的平台（同一个项目目录可能在 Windows 和 Linux 上共用）"""
+        return f"{sys.platform}-{platform.machine().lower()}"
+
+    def _load_cache(self) -> Optional[Dict[str, str]]:
+        """读取缓存的驱动查找结果；缓存不存在、平台不同或驱动文件已删除时返回 None"""
+        if not self.driver_cache or not self.driver_cache.exists():
+            return None
+        try:
+            with open(self.driver_cache, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取驱动缓存失败: {e}")
+            return None
+
+        if cached.get("platform") != self._platform_key():
+            return None
+        if not cached.get("driver_path") or not Path(cached["driver_path"]).exists():
+            logger.info("缓存的 ChromeDriver 已不存在，重新查找")
+            return None
+        if cached.get("browser_path") and not Path(cached["browser_path"]).exists():
+            logger.info("缓存的 Chrome 浏览器已不存在，重新查找")
+            return None
+        return cached
+
+    def _save_cache(self, driver_path: str, browser_path: str, browser_version: str) -> None:
+        """保存驱动查找结果，之后启动时直接使用"""
+        if not self.driver_cache:
+            return
         try:
-            service = Service(str(driver_path))
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            logger.info("ChromeDriver 启动成功")
-            return self.driver
+            self.driver_cache.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.driver_cache.with_name(f"{self.driver_cache.name}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "platform": self._platform_key(),
+                    "driver_path": str(driver_path),
+                    "browser_path": browser_path or "",
+                    "browser_version": browser_version,
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.driver_cache)
+            logger.info(f"已缓存 ChromeDriver 查找结果: {self.driver_cache}")
+        except OSError as e:
+            logger.warning(f"保存驱动缓存失败: {e}")
 
+    def _clear_cache(self) -> None:
+        """删除驱动缓存"""
+        if self.driver_cache and self.driver_cache.exists():
+            self.driver_cache.unlink()
+
+    def _block_urls(self) -> None:
+        """通过 CDP 屏蔽 blocked_urls 中的请求（对之后的所有页面生效）"""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls})
+            logger.debug(f"已屏蔽 {len(self.blocked_urls)} 类资源请求")
         except Exception as e:
-            logger.error(f"启动 ChromeDriver 失败: {e}")
-            raise
+            logger.warning(f"屏蔽资源请求失败，精简模式只禁用图片: {e}")
+
+    @staticmethod
+    def page_load_stats(driver) -> Dict[str, Any]:
+        """
+        读取当前页面的加载耗时和资源统计
+
+        Args:
+            driver: WebDriver 实例
+
+        Returns:
+            {'load_ms': 加载完成耗时, 'dom_ready_ms': DOMContentLoaded 耗时, 'resources': 资源数, 'transfer_kb': 传输量}
+        """
+        return driver.execute_script(_PAGE_LOAD_STATS_SCRIPT)
+
+    @staticmethod
+    def page_loaded(driver) -> bool:
+        """
+        当前页面是否已完整加载（load 事件已结束，page_load_stats 的 load_ms 可用）
+
+        Args:
+            driver: WebDriver 实例
+
+        Returns:
+            True 如果已加载完成
+        """
+        return bool(driver.execute_script(_PAGE_LOADED_SCRIPT))
 
     def quit_driver(self) -> None:
         """关闭浏览器驱动"""
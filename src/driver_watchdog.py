@@ -0,0 +1,137 @@
+"""
+浏览器看门狗模块
+处理每行数据前后通过心跳检查浏览器会话，浏览器崩溃或无响应时重新创建驱动、登录并导航到录入页面，
+避免之后的每一行都在失效的会话上等待超时
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from selenium.common.exceptions import UnexpectedAlertPresentException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+
+class DriverWatchdog:
+    """浏览器会话看门狗"""
+
+    def __init__(
+        self,
+        create_session: Callable[[], Any],
+        close_session: Callable[[Any], None],
+        driver_of: Callable[[Any], Any],
+        session: Any = None,
+        heartbeat_timeout: float = 5,
+        max_restarts: int = 3,
+        name: str = ""
+    ):
+        """
+        初始化看门狗
+
+        Args:
+            create_session: 创建会话的函数（启动浏览器、登录并导航到录入页面），返回会话对象
+            close_session: 关闭会话的函数
+            driver_of: 从会话对象中取出 WebDriver 的函数
+            session: 已创建的会话（可选，为 None 时立即调用 create_session 创建）
+            heartbeat_timeout: 心跳超时时间（秒），浏览器在此时间内没有响应视为无响应
+            max_restarts: 最多自动重启的次数，超过后不再重启
+            name: 会话名称（用于日志）
+        """
+        self.create_session = create_session
+        self.close_session = close_session
+        self.driver_of = driver_of
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_restarts = max_restarts
+        self.name = name
+        self.restarts = 0
+        self.session = session if session is not None else create_session()
+
+    def heartbeat(self) -> bool:
+        """
+        检查浏览器是否仍可响应（在后台线程中执行一条脚本，浏览器卡死时不会阻塞调用方）
+
+        Returns:
+            True 如果浏览器在 heartbeat_timeout 内正常响应（有未处理的 Alert 也视为正常）
+        """
+        driver = self.driver_of(self.session)
+        if driver is None:
+            return False
+
+        outcome = {}
+
+        def probe():
+            try:
+                driver.execute_script("return 1")
+                outcome['alive'] = True
+            except UnexpectedAlertPresentException:
+                outcome['alive'] = True
+            except WebDriverException as e:
+                outcome['error'] = e
+                outcome['alive'] = False
+
+        thread = threading.Thread(target=probe, name=f"heartbeat-{self.name}", daemon=True)
+        thread.start()
+        thread.join(self.heartbeat_timeout)
+
+        if thread.is_alive():
+            logger.warning(f"{self.name}浏览器 {self.heartbeat_timeout} 秒内无响应")
+            return False
+        if not outcome.get('alive'):
+            logger.warning(f"{self.name}浏览器会话已失效: {str(outcome.get('error', '')).strip()[:200]}")
+            return False
+        return True
+
+    def ensure_alive(self) -> bool:
+        """
+        心跳检查失败时重启会话
+
+        Returns:
+            True 如果进行了重启
+
+        Raises:
+            RuntimeError: 已达到最大重启次数
+            创建会话时抛出的异常
+        """
+        if self.heartbeat():
+            return False
+        self.restart()
+        return True
+
+    def restart(self) -> None:
+        """
+        关闭当前会话并重新创建（重新启动浏览器、登录、选择月份并进入录入页面）
+
+        Raises:
+            RuntimeError: 已达到最大重启次数
+            创建会话时抛出的异常
+        """
+        if self.restarts >= self.max_restarts:
+            raise RuntimeError(f"{self.name}浏览器已自动重启 {self.restarts} 次，不再重启")
+
+        self.restarts += 1
+        logger.warning(f"{self.name}重启浏览器（第 {self.restarts} 次）...")
+        self._close_quietly(self.session)
+        self.session = self.create_session()
+        logger.info(f"{self.name}浏览器已重启并回到录入页面")
+
+    def close(self) -> None:
+        """关闭当前会话"""
+        self._close_quietly(self.session)
+
+    def _close_quietly(self, session: Optional[Any]) -> None:
+        """关闭会话；卡死的浏览器可能无法正常退出，最多等待 heartbeat_timeout 秒"""
+        if session is None:
+            return
+
+        def close():
+            try:
+                self.close_session(session)
+            except Exception as e:
+                logger.debug(f"关闭失效的浏览器会话失败: {e}")
+
+        thread = threading.Thread(target=close, name=f"close-{self.name}", daemon=True)
+        thread.start()
+        thread.join(self.heartbeat_timeout)
+        if thread.is_alive():
+            logger.warning(f"{self.name}失效的浏览器未能在 {self.heartbeat_timeout} 秒内关闭，继续重启")
@@ -0,0 +1,30 @@
+"""
+填写计划模块
+每行数据在进入浏览器之前先编译成不可变的填写计划：主表单字段、抗菌药有/无和详情页字段都已计算好，
+浏览器阶段只按计划执行，数据有问题的行在编译阶段就失败，不会提交
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Any, Tuple, Optional
+
+# (字段名/元素ID, 字段值, 元素配置)
+FieldStep = Tuple[str, Any, Dict]
+
+
+class PlanError(ValueError):
+    """行数据无法编译为填写计划"""
+
+
+@dataclass(frozen=True)
+class FillPlan:
+    """一行数据的填写计划"""
+
+    fields: Tuple[FieldStep, ...]  # 主表单字段，按填写顺序排列
+    antibiotic: Optional[str] = None  # 抗菌药有/无，为空时不处理抗菌药信息
+    detail_fields: Tuple[FieldStep, ...] = ()  # 抗菌药详情页字段（抗菌药为"有"时）
+    prescription_cost: str = ""  # 处方金额（直接保存详情时提交）
+
+    @property
+    def needs_detail(self) -> bool:
+        """是否需要录入抗菌药详细信息"""
+        return self.antibiotic == "有"
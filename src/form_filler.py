@@ -3,7 +3,6 @@
 """
 
 import logging
-import time
 import re
 import requests
 from typing import Dict, Any, List, Optional, Tuple
@@ -12,6 +11,18 @@ from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+from dict_cache import DictCache
+from session_bridge import SessionBridge
+from dict_index import DictIndex
+from match_ranker import select_best_match
+from dict_client import DictClient
+from page_waiter import PageWaiter
+from page_agent import PageAgent
+from direct_submitter import DirectSubmitter, DirectSubmitError
+from fill_plan import FillPlan, FieldStep, PlanError
+from dosage_parser import parse_dosages, dosage_issues
+from unit_registry import UnitRegistry
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,7 +40,13 @@ class FormFiller:
         "link_text": By.LINK_TEXT,
     }
 
-    def __init__(self, driver, form_elements: Dict, timeout: int = 30, antibiotic_config: Dict = None):
+    def __init__(self, driver, form_elements: Dict, timeout: int = 30, antibiotic_config: Dict = None,
+                 dict_cache: DictCache = None, session_bridge: SessionBridge = None,
+                 dict_index: DictIndex = None, dict_client: DictClient = None,
+                 page_waiter: PageWaiter = None, direct_submitter: DirectSubmitter = None,
+                 detail_submitter: DirectSubmitter = None, record_lock=None,
+                 unit_registry: UnitRegistry = None,
+                 prefetched: Dict[Tuple[str, str], Optional[Dict[str, str]]] = None):
         """
         初始化表单填写器
 
@@ -38,87 +55,116 @@ class FormFiller:
             form_elements: 表单元素配置
             timeout: 超时时间（秒）
             antibiotic_config: 抗菌药处理配置
+            dict_cache: 字典查询缓存（可选）
+            session_bridge: 浏览器 Cookie 同步桥（可选，为 None 时首次请求前自动同步）
+            dict_index: 本地字典索引（可选，命中时不请求接口）
+            dict_client: 字典查询客户端（可选，为 None 时使用默认参数创建）
+            page_waiter: 页面等待器（可选，为 None 时使用默认参数创建）
+            direct_submitter: 表单直接提交器（可选，为 None 时只通过浏览器填写提交）
+            detail_submitter: 抗菌药详情直接保存器（可选，为 None 时打开详情页填写）
+            record_lock: 多个浏览器共用结果表格时的互斥锁（可选），从提交到识别出新增记录期间持有
+            unit_registry: 详情页下拉框的单位/途径/频率映射（可选，为 None 时所有值都视为无法识别）
+            prefetched: 预取阶段解析的字典结果存储（可选，多个填写器传入同一个字典即可共用预取结果）
         """
         self.driver = driver
         self.form_elements = form_elements
         self.timeout = timeout
         self.wait = WebDriverWait(driver, timeout)
-        self.session = requests.Session()  # 用于API请求
+        self.waiter = page_waiter or PageWaiter(driver, timeout)
+        self.agent = PageAgent(driver)
+        self.session_bridge = session_bridge or SessionBridge(driver)
+        self.session = self.session_bridge.session  # 用于API请求
         self.antibiotic_config = antibiotic_config or {}
+        self.dict_cache = dict_cache
+        self.dict_index = dict_index
+        self.dict_client = dict_client or DictClient(self.session_bridge)
+        # 预取阶段解析的字典结果（含未找到）
+        self._prefetched: Dict[Tuple[str, str], Optional[Dict[str, str]]] = prefetched if prefetched is not None else {}
+        self._raw_results: Dict[Tuple[str, str], Any] = {}  # 预取阶段批量查询到的原始候选（或异常）
+        self._last_row_id: Optional[str] = None  # 提交前结果表格第一行的ID，用于判断新记录是否已出现
+        self.direct_submitter = direct_submitter
+        self.detail_submitter = detail_submitter
+        self._direct_submitted = False  # 当前行是否通过接口直接提交（浏览器页面尚未刷新）
+        self.submit_started = False  # 当前行是否已发出提交（之后浏览器异常时服务器可能已保存，不能自动重试）
+        self.record_lock = record_lock
+        self.unit_registry = unit_registry or UnitRegistry({})
+        self.dosage_issue_count = 0  # 用法用量解析报告中的问题数
+        self._holding_record_lock = False
+
+    def _acquire_record_lock(self) -> None:
+        """提交前获取结果表格互斥锁，保证"第一行即新增记录"的判断不被其他浏览器的提交打乱"""
+        if self.record_lock is not None and not self._holding_record_lock:
+            self.record_lock.acquire()
+            self._holding_record_lock = True
+
+    def release_record_lock(self) -> None:
+        """释放结果表格互斥锁（未持有时什么也不做）"""
+        if self._holding_record_lock:
+            self._holding_record_lock = False
+            self.record_lock.release()
+
+    def compile_plan(self, data: Dict[str, Any], dosage: Optional[Dict[str, str]] = None) -> FillPlan:
+        """
+        把一行数据编译为填写计划（在浏览器处理之前调用，诊断和药品应已预取）
+
+        Args:
+            data: 表单数据字典，key 为规范化后的列名
+            dosage: parse_dosages() 预先解析的用法用量（可选）
 
-    def fill_form(self, data: Dict[str, Any]) -> bool:
+        Returns:
+            FillPlan 实例
+
+        Raises:
+            PlanError: 行数据有误（如年龄单位无法识别、药品品种数不是整数、药品无法查询），
+                或字典接口查询失败（只影响本行，重新运行或 --resume 时重试）
         """
-        填写表单
+        try:
+            fields = self.build_form_fields(data)
+
+            antibiotic = None
+            detail_fields: List[FieldStep] = []
+            if self.antibiotic_config.get("enabled", False):
+                antibiotic = self._get_antibiotic_value(data) or None
+                if antibiotic not in (None, "有", "无"):
+                    raise PlanError(f"未知的抗菌药值: {antibiotic}")
+                if antibiotic == "有":
+                    detail_fields = self.build_antibiotic_detail(data, dosage)
+
+        except PlanError:
+            raise
+        except LookupError as e:
+            raise PlanError(str(e))
+        except (ValueError, TypeError, IndexError, AttributeError) as e:
+            raise PlanError(f"数据格式错误: {e}")
+
+        return FillPlan(
+            fields=tuple(fields),
+            antibiotic=antibiotic,
+            detail_fields=tuple(detail_fields),
+            prescription_cost=str(data.get("处方金额") or '')
+        )
+
+    def fill_form(self, plan: FillPlan) -> bool:
+        """
+        按填写计划填写并提交表单
 
         Args:
-            data: 表单数据字典，key 为表单字段名，value 为要填写的值
+            plan: compile_plan() 生成的填写计划
 
         Returns:
             True 如果填写成功，False 否则
         """
+        self._direct_submitted = False
+        self.submit_started = False
         try:
-            logger.info(f"开始填写表单，数据: {data}")
-
-            for field_name, field_value in data.items():
-                field_name = field_name.split("\n")[0].strip()
-
-                # 跳过空值
-                if field_value is None or str(field_value).strip() == "":
-                    logger.debug(f"跳过空字段: {field_name}")
-                    continue
-
-                # 获取元素配置
-                element_config = self.form_elements.get(field_name)
-                if not element_config and field_name != '诊断':
-                    logger.warning(f"配置中未找到字段: {field_name}")
-                    continue
-
-                # 填写字段
-                if field_name == "科室":
-                    field_value = field_value.replace(" ", "").replace("门诊", "")
-                    self._fill_field(field_name, field_value, element_config)
-                elif field_name == "年龄":
-                    field_value1 = field_value[-1]
-                    field_value = field_value[0:-1]
-                    element_config1 = self.form_elements.get("年龄单位")
-                    self._fill_field("年龄单位", field_value1, element_config1)
-                    self._fill_field(field_name, field_value, element_config)
-                elif field_name == "药品品种数":
-                    field_value = int(field_value)
-                    self._fill_field(field_name, field_value, element_config)
-                elif field_name == "注射剂":
-                    self._fill_field(field_name, field_value, element_config)
-                    if field_value == '有':
-                        element_config1 = self.form_elements.get("注射剂数量")
-                        self._fill_field("注射剂数量", "1", element_config1)
-                elif field_name == "诊断":
-                    field_values = field_value.replace("，",",").split(",")
-                    for i, value in enumerate(field_values[:5]):
-                        if not value.strip():
-                            continue
-
-                        # 查询诊断编码
-                        diag_info = self._search_diagnosis(value.strip())
-                        if diag_info:
-                            # 填入诊断名称和编码
-                            index = i + 1
-                            name_config = self.form_elements.get(f"诊断{index}_名称")
-                            code_config = self.form_elements.get(f"诊断{index}_编码")
-
-                            if name_config:
-                                self._fill_field(f"诊断{index}_名称", diag_info['name'], name_config)
-                            if code_config:
-                                self._fill_field(f"诊断{index}_编码", diag_info['code'], code_config)
-
-                            logger.info(f"填入诊断{index}: {diag_info['name']} ({diag_info['code']})")
-                        else:
-                            logger.warning(f"未找到诊断信息: {value}")
-                else:
-                    self._fill_field(field_name, field_value, element_config)
+            fields = list(plan.fields)
+            logger.info(f"开始填写表单，字段: {[(name, value) for name, value, _ in fields]}")
 
+            # 优先直接提交，失败且可安全重试时回退到浏览器填写
+            if self.direct_submitter and self._submit_direct(fields):
+                return True
 
-                time.sleep(0.5)  # 短暂延迟，模拟人工操作
-
+            self._fill_fields(fields)
             logger.info("表单填写完成")
 
             # 填写成功，点击提交按钮
@@ -135,6 +181,148 @@ class FormFiller:
             self._click_button("reset_button")
             return False
 
+    def build_form_fields(self, data: Dict[str, Any]) -> List[FieldStep]:
+        """
+        把一行数据转换为待填写的字段列表（浏览器填写和直接提交共用）
+
+        Args:
+            data: 表单数据字典
+
+        Returns:
+            [(字段名, 字段值, 元素配置), ...]
+        """
+        fields: List[FieldStep] = []
+
+        # 列名已由 DataReader 规范化（多行表头只保留第一行）
+        for field_name, field_value in data.items():
+            # 跳过空值
+            if field_value is None or str(field_value).strip() == "":
+                logger.debug(f"跳过空字段: {field_name}")
+                continue
+
+            # 获取元素配置
+            element_config = self.form_elements.get(field_name)
+            if not element_config and field_name != '诊断':
+                logger.warning(f"配置中未找到字段: {field_name}")
+                continue
+
+            # 填写字段
+            if field_name == "科室":
+                field_value = str(field_value).replace(" ", "").replace("门诊", "")
+                fields.append((field_name, field_value, element_config))
+            elif field_name == "年龄":
+                field_value = str(field_value).strip()
+                field_value1 = field_value[-1]
+                field_value = field_value[0:-1]
+                element_config1 = self.form_elements.get("年龄单位")
+                age_units = (element_config1 or {}).get("options")
+                if age_units and field_value1 not in age_units:
+                    raise PlanError(f"年龄单位无法识别: {data[field_name]}")
+                fields.append(("年龄单位", field_value1, element_config1))
+                fields.append((field_name, field_value, element_config))
+            elif field_name == "药品品种数":
+                field_value = int(float(field_value))
+                fields.append((field_name, field_value, element_config))
+            elif field_name == "注射剂":
+                fields.append((field_name, field_value, element_config))
+                if field_value == '有':
+                    element_config1 = self.form_elements.get("注射剂数量")
+                    fields.append(("注射剂数量", "1", element_config1))
+            elif field_name == "诊断":
+                field_values = self._split_diagnoses(field_value)
+                for i, value in enumerate(field_values[:5]):
+                    if not value.strip():
+                        continue
+
+                    # 查询诊断编码
+                    diag_info = self._search_diagnosis(value.strip())
+                    if diag_info:
+                        # 填入诊断名称和编码
+                        index = i + 1
+                        name_config = self.form_elements.get(f"诊断{index}_名称")
+                        code_config = self.form_elements.get(f"诊断{index}_编码")
+
+                        if name_config:
+                            fields.append((f"诊断{index}_名称", diag_info['name'], name_config))
+                        if code_config:
+                            fields.append((f"诊断{index}_编码", diag_info['code'], code_config))
+
+                        logger.info(f"填入诊断{index}: {diag_info['name']} ({diag_info['code']})")
+                    else:
+                        logger.warning(f"未找到诊断信息: {value}")
+            else:
+                fields.append((field_name, field_value, element_config))
+
+        return fields
+
+    def _submit_direct(self, fields: List[FieldStep]) -> bool:
+        """
+        通过 HTTP 接口直接提交表单
+
+        Args:
+            fields: 待提交的字段列表
+
+        Returns:
+            True 如果提交成功；False 表示需要回退到浏览器填写
+
+        Raises:
+            DirectSubmitError: 提交失败且服务器可能已保存（不能回退，避免重复录入）
+        """
+        if self.direct_submitter.select_options is None:
+            # 首次提交前从页面读取一次下拉框选项，把科室等名称转换为选项值
+            select_fields = [
+                self.agent.field(name, None, config)
+                for name, config in self.form_elements.items()
+                if config.get("type") == "select"
+            ]
+            self.direct_submitter.select_options = self.agent.read_options(select_fields)
+
+        # 只在提交到识别出新增记录期间互斥，填写可以与其他浏览器并行
+        self._acquire_record_lock()
+        self._last_row_id = self._first_result_row_id()
+        self.submit_started = True
+        try:
+            self.direct_submitter.submit(fields)
+        except DirectSubmitError as e:
+            if not e.fallback:
+                raise
+            self.submit_started = False
+            self.release_record_lock()
+            logger.warning(f"直接提交失败，改用浏览器填写: {e}")
+            return False
+
+        self._direct_submitted = True
+        logger.info("表单已直接提交")
+        return True
+
+    def _fill_fields(self, fields: List[FieldStep]) -> None:
+        """
+        通过页面代理一次性填写多个字段，代理填写失败的字段逐个回退到 _fill_field()
+
+        Args:
+            fields: [(字段名, 字段值, 元素配置), ...]
+        """
+        agent_fields = []
+        for field_name, field_value, config in fields:
+            if config.get("type", "input") == "radio":
+                # 单选框按配置的 options 转换为选项值
+                field_value = config.get("options", {}).get(str(field_value), str(field_value))
+            raw = "诊断" in field_name and ("名称" in field_name or "编码" in field_name)
+            agent_fields.append(self.agent.field(field_name, field_value, config, raw=raw))
+
+        try:
+            results = self.agent.fill(agent_fields)
+        except Exception as e:
+            logger.warning(f"页面代理填写失败，逐个字段填写: {e}")
+            results = {field_name: str(e) for field_name, _, _ in fields}
+
+        for field_name, field_value, config in fields:
+            if results.get(field_name):
+                logger.debug(f"回退逐个填写字段 {field_name}（{results[field_name]}）")
+                self._fill_field(field_name, field_value, config)
+            else:
+                logger.debug(f"填写字段 {field_name}: {field_value}")
+
     def _fill_field(self, field_name: str, field_value: Any, config: Dict) -> None:
         """
         填写单个字段
@@ -253,19 +441,18 @@ class FormFiller:
                 EC.element_to_be_clickable((by, locator_value))
             )
 
+            # 只在提交到识别出新增记录期间互斥，填写可以与其他浏览器并行
+            self._acquire_record_lock()
+            self._last_row_id = self._first_result_row_id()
+            self.submit_started = True
             button.click()
             logger.info("已点击提交按钮")
-            time.sleep(1)  # 等待 alert 弹出
 
             # 处理 alert 弹窗
             try:
                 logger.info("等待 Alert 弹窗...")
-                alert = self.driver.switch_to.alert
-                alert_text = alert.text
-                logger.info(f"检测到 Alert 弹窗: {alert_text}")
-                alert.accept()  # 点击确认
-                logger.info("已点击 Alert 确认按钮")
-                time.sleep(1)  # 等待 alert 关闭
+                self.waiter.accept_alert()
+                self.waiter.settled()
             except Exception as alert_error:
                 logger.debug(f"未检测到 Alert 弹窗或处理失败: {alert_error}")
 
@@ -303,13 +490,80 @@ class FormFiller:
 
             button.click()
             logger.info(f"点击按钮 {button_name} 成功")
-            time.sleep(1)  # 短暂等待
+            self.waiter.settled()
             return True
 
         except Exception as e:
             logger.warning(f"点击按钮 {button_name} 失败: {e}")
             return False
 
+    def _first_data_row(self, table):
+        """
+        查找结果表格的第一个数据行（跳过表头）
+
+        Args:
+            table: 结果表格元素
+
+        Returns:
+            第一个数据行元素，没有数据行时返回 None
+        """
+        # 表头的class是"tabletitle"，所以我们找第一个没有这个class且带id的tr
+        rows = table.find_elements(By.CSS_SELECTOR, "tr[id]:not(.tabletitle)")
+        return rows[0] if rows else None
+
+    def _first_result_row_id(self) -> Optional[str]:
+        """
+        获取结果表格第一个数据行的ID
+
+        Returns:
+            行ID，表格不存在或没有数据行时返回 None
+        """
+        table_id = self.antibiotic_config.get("result_table_id", "outpatientTable")
+        try:
+            tables = self.driver.find_elements(By.ID, table_id)
+            row = self._first_data_row(tables[0]) if tables else None
+            return row.get_attribute("id") if row else None
+        except Exception:
+            # 表格刷新过程中元素可能失效
+            return None
+
+    # 详情页中 name 与 id 不同的字段（提交参数使用 name）
+    DETAIL_PARAMS = {"drug_idName": "drug_id"}
+
+    def _detail_field(self, element_id: str, value: Any, element_type: str = "input",
+                      raw: bool = False) -> FieldStep:
+        """
+        构造抗菌药详情页字段（详情页字段均按 id 定位）
+
+        Args:
+            element_id: 元素 id
+            value: 要填写的值
+            element_type: 元素类型（input / select）
+            raw: 浏览器填写时是否直接赋值而不触发事件
+
+        Returns:
+            (元素ID, 字段值, 元素配置)
+        """
+        config = {
+            "type": element_type,
+            "locator": "id",
+            "value": element_id,
+            "param": self.DETAIL_PARAMS.get(element_id, element_id),
+            "raw": raw,
+        }
+        return element_id, value, config
+
+    def _wait_returned(self, return_button, timeout: float) -> None:
+        """
+        点击返回按钮后等待详情页关闭、主列表加载完成
+
+        Args:
+            return_button: 已点击的返回按钮
+            timeout: 等待详情页关闭的最长时间（秒）
+        """
+        self.waiter.gone(return_button, timeout=timeout)
+        self.waiter.settled()
+
     def check_success(self, success_indicator: Dict) -> bool:
         """
         检查提交是否成功
@@ -347,6 +601,183 @@ class FormFiller:
             logger.error(f"检查成功状态失败: {e}")
             return False
 
+    @staticmethod
+    def _split_diagnoses(field_value: Any) -> List[str]:
+        """
+        拆分诊断字段（支持中英文逗号）
+
+        Args:
+            field_value: 诊断单元格的值
+
+        Returns:
+            诊断列表（保留空项，以便与诊断序号对应）
+        """
+        return str(field_value).replace("，", ",").split(",")
+
+    @staticmethod
+    def _clean_drug_name(drug_name_raw: str) -> str:
+        """
+        清洗药品名称：去除括号内的标注（如"(集)"）和多余空格
+
+        Args:
+            drug_name_raw: Excel 中的原始药品名称
+
+        Returns:
+            用于字典查询的药品名称
+        """
+        cleaned_name = re.sub(r'\([^)]*\)', '', drug_name_raw)
+        # 去除可能多余的空格
+        return re.sub(r'\s+', ' ', cleaned_name).strip()
+
+    def collect_dictionary_terms(
+        self, data_list: List[Dict[str, Any]]
+    ) -> Tuple[List[str], List[Tuple[str, Optional[str]]]]:
+        """
+        收集数据中所有不重复的诊断和药品
+
+        Args:
+            data_list: 全部行数据
+
+        Returns:
+            (诊断列表, [(药品名称, 规格), ...])，按首次出现顺序排列
+        """
+        diag_terms: Dict[str, None] = {}
+        drug_names: Dict[Tuple[str, Optional[str]], None] = {}
+        antibiotic_enabled = self.antibiotic_config.get("enabled", False)
+
+        for row_data in data_list:
+            value = row_data.get("诊断")
+            if value is not None and str(value).strip() != "":
+                for term in self._split_diagnoses(value)[:5]:
+                    if term.strip():
+                        diag_terms[term.strip()] = None
+
+            # 只有"抗菌药=有"的行才会查询药品
+            if antibiotic_enabled and self._get_antibiotic_value(row_data) == "有":
+                fields = self._extract_antibiotic_fields(row_data)
+                if fields['drug_name']:
+                    drug_names[(self._clean_drug_name(fields['drug_name']), fields['spec'])] = None
+
+        return list(diag_terms), list(drug_names)
+
+    def prefetch_dictionaries(self, data_list: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        在逐行填写之前，批量并发查询所有不重复的诊断和药品，预先解析查询结果
+
+        Args:
+            data_list: 全部行数据
+
+        Returns:
+            统计信息，如 {'diag_total': 10, 'diag_found': 9, 'drug_total': 3, 'drug_found': 3, 'failed': 0}
+        """
+        diag_terms, drugs = self.collect_dictionary_terms(data_list)
+        logger.info(f"预取字典：诊断 {len(diag_terms)} 个，药品 {len(drugs)} 个")
+
+        # 本地缓存中已有的无需再请求接口；同名不同规格的药品只查询一次
+        queries: Dict[Tuple[str, str], None] = {}
+        for term in diag_terms:
+            if not (self.dict_cache and self.dict_cache.has('dict_diag', term)):
+                queries[('dict_diag', term)] = None
+        for name, spec in drugs:
+            if not (self.dict_cache and self.dict_cache.has('dict_drug', self._drug_lookup_key(name, spec))):
+                queries[('dict_drug', name)] = None
+
+        if queries:
+            # WebDriver 不是线程安全的，在主线程中先同步 Cookie，后台请求只使用 HTTP 会话
+            if not self.session_bridge.synced:
+                self.session_bridge.sync()
+            self._raw_results = self.query_dict_many(list(queries))
+
+        # 用批量查询结果逐个解析（只做本地排序，不再请求接口）
+        # 查询失败的不写入预取结果（各工作会话共用），编译填写计划时重新查询，避免一次网络抖动影响整个运行
+        failed = 0
+        try:
+            for term in diag_terms:
+                try:
+                    self._prefetched[('dict_diag', term)] = self._search_diagnosis(term)
+                except LookupError as e:
+                    failed += 1
+                    logger.warning(f"预取诊断失败，稍后重新查询: {term}（{e}）")
+            for name, spec in drugs:
+                try:
+                    self._prefetched[('dict_drug', self._drug_lookup_key(name, spec))] = self._search_drug(name, spec)
+                except LookupError as e:
+                    failed += 1
+                    logger.warning(f"预取药品失败，稍后重新查询: {name}（{e}）")
+        finally:
+            self._raw_results = {}
+
+        stats = {
+            'diag_total': len(diag_terms),
+            'diag_found': sum(1 for term in diag_terms if self._prefetched.get(('dict_diag', term))),
+            'drug_total': len(drugs),
+            'drug_found': sum(
+                1 for drug in drugs if self._prefetched.get(('dict_drug', self._drug_lookup_key(*drug)))
+            ),
+            'failed': failed,
+        }
+        logger.info(
+            f"字典预取完成：诊断 {stats['diag_found']}/{stats['diag_total']}，"
+            f"药品 {stats['drug_found']}/{stats['drug_total']}（接口查询 {len(queries)} 个，失败 {failed} 个）"
+        )
+        return stats
+
+    def query_dict_many(self, queries: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        """
+        批量查询字典，本地索引未命中的部分并发请求接口
+
+        Args:
+            queries: [(字典表名, 关键词), ...]
+
+        Returns:
+            {(字典表名, 关键词): 字典记录列表或异常对象}
+        """
+        results: Dict[Tuple[str, str], Any] = {}
+        remote = []
+        for dict_table, keyword in queries:
+            local = self.dict_index.search(dict_table, keyword) if self.dict_index else []
+            if local:
+                results[(dict_table, keyword)] = local
+            else:
+                remote.append((dict_table, keyword))
+
+        if remote:
+            for query, result in zip(remote, self.dict_client.search_many_sync(remote)):
+                results[query] = result
+
+        return results
+
+    def query_dict(self, dict_table: str, keyword: str, use_index: bool = True) -> List[Dict[str, Any]]:
+        """
+        查询字典，优先使用本地索引，未命中时请求字典接口
+
+        Args:
+            dict_table: 字典表名（dict_diag / dict_drug）
+            keyword: 查询关键词
+            use_index: 是否查询本地索引（生成快照时需直接请求接口）
+
+        Returns:
+            字典记录列表
+
+        Raises:
+            requests.RequestException: 接口请求失败
+            SessionExpiredError: 刷新 Cookie 后会话仍然失效（含响应不是合法的 JSON）
+        """
+        # 预取阶段批量查询过的直接使用
+        if (dict_table, keyword) in self._raw_results:
+            result = self._raw_results[(dict_table, keyword)]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        if use_index and self.dict_index:
+            results = self.dict_index.search(dict_table, keyword)
+            if results:
+                logger.debug(f"本地字典索引命中: {dict_table}/{keyword}（{len(results)} 条）")
+                return results
+
+        return self.dict_client.search_sync(dict_table, keyword)
+
     def _search_diagnosis(self, keyword: str) -> Optional[Dict[str, str]]:
         """
         查询诊断编码和名称
@@ -357,50 +788,35 @@ class FormFiller:
         Returns:
             包含诊断名称和编码的字典，格式: {'name': '诊断名称', 'code': '编码'}
             如果未找到则返回 None
-        """
-        try:
-            # 从浏览器获取Cookie
-            cookies = self.driver.get_cookies()
-            cookie_dict = {cookie['name']: cookie['value'] for cookie in cookies}
-
-            # 构造请求
-            url = "http://y.chinadtc.org.cn/entering/dict/search_dict"
-            headers = {
-                'Accept': '*/*',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36',
-                'Cookie': 'PHPSESSID=' + cookie_dict['PHPSESSID']
-            }
 
-            # 构造表单数据（multipart/form-data格式）
-            data = {
-                'dict_table': 'dict_diag',
-                'search_field': 'diag_pym',
-                'order_field': 'diag_id',
-                'szimu': keyword
-            }
-
-            # 将data转换成multipart形式
-            # 每个字段作为元组，第二个元素为None表示不是文件
-            files = []
-            for key, value in data.items():
-                files.append((key, (None, value)))
-
-            # 发送请求，不设置Content-Type，让requests自动设置（包含boundary）
-            response = self.session.post(url, files=files, headers=headers, timeout=10)
-            response.raise_for_status()
+        Raises:
+            LookupError: 字典接口查询失败（临时故障，不能当作未找到）
+        """
+        # 预取阶段已解析过的直接返回
+        if ('dict_diag', keyword) in self._prefetched:
+            return self._prefetched[('dict_diag', keyword)]
+
+        # 其次从本地缓存读取
+        if self.dict_cache:
+            found, cached = self.dict_cache.lookup('dict_diag', keyword)
+            if found:
+                if cached is None:
+                    logger.warning(f"未找到诊断（缓存）: {keyword}")
+                else:
+                    logger.info(f"诊断缓存命中: {keyword} -> {cached['name']} ({cached['code']})")
+                return cached
 
-            # 解析响应
-            results = response.json()
+        try:
+            results = self.query_dict('dict_diag', keyword)
 
             if not results or len(results) == 0:
                 logger.warning(f"未找到诊断: {keyword}")
+                if self.dict_cache:
+                    self.dict_cache.set('dict_diag', keyword, None)
                 return None
 
-            # 选择最相似的结果（这里简单取第一个）
-            # 可以实现更复杂的相似度匹配算法
-            best_match = results[0]
+            # 按名称相似度从所有候选中选择最接近的结果
+            best_match = select_best_match(keyword, results, 'diag_name')
 
             diag_info = {
                 'name': best_match['diag_name'],
@@ -408,43 +824,38 @@ class FormFiller:
             }
 
             logger.info(f"找到诊断: {keyword} -> {diag_info['name']} ({diag_info['code']})")
+
+            if self.dict_cache:
+                self.dict_cache.set('dict_diag', keyword, diag_info)
+
             return diag_info
 
         except requests.RequestException as e:
             logger.error(f"查询诊断API失败: {e}")
-            return None
+            raise LookupError(f"诊断 {keyword} 查询失败，可重试: {e}") from e
         except (KeyError, IndexError, ValueError) as e:
             logger.error(f"解析诊断结果失败: {e}")
             return None
         except Exception as e:
             logger.error(f"查询诊断失败: {e}")
-            return None
+            raise LookupError(f"诊断 {keyword} 查询失败，可重试: {e}") from e
 
-    def handle_antibiotic_info(self, row_data: Dict[str, Any]) -> bool:
+    def handle_antibiotic_info(self, plan: FillPlan) -> bool:
         """
         处理新增记录的抗菌药信息
 
         Args:
-            row_data: 当前行的数据字典
+            plan: 当前行的填写计划
 
         Returns:
             True 如果处理成功，False 否则
         """
         try:
-            # 检查是否启用抗菌药处理
-            if not self.antibiotic_config.get("enabled", False):
-                logger.info("抗菌药处理未启用，跳过")
-                return True
-
-            # 获取抗菌药有/无的值（可能带换行符）
-            antibiotic_value = None
-            for key in row_data.keys():
-                if '抗菌药' in key and ('有' in key or '无' in key):
-                    antibiotic_value = str(row_data[key]).strip()
-                    break
-
-            if not antibiotic_value or antibiotic_value == '':
-                logger.info("未找到抗菌药字段或值为空，跳过抗菌药处理")
+            # 未启用抗菌药处理或数据中没有抗菌药有/无时，编译计划时 antibiotic 为 None
+            antibiotic_value = plan.antibiotic
+            if not antibiotic_value:
+                logger.info("抗菌药处理未启用或值为空，跳过抗菌药处理")
+                self.release_record_lock()
                 return True
 
             logger.info(f"开始处理抗菌药信息，值: {antibiotic_value}")
@@ -453,8 +864,19 @@ class FormFiller:
             table_id = self.antibiotic_config.get("result_table_id", "outpatientTable")
             wait_time = self.antibiotic_config.get("wait_after_submit", 2)
 
-            # 等待表格刷新（等待新记录添加到表格中）
-            time.sleep(wait_time)
+            # 直接提交时浏览器页面不会自动刷新，重新加载后再查找新记录
+            if self._direct_submitted:
+                self.driver.refresh()
+                self.waiter.settled()
+
+            # 等待表格刷新：第一行变成新记录（wait_after_submit 为最长等待时间）
+            previous_row_id = self._last_row_id
+            refreshed = self.waiter.check(
+                lambda d: self._first_result_row_id() not in (None, previous_row_id),
+                timeout=wait_time
+            )
+            if not refreshed:
+                logger.warning(f"等待结果表格刷新超时（{wait_time}秒），使用当前第一行")
 
             # 查找表格
             table = self.wait.until(
@@ -462,15 +884,7 @@ class FormFiller:
             )
             logger.debug(f"找到结果表格: {table_id}")
 
-            # 查找表格的第一个数据行（跳过表头）
-            # 表头的class是"tabletitle"，所以我们找第一个没有这个class的tr
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            first_data_row = None
-            for row in rows:
-                row_class = row.get_attribute("class") or ""
-                if "tabletitle" not in row_class and row.get_attribute("id"):
-                    first_data_row = row
-                    break
+            first_data_row = self._first_data_row(table)
 
             if not first_data_row:
                 logger.error("未找到表格的第一行数据")
@@ -478,6 +892,7 @@ class FormFiller:
 
             row_id = first_data_row.get_attribute("id")
             logger.info(f"找到新增记录行: {row_id}")
+            self.release_record_lock()
 
             # 在这一行中查找抗菌药的单选按钮
             # 先找到所有的radio按钮，通过name属性识别（name="drugsMoney{序号}"）
@@ -499,22 +914,23 @@ class FormFiller:
                     radio_yes = radio
 
             # 根据数据值选择按钮
-            if antibiotic_value == "有":
+            if plan.needs_detail:
                 if radio_yes:
                     logger.info("选择抗菌药: 有")
                     # 使用JavaScript点击，避免遮挡问题
                     self.driver.execute_script("arguments[0].click();", radio_yes)
-                    time.sleep(1)  # 等待按钮启用
 
                     # 查找"录入详细信息"按钮
                     detail_button = first_data_row.find_element(By.CSS_SELECTOR, "input.itemBtnDrugs.btnDrugs")
 
-                    # 检查按钮是否已启用
-                    is_disabled = detail_button.get_attribute("disabled")
-                    if is_disabled:
+                    # 等待按钮启用
+                    if not self.waiter.enabled(detail_button, timeout=wait_time):
                         logger.warning("录入详细信息按钮仍处于禁用状态")
-                        # 再等一会儿
-                        time.sleep(1)
+
+                    # 优先按记录ID直接保存详情，不打开详情页
+                    if self.detail_submitter and self._save_detail_direct(plan, first_data_row):
+                        logger.info("抗菌药信息处理完成：已选择'有'并直接保存详细信息")
+                        return True
 
                     # 点击"录入详细信息"按钮
                     logger.info("点击录入详细信息按钮")
@@ -522,7 +938,7 @@ class FormFiller:
 
                     # 调用详情填写方法
                     logger.info("准备填写抗菌药详细信息...")
-                    detail_success = self.fill_antibiotic_detail(row_data)
+                    detail_success = self.fill_antibiotic_detail(plan)
 
                     if not detail_success:
                         logger.warning("抗菌药详细信息填写失败")
@@ -535,22 +951,17 @@ class FormFiller:
                     logger.error("未找到'有'的单选按钮")
                     return False
 
-            elif antibiotic_value == "无":
+            else:  # "无"（其他值在编译填写计划时已被拒绝）
                 if radio_no:
                     logger.info("选择抗菌药: 无")
                     # 默认已经选中"无"，但为了确保，还是点击一下
                     self.driver.execute_script("arguments[0].click();", radio_no)
-                    time.sleep(0.5)
                     logger.info("抗菌药信息处理完成：已选择'无'")
                     return True
                 else:
                     logger.warning("未找到'无'的单选按钮，使用默认值")
                     return True
 
-            else:
-                logger.warning(f"未知的抗菌药值: {antibiotic_value}，跳过处理")
-                return True
-
         except TimeoutException:
             logger.error(f"超时：未找到结果表格 (ID: {self.antibiotic_config.get('result_table_id', 'outpatientTable')})")
             return False
@@ -561,68 +972,121 @@ class FormFiller:
             logger.error(f"处理抗菌药信息失败: {e}")
             return False
 
-    def _search_drug(self, keyword: str) -> Optional[Dict[str, str]]:
+    @staticmethod
+    def _get_antibiotic_value(row_data: Dict[str, Any]) -> Optional[str]:
+        """
+        获取行数据中抗菌药有/无的值（原始列名 "抗菌药\n有/无" 已规范化为 "抗菌药"）
+
+        Args:
+            row_data: 当前行的数据字典
+
+        Returns:
+            "有"/"无" 等原始值，未找到该列则返回 None
+        """
+        if "抗菌药" not in row_data:
+            return None
+        value = row_data["抗菌药"]
+        return "" if value is None else str(value).strip()
+
+    # 抗菌药详情字段对应的列名（规范化后）
+    ANTIBIOTIC_COLUMNS = {
+        'drug_name': '药品名称',
+        'spec': '规格',
+        'amount': '金额(元)',
+        'dosage': '用法用量',
+        'route': '途径',
+        'quantity': '数量',
+    }
+
+    @classmethod
+    def _extract_antibiotic_fields(cls, row_data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """
+        从行数据中提取抗菌药详情相关字段（列名已由 DataReader 规范化）
+
+        Args:
+            row_data: 当前行的数据字典
+
+        Returns:
+            包含 drug_name、spec、amount、dosage、route、quantity 的字典，缺失的字段为 None
+        """
+        fields = {}
+        for field, column in cls.ANTIBIOTIC_COLUMNS.items():
+            value = row_data.get(column)
+            fields[field] = str(value).strip() if value else None
+        return fields
+
+    @staticmethod
+    def _build_drug_spec(drug: Dict[str, Any]) -> str:
+        """
+        根据字典记录构造规格字符串
+
+        Args:
+            drug: 药品字典记录
+
+        Returns:
+            规格字符串，例如: "0.25g 胶囊"
+        """
+        spec = drug.get('drug_spec_c', '')
+        spec_unit2 = drug.get('drug_spec_unit2', '')
+        drug_form = drug.get('drug_form_c', '')
+
+        # 组合规格，例如: "0.25g 胶囊"
+        full_spec = f"{spec}{spec_unit2}" if spec else ""
+        if drug_form:
+            full_spec = f"{full_spec} {drug_form}" if full_spec else drug_form
+        return full_spec
+
+    @staticmethod
+    def _drug_lookup_key(keyword: str, spec: Optional[str] = None) -> str:
+        """药品查询结果的缓存键：规格参与候选排序，因此与药品名一起作为键"""
+        return f"{keyword}|{spec}" if spec else keyword
+
+    def _search_drug(self, keyword: str, spec: Optional[str] = None) -> Optional[Dict[str, str]]:
         """
         查询药品通用名和编码
 
         Args:
             keyword: 药品关键词
+            spec: Excel 中的规格（可选），用于在多个候选中选择规格一致的药品
 
         Returns:
             包含药品名称、编码和规格的字典，格式: {'name': '药品名称', 'code': '编码', 'spec': '规格'}
             如果未找到则返回 None
-        """
-        try:
-            # 从浏览器获取Cookie
-            cookies = self.driver.get_cookies()
-            cookie_dict = {cookie['name']: cookie['value'] for cookie in cookies}
-
-            # 构造请求
-            url = "http://y.chinadtc.org.cn/entering/dict/search_dict"
-            headers = {
-                'Accept': '*/*',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36',
-                'Cookie': 'PHPSESSID=' + cookie_dict['PHPSESSID']
-            }
 
-            # 构造表单数据（multipart/form-data格式）
-            data = {
-                'dict_table': 'dict_drug',
-                'search_field': 'drug_pym',
-                'order_field': 'drug_id',
-                'szimu': keyword
-            }
-
-            # 将data转换成multipart形式
-            files = []
-            for key, value in data.items():
-                files.append((key, (None, value)))
-
-            # 发送请求，不设置Content-Type，让requests自动设置（包含boundary）
-            response = self.session.post(url, files=files, headers=headers, timeout=10)
-            response.raise_for_status()
+        Raises:
+            LookupError: 字典接口查询失败（临时故障，不能当作未找到）
+        """
+        lookup_key = self._drug_lookup_key(keyword, spec)
+
+        # 预取阶段已解析过的直接返回
+        if ('dict_drug', lookup_key) in self._prefetched:
+            return self._prefetched[('dict_drug', lookup_key)]
+
+        # 其次从本地缓存读取
+        if self.dict_cache:
+            found, cached = self.dict_cache.lookup('dict_drug', lookup_key)
+            if found:
+                if cached is None:
+                    logger.warning(f"未找到药品（缓存）: {keyword}")
+                else:
+                    logger.info(f"药品缓存命中: {keyword} -> {cached['name']} ({cached['code']}) 规格: {cached['spec']}")
+                return cached
 
-            # 解析响应
-            results = response.json()
+        try:
+            results = self.query_dict('dict_drug', keyword)
 
             if not results or len(results) == 0:
                 logger.warning(f"未找到药品: {keyword}")
+                if self.dict_cache:
+                    self.dict_cache.set('dict_drug', lookup_key, None)
                 return None
 
-            # 选择最相似的结果（这里简单取第一个）
-            best_match = results[0]
-
-            # 构造规格字符串
-            spec = best_match.get('drug_spec_c', '')
-            spec_unit2 = best_match.get('drug_spec_unit2', '')
-            drug_form = best_match.get('drug_form_c', '')
-
-            # 组合规格，例如: "0.25g 胶囊"
-            full_spec = f"{spec}{spec_unit2}" if spec else ""
-            if drug_form:
-                full_spec = f"{full_spec} {drug_form}" if full_spec else drug_form
+            # 按名称相似度和规格含量从所有候选中选择最接近的结果
+            best_match = select_best_match(
+                keyword, results, 'drug_name',
+                spec=spec, spec_builder=self._build_drug_spec
+            )
+            full_spec = self._build_drug_spec(best_match)
 
             drug_info = {
                 'name': best_match['drug_name'],
@@ -632,239 +1096,239 @@ class FormFiller:
             }
 
             logger.info(f"找到药品: {keyword} -> {drug_info['name']} ({drug_info['code']}) 规格: {drug_info['spec']}")
+
+            if self.dict_cache:
+                self.dict_cache.set('dict_drug', lookup_key, drug_info)
+
             return drug_info
 
         except requests.RequestException as e:
             logger.error(f"查询药品API失败: {e}")
-            return None
+            raise LookupError(f"药品 {keyword} 查询失败，可重试: {e}") from e
         except (KeyError, IndexError, ValueError) as e:
             logger.error(f"解析药品结果失败: {e}")
             return None
         except Exception as e:
             logger.error(f"查询药品失败: {e}")
-            return None
+            raise LookupError(f"药品 {keyword} 查询失败，可重试: {e}") from e
 
-    def _parse_dosage(self, dosage_str: str) -> Dict[str, Any]:
+    def _option_field(self, field: str, value: str, description: str) -> Optional[FieldStep]:
         """
-        解析用法用量字符串
+        把单位/途径/频率转换为下拉框选项的填写步骤
 
         Args:
-            dosage_str: 用法用量字符串，如 "100mg bid", "0.25g tid", "125mg q8h"
+            field: 下拉框ID
+            value: 原始值（如 "mg"、"静滴"、"bid"）
+            description: 字段说明（用于日志）
 
         Returns:
-            包含单次剂量、单次剂量单位、用法频率的字典
-            格式: {'dose_value': '100', 'dose_unit': 'mg', 'frequency': 'bid'}
+            填写步骤，值无法识别时返回 None（该字段不填写，计入映射报告）
         """
-        try:
-            logger.debug(f"解析用法用量: {dosage_str}")
-
-            # 初始化默认值
-            result = {
-                'dose_value': '',
-                'dose_unit': '',
-                'frequency': '',
-                'total_amount': '',  # 总量（从数量列获取）
-                'total_unit': ''     # 总量单位
-            }
-
-            if not dosage_str or str(dosage_str).strip() == '':
-                logger.warning("用法用量字符串为空")
-                return result
-
-            dosage_str = str(dosage_str).strip()
-
-            # 正则表达式匹配剂量和单位，例如: "100mg", "0.25g", "1片"
-            dose_pattern = r'(\d+\.?\d*)\s*(mg|g|克|毫克|片|粒|支|包|袋|瓶|ml|毫升|滴|万单位)'
-            dose_match = re.search(dose_pattern, dosage_str, re.IGNORECASE)
+        option_value = self.unit_registry.resolve(field, value)
+        if option_value is None:
+            logger.warning(f"{description}无法识别，不填写: {value}")
+            return None
+        logger.info(f"选择{description}: {value} -> value={option_value}")
+        return self._detail_field(field, option_value, "select")
 
-            if dose_match:
-                result['dose_value'] = dose_match.group(1)
-                result['dose_unit'] = dose_match.group(2).lower()
-                logger.debug(f"提取到剂量: {result['dose_value']} {result['dose_unit']}")
+    def parse_dosages(self, data_list: List[Dict[str, Any]], row_numbers: Optional[List[int]] = None) -> List[Dict[str, str]]:
+        """
+        向量化解析一批行的用法用量、规格和数量，并输出无法解析的行的报告
 
-            # 正则表达式匹配用法频率
-            # 支持: qd, bid, tid, qid, q2h, q4h, q6h, q8h, q12h, qn (每晚)
-            frequency_pattern = r'\b(qd|bid|tid|qid|q2h|q4h|q6h|q8h|q12h|qn|st|即刻|1日|2日|3日|4日|每晚)\b'
-            freq_match = re.search(frequency_pattern, dosage_str, re.IGNORECASE)
+        Args:
+            data_list: 行数据列表
+            row_numbers: 每行的行号（用于报告），为 None 时从 1 开始编号
 
-            if freq_match:
-                result['frequency'] = freq_match.group(1).lower()
-                logger.debug(f"提取到频率: {result['frequency']}")
+        Returns:
+            与 data_list 顺序一致的解析结果（dose_value、dose_unit、frequency、total_amount、total_unit）
+        """
+        sources = [self._extract_antibiotic_fields(row_data) for row_data in data_list]
+        parsed = parse_dosages(sources)
+
+        # 只报告需要录入抗菌药详情的行
+        row_numbers = row_numbers or list(range(1, len(data_list) + 1))
+        report = []
+        for number, (row_data, source, result) in zip(row_numbers, zip(data_list, sources, parsed)):
+            if self._get_antibiotic_value(row_data) != "有":
+                continue
+            for issue in dosage_issues(source, result):
+                report.append(f"第 {number} 行: {issue}")
+        if report:
+            self.dosage_issue_count += len(report)
+            logger.warning(f"用法用量解析报告（{len(report)} 项无法解析，对应字段不填写）:\n" + "\n".join(report))
+        return parsed
+
+    def build_antibiotic_detail(self, row_data: Dict[str, Any], dosage: Optional[Dict[str, str]] = None) -> List[FieldStep]:
+        """
+        根据行数据计算抗菌药详情页各字段的值（浏览器填写和直接保存共用）
 
-            return result
+        Args:
+            row_data: 当前行的数据字典（包含抗菌药相关字段）
+            dosage: parse_dosages() 预先解析的结果，为 None 时单独解析这一行
 
-        except Exception as e:
-            logger.error(f"解析用法用量失败: {e}")
-            return {
-                'dose_value': '',
-                'dose_unit': '',
-                'frequency': '',
-                'total_amount': '',
-                'total_unit': ''
-            }
+        Returns:
+            [(元素ID, 字段值, 元素配置), ...]
 
-    def _normalize_unit(self, unit_str: str, unit_type: str = 'dose') -> str:
+        Raises:
+            LookupError: 药品信息无法查询
+        """
+        # 提取Excel中的相关字段数据
+        fields = self._extract_antibiotic_fields(row_data)
+        drug_name_raw = fields['drug_name']
+        drug_spec = fields['spec']
+        drug_amount = fields['amount']
+        drug_dosage = fields['dosage']
+        drug_route = fields['route']
+        drug_quantity = fields['quantity']
+
+        logger.info(f"提取到的数据 - 药品:{drug_name_raw}, 规格:{drug_spec}, 金额:{drug_amount}, 用法用量:{drug_dosage}, 途径:{drug_route}, 数量:{drug_quantity}")
+
+        detail_fields: List[FieldStep] = []
+
+        # 1. 查询药品通用名
+        drug_info = None
+        if drug_name_raw:
+            cleaned_name = self._clean_drug_name(drug_name_raw)
+            drug_info = self._search_drug(cleaned_name, drug_spec)
+            if drug_info:
+                # 填写药品通用名和规格
+                logger.info(f"填写药品通用名: {drug_info['name']}")
+                # 直接设置值（readonly字段）
+                detail_fields.append(self._detail_field("medicineName", drug_info['name'], raw=True))
+
+                # 填写药品ID（隐藏字段）
+                detail_fields.append(self._detail_field("drug_idName", drug_info['id'], raw=True))
+
+                # 填写规格
+                spec_value = drug_info.get('spec', drug_spec or '')
+                detail_fields.append(self._detail_field("specName", spec_value, raw=True))
+                logger.info(f"填写规格: {spec_value}")
+            else:
+                raise LookupError("药品信息无法查询")
+
+        # 2. 填写金额
+        if drug_amount:
+            logger.info(f"填写金额: {drug_amount}")
+            detail_fields.append(self._detail_field("amountOutpatient", drug_amount))
+
+        # 3-4. 用法用量与总用量（规格×数量，无法计算时回退到数量或单次剂量）已向量化解析
+        dosage_info = dosage if dosage is not None else parse_dosages([fields])[0]
+        logger.info(f"解析用法用量结果: {dosage_info}")
+        total_amount = dosage_info['total_amount']
+        total_unit = dosage_info['total_unit']
+
+        # 5. 填写总用量
+        if total_amount:
+            logger.info(f"填写总用量: {total_amount}")
+            detail_fields.append(self._detail_field("totalMedicine", total_amount))
+
+        # 6-10. 总用量单位、单次计量及其单位、用法频率、途径（下拉框的值无法识别时不填写）
+        option_fields = []
+        if total_unit:
+            option_fields.append(self._option_field("totalMedicineUnit", total_unit, "总用量单位"))
+
+        if dosage_info.get('dose_value'):
+            logger.info(f"填写单次计量: {dosage_info['dose_value']}")
+            option_fields.append(self._detail_field("onceMeter", dosage_info['dose_value']))
+        if dosage_info.get('dose_unit'):
+            option_fields.append(self._option_field("onceMeterUnit", dosage_info['dose_unit'], "单次计量单位"))
+        if dosage_info.get('frequency'):
+            option_fields.append(self._option_field("medicineFrequency", dosage_info['frequency'], "用法频率"))
+        if drug_route:
+            option_fields.append(self._option_field("medicineWay", drug_route, "途径"))
+        detail_fields.extend(step for step in option_fields if step is not None)
+
+        return detail_fields
+
+    @staticmethod
+    def _record_id(row) -> Optional[str]:
         """
-        标准化单位值到HTML select的option value
+        从结果表格行中解析记录ID（行 id="mjz_list650081" 或按钮 onclick="outpatient_detail(650081,'mz')"）
 
         Args:
-            unit_str: 单位字符串 (如 "mg", "g", "片", "口服")
-            unit_type: 单位类型 ('dose' 剂量单位, 'route' 给药途径)
+            row: 结果表格的数据行元素
 
         Returns:
-            HTML select对应的value值 (字符串)
-        """
-        unit_str = str(unit_str).strip().lower()
-
-        if unit_type == 'dose':
-            # 剂量单位映射表
-            unit_map = {
-                '克': '5', 'g': '5',
-                '毫克': '6', 'mg': '6',
-                '万单位': '7',
-                '滴': '8',
-                'ml': '9', '毫升': '9',
-                '片': '10',
-                '支': '11',
-                '粒': '12',
-                '瓶': '13',
-                '包': '14',
-                '袋': '15'
-            }
-            return unit_map.get(unit_str, '10')  # 默认"片"
-
-        elif unit_type == 'route':
-            # 给药途径映射表
-            route_map = {
-                '静脉滴注': '26', '静滴': '26',
-                '静脉泵入': '27',
-                '静脉推注': '28', '静推': '28',
-                '肌肉注射': '29', '肌注': '29',
-                '静脉注射': '30', '静注': '30',
-                '皮下注射': '31', '皮下': '31',
-                '球后注射': '87',
-                '结膜下注射': '88',
-                '眼内注射': '89',
-                '直肠给药': '32', '直肠': '32',
-                '雾化吸入': '33', '雾化': '33',
-                '肠道准备': '34',
-                '口服': '35',
-                '外用': '36',
-                '滴鼻': '37',
-                '滴耳': '38',
-                '滴眼': '39',
-                '鞘内注射': '90',
-                '腹膜透析': '91',
-                '皮试': '92'
-            }
-            return route_map.get(unit_str, '35')  # 默认"口服"
-
-        elif unit_type == 'frequency':
-            # 用法频率映射表
-            freq_map = {
-                '即刻': '16', 'st': '16',
-                '1/日': '17', 'qd': '17', '1日': '17',
-                '2/日': '18', 'bid': '18', '2日': '18',
-                '3/日': '19', 'tid': '19', '3日': '19',
-                '4/日': '20', 'qid': '20', '4日': '20',
-                'q2h': '93',
-                'q6h': '21',
-                'q8h': '22',
-                'q12h': '23',
-                '每晚': '24', 'qn': '24',
-                '其他': '25'
-            }
-            return freq_map.get(unit_str, '17')  # 默认"1/日"
-
-        return ''
-
-    def _compute_total_from_spec_and_quantity(self, spec_str: Optional[str], quantity_str: Optional[str]) -> Tuple[str, str]:
+            记录ID，无法解析时返回 None
         """
-        根据规格和数量计算总用量。
-
-        规则：总用量 = 规格中每单位含量 × 包装内单位数量 × 购买数量
-        - 示例：规格 "50mg*12"，数量 "2.00 盒" => 总用量 = 50 × 12 × 2 = 1200 mg
-        - 单位与规格一致；当为"g"则在页面选择"克"，"mg"选择"毫克"。
+        match = re.search(r'mjz_list(\d+)', row.get_attribute("id") or '')
+        if match:
+            return match.group(1)
+        for button in row.find_elements(By.CSS_SELECTOR, "[onclick*='outpatient_detail']"):
+            match = re.search(r'outpatient_detail\((\d+)', button.get_attribute("onclick") or '')
+            if match:
+                return match.group(1)
+        return None
+
+    def _save_detail_direct(self, plan: FillPlan, record_row) -> bool:
+        """
+        通过 HTTP 接口直接保存抗菌药详细信息
 
         Args:
-            spec_str: 规格字符串，例如 "50mg*12"、"0.25g×12片"、"125mg 12片"
-            quantity_str: 数量字符串，例如 "2.00 盒"、"3.00 片"
+            plan: 当前行的填写计划
+            record_row: 结果表格中新增记录所在的行
 
         Returns:
-            (total_amount_str, total_unit_str) 若无法解析则返回 ('', '')
+            True 如果保存成功；False 表示需要回退到打开详情页填写
+
+        Raises:
+            DirectSubmitError: 保存失败且服务器可能已保存（不能回退，避免重复录入）
         """
+        record_id = self._record_id(record_row)
+        if not record_id:
+            logger.warning("无法解析新增记录的ID，改为打开详情页填写")
+            return False
+
+        record_fields = [
+            ("mjz_id", record_id, {"param": "mjz_id"}),
+            ("mjz_cost", plan.prescription_cost, {"param": "mjz_cost"}),
+        ]
+
         try:
-            if not spec_str or not str(spec_str).strip() or not quantity_str or not str(quantity_str).strip():
-                return '', ''
-
-            spec = str(spec_str).strip().lower()
-            qty = str(quantity_str).strip().lower()
-
-            # 解析数量：值与单位
-            qty_match = re.match(r"(\d+\.?\d*)\s*(个|盒|瓶|支|片|粒|包|袋|箱|克|g|mg|毫克|ml|毫升)?", qty)
-            if not qty_match:
-                return '', ''
-
-            qty_value = float(qty_match.group(1))
-            qty_unit = qty_match.group(2) or ''
-
-            # 解析规格：基础含量与单位，及包装内单位数量（乘数）
-            # 支持 "50mg*12"、"0.25g×12片"、"125 mg x 12" 等格式
-            base_match = re.search(r"(\d+\.?\d*)\s*(mg|g|毫克|克|ml|毫升)", spec)
-            if not base_match:
-                return '', ''
-
-            base_value = float(base_match.group(1))
-            base_unit = base_match.group(2)
-
-            # 查找乘数（包装内单位数量）
-            mult_match = re.search(r"[x×*]\s*(\d+)", spec)
-            pieces_per_pkg = int(mult_match.group(1)) if mult_match else 1
-
-            # 判断数量单位是否为包装单位（盒/瓶/包/袋/箱）或直接单位（片/粒/支/个）
-            pkg_units = {'盒', '瓶', '包', '袋', '箱'}
-            direct_units = {'片', '粒', '支', '个'}
-
-            # 如果数量单位是质量或体积（克/g/mg/ml），直接用数量值作为总量，单位为其对应单位
-            if qty_unit in {'克', 'g', 'mg', '毫克', 'ml', '毫升'}:
-                # 统一返回英文单位，便于后续映射
-                unit_map = {'克': 'g', 'g': 'g', '毫克': 'mg', 'mg': 'mg', '毫升': 'ml', 'ml': 'ml'}
-                return (str(qty_value), unit_map.get(qty_unit, ''))
-
-            # 计算总件数（片/粒/支/个）
-            if qty_unit in pkg_units:
-                total_pieces = qty_value * pieces_per_pkg
-            elif qty_unit in direct_units or qty_unit == '':
-                # 若单位为空，视为直接单位（常见Excel未录入单位的情况）
-                total_pieces = qty_value
-            else:
-                # 未知单位，不计算
-                return '', ''
+            self.detail_submitter.submit(record_fields + list(plan.detail_fields))
+        except DirectSubmitError as e:
+            if not e.fallback:
+                raise
+            logger.warning(f"直接保存抗菌药详情失败，改为打开详情页填写: {e}")
+            return False
 
-            # 计算总用量：基础含量 × 件数
-            total_amount = base_value * total_pieces
+        logger.info(f"已直接保存抗菌药详情（记录ID: {record_id}）")
+        return True
 
-            # 保留最多两位小数（去除无意义的 .0）
-            if abs(total_amount - round(total_amount)) < 1e-9:
-                total_amount_str = str(int(round(total_amount)))
-            else:
-                total_amount_str = f"{total_amount:.2f}".rstrip('0').rstrip('.')
+    def _return_to_list(self, wait_time: float) -> None:
+        """
+        点击详情页的返回按钮回到主列表
 
-            # 规格单位标准化为英文（mg/g/ml），用于后续映射
-            unit_norm = {'毫克': 'mg', '克': 'g', 'mg': 'mg', 'g': 'g', '毫升': 'ml', 'ml': 'ml'}.get(base_unit, '')
+        Args:
+            wait_time: 等待回到主列表的最长时间（秒）
+        """
+        logger.info("查找返回按钮...")
+        try:
+            # 尝试多种定位方式
+            return_button = None
+            try:
+                return_button = self.driver.find_element(By.XPATH, "//input[@value='返回门诊处方用药情况调查表']")
+            except:
+                try:
+                    return_button = self.driver.find_element(By.XPATH, "//input[@onclick=\"fanhui('1')\"]")
+                except:
+                    logger.warning("未找到返回按钮，可能已自动返回")
 
-            return total_amount_str, unit_norm
+            if return_button:
+                logger.info("点击返回按钮...")
+                self.driver.execute_script("arguments[0].click();", return_button)
+                self._wait_returned(return_button, wait_time)
+                logger.info("已返回主列表")
 
-        except Exception as e:
-            logger.warning(f"规格与数量解析总用量失败: {e}")
-            return '', ''
+        except Exception as return_error:
+            logger.warning(f"点击返回按钮失败: {return_error}")
 
-    def fill_antibiotic_detail(self, row_data: Dict[str, Any]) -> bool:
+    def fill_antibiotic_detail(self, plan: FillPlan) -> bool:
         """
         填写抗菌药详细信息表单
 
         Args:
-            row_data: 当前行的数据字典（包含抗菌药相关字段）
+            plan: 当前行的填写计划（包含已计算好的详情字段）
 
         Returns:
             True 如果填写成功，False 否则
@@ -872,217 +1336,43 @@ class FormFiller:
         try:
             logger.info("开始填写抗菌药详细信息...")
 
-            # 等待抗菌药详情页面加载
+            # 等待抗菌药详情页面加载（检测特征元素）
             wait_time = self.antibiotic_config.get('antibiotic_detail', {}).get('wait_after_click', 2)
-            logger.info(f"等待页面加载（{wait_time}秒）...")
-            time.sleep(wait_time)
-
-            # 检查页面是否加载完成（检测特征元素）
+            logger.info("等待页面加载...")
             try:
                 self.wait.until(
                     EC.presence_of_element_located((By.ID, "drug_idName"))
                 )
+                self.waiter.settled()
                 logger.debug("抗菌药详情页面已加载")
             except TimeoutException:
                 logger.error("抗菌药详情页面加载超时")
                 return False
 
-            # 提取Excel中的相关字段数据
-            drug_name_raw = None
-            drug_spec = None
-            drug_amount = None
-            drug_dosage = None
-            drug_route = None
-            drug_quantity = None
-
-            # 遍历row_data查找相关字段（处理列名可能的换行符和空格）
-            for key, value in row_data.items():
-                key_clean = key.replace('\n', '').strip()
-                if '药品名称' in key_clean or '药品' in key_clean:
-                    drug_name_raw = str(value).strip() if value else None
-                elif '规格' in key_clean:
-                    drug_spec = str(value).strip() if value else None
-                elif '金额' in key_clean and '元' in key_clean and '处方' not in key_clean:
-                    drug_amount = str(value).strip() if value else None
-                elif '用法用量' in key_clean or '用法' in key_clean:
-                    drug_dosage = str(value).strip() if value else None
-                elif '途径' in key_clean:
-                    drug_route = str(value).strip() if value else None
-                elif '数量' in key_clean:
-                    drug_quantity = str(value).strip() if value else None
-
-            logger.info(f"提取到的数据 - 药品:{drug_name_raw}, 规格:{drug_spec}, 金额:{drug_amount}, 用法用量:{drug_dosage}, 途径:{drug_route}, 数量:{drug_quantity}")
-
-            # 1. 查询药品通用名
-            drug_info = None
-            if drug_name_raw:
-                cleaned_name = re.sub(r'\([^)]*\)', '', drug_name_raw)
-                # 去除可能多余的空格
-                cleaned_name = re.sub(r'\s+', ' ', cleaned_name).strip()
-                drug_info = self._search_drug(cleaned_name)
-                if drug_info:
-                    # 填写药品通用名和规格
-                    logger.info(f"填写药品通用名: {drug_info['name']}")
-                    # 使用JavaScript直接设置值（readonly字段）
-                    medicine_name_input = self.driver.find_element(By.ID, "medicineName")
-                    self.driver.execute_script("arguments[0].value = arguments[1];", medicine_name_input, drug_info['name'])
-
-                    # 填写药品ID（隐藏字段）
-                    drug_id_input = self.driver.find_element(By.ID, "drug_idName")
-                    self.driver.execute_script("arguments[0].value = arguments[1];", drug_id_input, drug_info['id'])
-
-                    # 填写规格
-                    spec_name_input = self.driver.find_element(By.ID, "specName")
-                    spec_value = drug_info.get('spec', drug_spec or '')
-                    self.driver.execute_script("arguments[0].value = arguments[1];", spec_name_input, spec_value)
-                    logger.info(f"填写规格: {spec_value}")
-                else:
-                    # 13. 点击返回按钮
-                    logger.info("查找返回按钮...")
-                    try:
-                        # 尝试多种定位方式
-                        return_button = None
-                        try:
-                            return_button = self.driver.find_element(By.XPATH, "//input[@value='返回门诊处方用药情况调查表']")
-                        except:
-                            try:
-                                return_button = self.driver.find_element(By.XPATH, "//input[@value='返回门诊处方用药情况调查表']")
-                            except:
-                                try:
-                                    return_button = self.driver.find_element(By.XPATH, "//input[@onclick=\"fanhui('1')\"]")
-                                except:
-                                    logger.warning("未找到返回按钮，可能已自动返回")
-
-                        if return_button:
-                            logger.info("点击返回按钮...")
-                            self.driver.execute_script("arguments[0].click();", return_button)
-                            time.sleep(1)  # 等待返回主列表
-                            logger.info("已返回主列表")
-
-                    except Exception as return_error:
-                        logger.warning(f"点击返回按钮失败: {return_error}")
-                    raise Exception("药品信息无法查询")
-
-            # 2. 填写金额
-            if drug_amount:
-                logger.info(f"填写金额: {drug_amount}")
-                amount_input = self.driver.find_element(By.ID, "amountOutpatient")
-                amount_input.clear()
-                amount_input.send_keys(str(drug_amount))
-
-            # 3. 解析用法用量
-            dosage_info = {}
-            if drug_dosage:
-                dosage_info = self._parse_dosage(drug_dosage)
-                logger.info(f"解析用法用量结果: {dosage_info}")
-
-            # 4. 解析规格与数量，计算总用量（规格*数量）
-            total_amount = ''
-            total_unit = ''
-            if drug_spec or drug_quantity:
-                computed_amount, computed_unit = self._compute_total_from_spec_and_quantity(drug_spec or '', drug_quantity or '')
-                total_amount = computed_amount
-                total_unit = computed_unit
-
-            # 如果无法从规格×数量计算，回退到数量或用法用量中的剂量
-            if not total_amount:
-                if drug_quantity:
-                    qty_match = re.match(r'(\d+\.?\d*)\s*(个|盒|瓶|支|片|粒|包|袋|克|g|mg|毫克)?', str(drug_quantity))
-                    if qty_match:
-                        total_amount = qty_match.group(1)
-                        if qty_match.group(2):
-                            total_unit = qty_match.group(2)
-
-            if not total_amount and dosage_info.get('dose_value'):
-                total_amount = dosage_info['dose_value']
-                total_unit = dosage_info.get('dose_unit', '')
-
-            # 5. 填写总用量
-            if total_amount:
-                logger.info(f"填写总用量: {total_amount}")
-                total_medicine_input = self.driver.find_element(By.ID, "totalMedicine")
-                total_medicine_input.clear()
-                total_medicine_input.send_keys(str(total_amount))
-
-            # 6. 选择总用量单位（g 对应 克, mg 对应 毫克）
-            if total_unit:
-                unit_value = self._normalize_unit(total_unit, 'dose')
-                logger.info(f"选择总用量单位: {total_unit} -> value={unit_value}")
-                total_unit_select = Select(self.driver.find_element(By.ID, "totalMedicineUnit"))
-                total_unit_select.select_by_value(unit_value)
-
-            # 7. 填写单次计量
-            if dosage_info.get('dose_value'):
-                logger.info(f"填写单次计量: {dosage_info['dose_value']}")
-                once_meter_input = self.driver.find_element(By.ID, "onceMeter")
-                once_meter_input.clear()
-                once_meter_input.send_keys(str(dosage_info['dose_value']))
-
-            # 8. 选择单次计量单位
-            if dosage_info.get('dose_unit'):
-                unit_value = self._normalize_unit(dosage_info['dose_unit'], 'dose')
-                logger.info(f"选择单次计量单位: {dosage_info['dose_unit']} -> value={unit_value}")
-                once_unit_select = Select(self.driver.find_element(By.ID, "onceMeterUnit"))
-                once_unit_select.select_by_value(unit_value)
-
-            # 9. 选择用法（频率）
-            if dosage_info.get('frequency'):
-                freq_value = self._normalize_unit(dosage_info['frequency'], 'frequency')
-                logger.info(f"选择用法频率: {dosage_info['frequency']} -> value={freq_value}")
-                freq_select = Select(self.driver.find_element(By.ID, "medicineFrequency"))
-                freq_select.select_by_value(freq_value)
-
-            # 10. 选择途径
-            if drug_route:
-                route_value = self._normalize_unit(drug_route, 'route')
-                logger.info(f"选择途径: {drug_route} -> value={route_value}")
-                route_select = Select(self.driver.find_element(By.ID, "medicineWay"))
-                route_select.select_by_value(route_value)
-
-            time.sleep(0.5)  # 短暂等待表单填写完成
+            # 详情页各字段已在填写计划中计算好，通过页面代理一次性填写
+            agent_fields = [
+                self.agent.field(element_id, value, config, raw=config.get("raw", False))
+                for element_id, value, config in plan.detail_fields
+            ]
+            failed = {name: error for name, error in self.agent.fill(agent_fields).items() if error}
+            if failed:
+                raise NoSuchElementException(f"详情字段填写失败: {failed}")
 
             # 11. 点击保存按钮
             logger.info("点击保存按钮...")
             save_button = self.driver.find_element(By.XPATH, "//input[@value='保存抗菌药详细信息录入']")
             self.driver.execute_script("arguments[0].click();", save_button)
-            time.sleep(1)  # 等待保存处理
 
-            # 12. 处理alert弹窗
+            # 12. 处理alert弹窗（等待保存处理）
             try:
                 logger.info("等待 Alert 弹窗...")
-                alert = self.driver.switch_to.alert
-                alert_text = alert.text
-                logger.info(f"检测到 Alert 弹窗: {alert_text}")
-                alert.accept()  # 点击确认
-                logger.info("已点击 Alert 确认按钮")
-                time.sleep(0.5)  # 等待 alert 关闭
+                self.waiter.accept_alert()
+                self.waiter.settled()
             except Exception as alert_error:
                 logger.debug(f"未检测到 Alert 弹窗或处理失败: {alert_error}")
 
             # 13. 点击返回按钮
-            logger.info("查找返回按钮...")
-            try:
-                # 尝试多种定位方式
-                return_button = None
-                try:
-                    return_button = self.driver.find_element(By.XPATH, "//input[@value='返回门诊处方用药情况调查表']")
-                except:
-                    try:
-                        return_button = self.driver.find_element(By.XPATH, "//input[@value='返回门诊处方用药情况调查表']")
-                    except:
-                        try:
-                            return_button = self.driver.find_element(By.XPATH, "//input[@onclick=\"fanhui('1')\"]")
-                        except:
-                            logger.warning("未找到返回按钮，可能已自动返回")
-
-                if return_button:
-                    logger.info("点击返回按钮...")
-                    self.driver.execute_script("arguments[0].click();", return_button)
-                    time.sleep(1)  # 等待返回主列表
-                    logger.info("已返回主列表")
-
-            except Exception as return_error:
-                logger.warning(f"点击返回按钮失败: {return_error}")
+            self._return_to_list(wait_time)
             logger.info("抗菌药详细信息填写完成")
             return True
 
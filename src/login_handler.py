@@ -2,14 +2,20 @@
 登录处理模块
 """
 
+import json
 import logging
+import os
+import threading
 import time
-from typing import Dict
+from pathlib import Path
+from typing import Dict, List, Optional
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
+from page_waiter import PageWaiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,27 +33,45 @@ class LoginHandler:
         "link_text": By.LINK_TEXT,
     }
 
-    def __init__(self, driver, login_config: Dict, timeout: int = 30):
+    def __init__(self, driver, login_config: Dict, timeout: int = 30, page_waiter: PageWaiter = None,
+                 user_data_dir: Optional[str] = None, worker_id: int = 0):
         """
         初始化登录处理器
 
         Args:
             driver: WebDriver 实例
-            login_config: 登录配置
+            login_config: 登录配置（session 项为登录会话保存配置）
             timeout: 超时时间（秒）
+            page_waiter: 页面等待器（可选，为 None 时使用默认参数创建）
+            user_data_dir: 浏览器使用的 Chrome 用户数据目录（可选，目录中可能保留着上次的登录状态）
+            worker_id: 工作会话编号，多个浏览器各自保存和恢复自己的 Cookie 文件（各自独立的 PHPSESSID）
         """
         self.driver = driver
         self.login_config = login_config
         self.timeout = timeout
         self.wait = WebDriverWait(driver, timeout)
+        self.waiter = page_waiter or PageWaiter(driver, timeout)
+        self.session_config = login_config.get("session", {})
+        self.user_data_dir = user_data_dir
+        self.worker_id = worker_id
+        self.session_restored = False  # 本次是否沿用了已保存的登录会话
 
     def login(self) -> bool:
         """
-        执行登录
+        执行登录（已保存的登录会话仍有效时直接沿用，不再填写登录表单）
 
         Returns:
             True 如果登录成功，False 否则
         """
+        if self.session_config.get("enabled", False):
+            try:
+                if self.restore_session():
+                    self.session_restored = True
+                    logger.info("已保存的登录会话仍有效，跳过登录")
+                    return True
+            except Exception as e:
+                logger.warning(f"恢复登录会话失败，重新登录: {e}")
+
         try:
             logger.info("开始执行登录流程...")
 
@@ -55,7 +79,7 @@ class LoginHandler:
             login_url = self.login_config.get("login_url")
             logger.info(f"打开登录页面: {login_url}")
             self.driver.get(login_url)
-            time.sleep(2)  # 等待页面加载
+            self.waiter.settled()
 
             # 获取登录信息
             username = self.login_config.get("username")
@@ -70,26 +94,28 @@ class LoginHandler:
             username_config = elements_config.get("username_field", {})
             self._fill_field(username, username_config, "用户名")
 
-            time.sleep(0.5)
-
             # 填写密码
             password_config = elements_config.get("password_field", {})
             self._fill_field(password, password_config, "密码")
 
-            time.sleep(0.5)
-
             # 点击登录按钮
             login_button_config = elements_config.get("login_button", {})
+            previous_url = self.driver.current_url
             self._click_button(login_button_config, "登录按钮")
 
+            # 登录成功会跳转页面；URL 未变化（如密码错误）时超时后交给验证步骤判断
             logger.info("等待登录响应...")
-            time.sleep(3)  # 等待登录处理
+            if not self.waiter.url_changes(previous_url):
+                logger.warning("登录后页面URL未变化")
+            self.waiter.settled()
 
             # 验证登录是否成功
             success = self._verify_login_success()
 
             if success:
                 logger.info("登录成功！")
+                if self.session_config.get("enabled", False):
+                    self.save_session()
                 return True
             else:
                 logger.error("登录失败")
@@ -99,6 +125,129 @@ class LoginHandler:
             logger.error(f"登录过程发生错误: {e}")
             return False
 
+    def _check_url(self) -> Optional[str]:
+        """检查会话是否有效时打开的页面：session.check_url，未配置时使用 url_contains 验证的 URL"""
+        check_url = self.session_config.get("check_url")
+        if check_url:
+            return check_url
+        success_indicator = self.login_config.get("success_indicator", {})
+        value = success_indicator.get("value") or ""
+        if success_indicator.get("type") == "url_contains" and value.startswith("http"):
+            return value
+        return None
+
+    def _cookie_file(self) -> Optional[Path]:
+        """
+        本会话的 Cookie 文件：第一个浏览器使用 session.cookie_file，其余浏览器使用带编号的文件
+        （如 cookies_worker1.json），避免多个浏览器共用同一个 PHPSESSID 而被服务器的会话锁串行化
+        """
+        cookie_file = self.session_config.get("cookie_file")
+        if not cookie_file:
+            return None
+        path = Path(cookie_file)
+        if self.worker_id > 0:
+            path = path.with_name(f"{path.stem}_worker{self.worker_id}{path.suffix}")
+        return path
+
+    def _on_login_page(self) -> bool:
+        """当前页面是否为登录页（URL 为登录页或页面上有登录表单的用户名输入框）"""
+        login_url = self.login_config.get("login_url")
+        if login_url and self.driver.current_url.rstrip("/") == login_url.rstrip("/"):
+            return True
+        username_config = self.login_config.get("elements", {}).get("username_field", {})
+        if not username_config.get("value"):
+            return False
+        by = self.LOCATOR_MAP.get(username_config.get("locator", "id"), By.ID)
+        return bool(self.driver.find_elements(by, username_config["value"]))
+
+    def _session_valid(self) -> bool:
+        """
+        检查打开 check_url 后会话是否有效
+
+        打开的就是 success_indicator 的 URL，URL 验证只有服务器重定向时才会失败，
+        因此还要求页面上没有登录表单（会话失效时部分页面直接显示登录表单而不重定向）
+        """
+        if not self._verify_login_success():
+            return False
+        if self._on_login_page():
+            logger.warning("检查会话时页面显示登录表单，会话已失效")
+            return False
+        return True
+
+    def _load_cookies(self, cookie_file: Optional[Path]) -> Optional[List[Dict]]:
+        """
+        读取本会话保存的 Cookie（只接受与当前登录账号一致的文件）
+
+        Args:
+            cookie_file: Cookie 文件路径
+
+        Returns:
+            Cookie 列表，文件不存在、格式不符或属于其他账号时返回 None
+        """
+        if cookie_file is None or not cookie_file.exists():
+            return None
+        with open(cookie_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if not isinstance(saved, dict) or saved.get("username") != self.login_config.get("username"):
+            # 旧格式的文件没有记录账号，同样视为其他账号
+            logger.info("保存的登录会话属于其他账号，重新登录")
+            return None
+        return saved.get("cookies") or []
+
+    def restore_session(self) -> bool:
+        """
+        恢复上次的登录会话：先检查浏览器用户数据目录中的登录状态，再载入保存的 Cookie 后检查
+
+        用户数据目录按账号区分（见 create_driver_manager），Cookie 文件中记录了所属账号，
+        更换账号时不会沿用上一个账号的会话
+
+        Returns:
+            True 如果会话有效（浏览器已停留在登录后的页面）
+        """
+        check_url = self._check_url()
+        cookies = self._load_cookies(self._cookie_file())
+        if not check_url or not (self.user_data_dir or cookies is not None):
+            return False
+
+        logger.info(f"检查已保存的登录会话: {check_url}")
+        self.driver.get(check_url)
+        self.waiter.settled()
+        if self.user_data_dir and self._session_valid():
+            return True
+        if cookies is None:
+            return False
+
+        # 当前页面已在网站域名下，可以写入保存的 Cookie
+        now = time.time()
+        for cookie in cookies:
+            if cookie.get("expiry") and cookie["expiry"] < now:
+                continue
+            try:
+                self.driver.add_cookie(cookie)
+            except Exception as e:
+                logger.debug(f"写入 Cookie {cookie.get('name')} 失败: {e}")
+
+        self.driver.get(check_url)
+        self.waiter.settled()
+        return self._session_valid()
+
+    def save_session(self) -> None:
+        """把浏览器当前的 Cookie（含 PHPSESSID）和登录账号保存到本会话的 Cookie 文件，供下次运行沿用"""
+        path = self._cookie_file()
+        if path is None:
+            return
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            saved = {"username": self.login_config.get("username"), "cookies": self.driver.get_cookies()}
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, ensure_ascii=False)
+            os.replace(temp_path, path)  # 多个浏览器同时登录时整体替换，不会读到写了一半的文件
+            logger.info(f"登录会话已保存: {path}")
+        except Exception as e:
+            logger.warning(f"保存登录会话失败: {e}")
+
     def _fill_field(self, value: str, config: Dict, field_name: str) -> None:
         """
         填写输入框
@@ -0,0 +1,186 @@
+"""
+字典候选排序模块
+按字符 n-gram 相似度和编辑距离对字典接口返回的候选项排序，选出与原始关键词最接近的一项
+"""
+
+import logging
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# n-gram 余弦相似度在总分中的权重，剩余部分由编辑距离相似度补足
+NGRAM_WEIGHT = 0.7
+# 只对 n-gram 得分最高的前几项计算编辑距离，保证每组候选的打分耗时稳定
+EDIT_DISTANCE_TOP_K = 5
+# 药品规格与 Excel 规格含量一致时的加分
+SPEC_MATCH_BONUS = 0.3
+
+# 含量单位换算到毫克/毫升
+_STRENGTH_UNITS = {'mg': 1.0, '毫克': 1.0, 'g': 1000.0, '克': 1000.0, 'ml': 1.0, '毫升': 1.0}
+_STRENGTH_PATTERN = re.compile(r'(\d+\.?\d*)\s*(mg|g|毫克|克|ml|毫升)', re.IGNORECASE)
+
+
+def _normalize(text: Any) -> str:
+    """全角转半角、去除空白和括号标注、小写"""
+    text = unicodedata.normalize("NFKC", str(text or ''))
+    text = re.sub(r'\([^)]*\)', '', text)
+    return re.sub(r'\s+', '', text).lower()
+
+
+@lru_cache(maxsize=20000)
+def ngram_vector(text: str) -> Tuple[Dict[str, int], float]:
+    """
+    计算字符 1-gram + 2-gram 向量（按文本缓存，同一候选只计算一次）
+
+    Args:
+        text: 已规范化的文本
+
+    Returns:
+        (n-gram 计数字典, 向量模长)
+    """
+    counts: Dict[str, int] = {}
+    for n in (1, 2):
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            counts[gram] = counts.get(gram, 0) + 1
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return counts, norm
+
+
+def ngram_similarity(a: str, b: str) -> float:
+    """两个已规范化文本的 n-gram 余弦相似度（0~1）"""
+    vec_a, norm_a = ngram_vector(a)
+    vec_b, norm_b = ngram_vector(b)
+    if not norm_a or not norm_b:
+        return 0.0
+    if len(vec_a) > len(vec_b):
+        vec_a, vec_b = vec_b, vec_a
+    dot = sum(count * vec_b.get(gram, 0) for gram, count in vec_a.items())
+    return dot / (norm_a * norm_b)
+
+
+def edit_similarity(a: str, b: str) -> float:
+    """基于 Levenshtein 编辑距离的相似度（0~1）"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+
+    previous = list(range(len(b) + 1))
+    for i, ch_a in enumerate(a, start=1):
+        current = [i]
+        for j, ch_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ch_a != ch_b)
+            ))
+        previous = current
+    return 1.0 - previous[-1] / max(len(a), len(b))
+
+
+def parse_strength(spec: Any) -> Optional[float]:
+    """
+    从规格字符串中解析单位含量（换算为毫克/毫升）
+
+    Args:
+        spec: 规格字符串，如 "50mg*12"、"0.25g"
+
+    Returns:
+        含量数值，无法解析时返回 None
+    """
+    match = _STRENGTH_PATTERN.search(unicodedata.normalize("NFKC", str(spec or '')))
+    if not match:
+        return None
+    return float(match.group(1)) * _STRENGTH_UNITS[match.group(2).lower()]
+
+
+def rank_candidates(
+    keyword: str,
+    candidates: List[Dict[str, Any]],
+    name_field: str,
+    spec: Optional[str] = None,
+    spec_builder=None
+) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    对字典候选项打分并按得分从高到低排序（得分相同时保持接口返回顺序）
+
+    Args:
+        keyword: 原始查询关键词
+        candidates: 字典接口返回的候选列表
+        name_field: 候选项中的名称字段（如 diag_name、drug_name）
+        spec: Excel 中的规格（仅药品），与候选项规格含量一致时加分
+        spec_builder: 从候选项构造规格字符串的函数（仅药品）
+
+    Returns:
+        [(得分, 候选项), ...]，首项得分为精确值，未精确计算的项取得分下界
+    """
+    target = _normalize(keyword)
+    target_strength = parse_strength(spec) if spec else None
+
+    scored = []
+    for position, candidate in enumerate(candidates):
+        name = _normalize(candidate.get(name_field))
+        bonus = 0.0
+        if target_strength is not None and spec_builder:
+            candidate_strength = parse_strength(spec_builder(candidate))
+            if candidate_strength is not None and abs(candidate_strength - target_strength) < 1e-6:
+                bonus = SPEC_MATCH_BONUS
+        similarity = 1.0 if name == target else ngram_similarity(target, name)
+        scored.append([similarity, position, name, candidate, bonus])
+
+    # 编辑距离只用于细化 n-gram 得分（含规格加分）最高的几项；其余项先用长度差给出的
+    # 编辑相似度上界估算，上界不低于当前最高精确分时才精确计算。
+    # 被跳过的项按编辑相似度下界 0 计分，保证其得分不会高于真实值，排在首位的一定是精确分
+    scored.sort(key=lambda item: (-(item[0] + item[4]), item[1]))
+    best_exact = 0.0
+    for rank, item in enumerate(scored):
+        similarity, _, name, _, bonus = item
+        if name == target:
+            item[0] = 1.0 + bonus
+        else:
+            length = max(len(target), len(name)) or 1
+            upper = (NGRAM_WEIGHT * similarity
+                     + (1 - NGRAM_WEIGHT) * (1 - abs(len(target) - len(name)) / length) + bonus)
+            if rank < EDIT_DISTANCE_TOP_K or upper + 1e-9 >= best_exact:
+                item[0] = NGRAM_WEIGHT * similarity + (1 - NGRAM_WEIGHT) * edit_similarity(target, name) + bonus
+            else:
+                item[0] = NGRAM_WEIGHT * similarity + bonus
+                continue
+        best_exact = max(best_exact, item[0])
+
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [(item[0], item[3]) for item in scored]
+
+
+def select_best_match(
+    keyword: str,
+    candidates: List[Dict[str, Any]],
+    name_field: str,
+    spec: Optional[str] = None,
+    spec_builder=None
+) -> Optional[Dict[str, Any]]:
+    """
+    选出与关键词最接近的候选项
+
+    Args:
+        参见 rank_candidates()
+
+    Returns:
+        得分最高的候选项，候选列表为空时返回 None
+    """
+    if not candidates:
+        return None
+
+    ranked = rank_candidates(keyword, candidates, name_field, spec, spec_builder)
+    score, match = ranked[0]
+    if match is not candidates[0]:
+        logger.info(
+            f"候选排序: {keyword} -> {match.get(name_field)}（得分 {score:.2f}），"
+            f"未采用接口首项 {candidates[0].get(name_field)}"
+        )
+    return match
@@ -0,0 +1,221 @@
+"""
+页面代理脚本模块
+向页面注入一段 JS 代理，一次 execute_script 调用即可批量填写输入框、下拉框、单选框并点击按钮
+"""
+
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 页面代理：按字段列表依次定位元素并赋值，触发 input/change（带 onblur 的元素还会触发 focus/blur）事件，返回每个字段的错误信息（成功为 null）
+_AGENT_SCRIPT = """
+window.__formFillerAgent = (function () {
+    function find(f) {
+        switch (f.locator) {
+            case 'id': return document.getElementById(f.value);
+            case 'name': return document.getElementsByName(f.value)[0] || null;
+            case 'class_name': return document.getElementsByClassName(f.value)[0] || null;
+            case 'tag_name': return document.getElementsByTagName(f.value)[0] || null;
+            case 'xpath':
+                return document.evaluate(f.value, document, null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            case 'link_text':
+                return Array.prototype.find.call(document.getElementsByTagName('a'), function (a) {
+                    return a.textContent.trim() === f.value;
+                }) || null;
+            default: return document.querySelector(f.value);
+        }
+    }
+
+    function fire(el, type) {
+        el.dispatchEvent(new Event(type, {bubbles: true}));
+    }
+
+    function findRadio(f) {
+        if (f.locator === 'name') {
+            return Array.prototype.find.call(document.getElementsByName(f.value), function (r) {
+                return r.value === f.data;
+            }) || null;
+        }
+        return find(f);
+    }
+
+    function setOne(f) {
+        if (f.type === 'hidden') {
+            return null;
+        }
+        var el = f.type === 'radio' ? findRadio(f) : find(f);
+        if (!el) {
+            return 'not found';
+        }
+        if (f.type === 'radio') {
+            if (!el.checked) { el.click(); }
+        } else if (f.type === 'button') {
+            el.click();
+        } else if (f.type === 'select') {
+            var options = Array.prototype.slice.call(el.options);
+            var option = options.find(function (o) { return o.value === f.data; })
+                || options.find(function (o) { return o.text.trim() === f.data; });
+            if (!option) {
+                return 'no option: ' + f.data;
+            }
+            el.value = option.value;
+            fire(el, 'change');
+        } else if (f.raw) {
+            // 直接赋值，不触发 onfocus/onblur 等页面事件（如诊断名称/编码）
+            el.removeAttribute('onfocus');
+            el.removeAttribute('onblur');
+            el.value = f.data;
+        } else {
+            // 带 onblur 的输入框（如联动校验、自动补全）需要完整的 focus -> 赋值 -> blur 事件序列
+            var hasBlur = el.hasAttribute('onblur');
+            if (hasBlur) { fire(el, 'focus'); }
+            el.value = f.data;
+            fire(el, 'input');
+            fire(el, 'change');
+            if (hasBlur) { fire(el, 'blur'); }
+        }
+        return null;
+    }
+
+    return {
+        options: function (fields) {
+            var results = {};
+            fields.forEach(function (f) {
+                var el = find(f);
+                if (el && el.options) {
+                    results[f.name] = {};
+                    Array.prototype.forEach.call(el.options, function (o) {
+                        results[f.name][o.text.trim()] = o.value;
+                    });
+                }
+            });
+            return results;
+        },
+        fill: function (fields) {
+            var results = {};
+            fields.forEach(function (f) {
+                try {
+                    results[f.name] = setOne(f);
+                } catch (e) {
+                    results[f.name] = String(e && e.message || e);
+                }
+            });
+            return results;
+        }
+    };
+})();
+"""
+
+_CALL_SCRIPT = "return window.__formFillerAgent ? window.__formFillerAgent[arguments[0]](arguments[1]) : 'missing';"
+
+
+class PageAgent:
+    """页面代理（每个页面只注入一次，之后每次批量操作只需一次 WebDriver 往返）"""
+
+    def __init__(self, driver):
+        """
+        初始化页面代理
+
+        Args:
+            driver: WebDriver 实例
+        """
+        self.driver = driver
+        self.call_count = 0
+
+    @staticmethod
+    def field(name: str, value: Any, config: Dict, raw: bool = False) -> Dict[str, Any]:
+        """
+        构造一个字段操作
+
+        Args:
+            name: 字段名（用于返回结果和日志）
+            value: 要填写的值；单选框为选项值，按钮可为 None
+            config: 元素配置（type、locator、value，与 form_elements 配置格式一致）
+            raw: 是否直接赋值而不触发事件
+
+        Returns:
+            字段操作字典
+        """
+        return {
+            'name': name,
+            'type': config.get("type", "input"),
+            'locator': config.get("locator", "id"),
+            'value': config.get("value"),
+            'data': '' if value is None else str(value),
+            'raw': raw,
+        }
+
+    def _call(self, method: str, argument: Any) -> Any:
+        """
+        调用页面代理的方法，当前页面尚未注入代理时先注入
+
+        Args:
+            method: 代理方法名（fill / options）
+            argument: 方法参数
+
+        Returns:
+            方法返回值
+        """
+        self.call_count += 1
+        result = self.driver.execute_script(_CALL_SCRIPT, method, argument)
+        if result == 'missing':
+            # 新页面尚未注入代理，注入后在同一次调用中执行
+            logger.debug("向当前页面注入页面代理")
+            result = self.driver.execute_script(_AGENT_SCRIPT + _CALL_SCRIPT, method, argument)
+        return result
+
+    def read_options(self, fields: List[Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
+        """
+        一次读取多个下拉框的全部选项
+
+        Args:
+            fields: field() 构造的字段列表（只需定位信息）
+
+        Returns:
+            {字段名: {选项文本: 选项值}}，找不到的下拉框不包含在结果中
+        """
+        if not fields:
+            return {}
+        return self._call('options', fields) or {}
+
+    def fill(self, fields: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """
+        在一次脚本调用中依次执行全部字段操作
+
+        Args:
+            fields: field() 构造的字段操作列表
+
+        Returns:
+            {字段名: 错误信息}，成功的字段为 None
+        """
+        if not fields:
+            return {}
+
+        results = self._call('fill', fields)
+        if results is None:
+            # 点击按钮弹出 Alert 时脚本被中断、没有返回值，此时操作已经执行
+            logger.debug("页面代理执行被弹窗中断")
+            return {field['name']: None for field in fields}
+
+        for name, error in results.items():
+            if error:
+                logger.debug(f"页面代理填写字段 {name} 失败: {error}")
+        return results
+
+    def click(self, name: str, config: Dict) -> bool:
+        """
+        通过页面代理点击按钮（避免元素遮挡问题）
+
+        Args:
+            name: 按钮名称（用于日志）
+            config: 元素配置（locator、value）
+
+        Returns:
+            True 如果点击成功
+        """
+        field = self.field(name, None, config)
+        field['type'] = 'button'
+        return self.fill([field]).get(name) is None
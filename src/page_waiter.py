@@ -0,0 +1,262 @@
+"""
+页面等待模块
+基于显式条件（URL 变化、元素状态、Alert、document.readyState、jQuery/XHR 空闲、CDP 网络空闲）等待页面，
+替代固定时长的 time.sleep
+"""
+
+import json
+import logging
+import time
+from typing import Callable, Dict, Optional, Any
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+
+# 页面空闲检测脚本：首次执行时给 XMLHttpRequest 打补丁统计进行中的请求数，
+# 之后返回 readyState 是否完成（arguments[0] 为 true 时 DOM 就绪即可）、jQuery 与原生 XHR 是否都已空闲
+_PAGE_IDLE_SCRIPT = """
+if (!window.__formFillerXhr) {
+    var state = window.__formFillerXhr = {pending: 0};
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        state.pending++;
+        this.addEventListener('loadend', function () { state.pending--; });
+        return send.apply(this, arguments);
+    };
+}
+return (document.readyState === 'complete' || (arguments[0] && document.readyState === 'interactive'))
+    && (!window.jQuery || window.jQuery.active === 0)
+    && window.__formFillerXhr.pending === 0;
+"""
+
+# 网络空闲检测只统计页面跳转和 Ajax 请求，图片、样式等子资源不影响
+_TRACKED_RESOURCE_TYPES = {"Document", "XHR", "Fetch"}
+
+
+class PageWaiter:
+    """页面条件等待器"""
+
+    def __init__(self, driver, timeout: float = 30, poll_interval: float = 0.1,
+                 alert_timeout: float = 3, settle_timeout: float = 10, min_pacing: float = 0.0,
+                 dom_ready: bool = False, network_idle: bool = False, network_quiet: float = 0.2):
+        """
+        初始化页面等待器
+
+        Args:
+            driver: WebDriver 实例
+            timeout: 元素、URL 等条件的默认超时时间（秒）
+            poll_interval: 条件轮询间隔（秒）
+            alert_timeout: 等待 Alert 弹窗出现的最长时间（秒），没有弹窗的操作最多等待这么久
+            settle_timeout: 等待页面加载完成、Ajax 请求结束的最长时间（秒）
+            min_pacing: 两次 pace() 之间的最小间隔（秒），避免提交过快
+            dom_ready: 页面空闲判断是否在 DOM 就绪（readyState 为 interactive）时即成立，配合 eager/none 页面加载策略
+            network_idle: 是否读取 Chrome 性能日志（CDP Network 事件），等待页面跳转和 Ajax 请求全部结束
+                （浏览器需开启 goog:loggingPrefs 的 performance 日志）
+            network_quiet: 最后一个请求结束后需要保持空闲的时长（秒）
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.alert_timeout = alert_timeout
+        self.settle_timeout = settle_timeout
+        self.min_pacing = min_pacing
+        self.dom_ready = dom_ready
+        self.network_idle = network_idle
+        self.network_quiet = network_quiet
+        self._last_pace: Optional[float] = None
+        self._pending_requests: Dict[str, float] = {}  # 进行中的请求ID -> 开始时间
+        self._last_network_activity = 0.0
+
+    def until(self, condition: Callable, timeout: Optional[float] = None, message: str = "") -> Any:
+        """
+        等待条件成立
+
+        Args:
+            condition: 以 driver 为参数的条件函数，返回真值时结束等待
+            timeout: 超时时间（秒），为 None 时使用默认值
+            message: 超时异常信息
+
+        Returns:
+            条件函数的返回值
+
+        Raises:
+            TimeoutException: 超时条件仍未成立
+        """
+        wait = WebDriverWait(
+            self.driver,
+            self.timeout if timeout is None else timeout,
+            poll_frequency=self.poll_interval
+        )
+        return wait.until(condition, message)
+
+    def check(self, condition: Callable, timeout: Optional[float] = None) -> Any:
+        """
+        等待条件成立，超时返回 None 而不抛出异常
+
+        Args:
+            condition: 以 driver 为参数的条件函数
+            timeout: 超时时间（秒）
+
+        Returns:
+            条件函数的返回值，超时返回 None
+        """
+        try:
+            return self.until(condition, timeout)
+        except TimeoutException:
+            return None
+
+    def present(self, locator: tuple, timeout: Optional[float] = None):
+        """等待元素出现在 DOM 中并返回该元素"""
+        return self.until(EC.presence_of_element_located(locator), timeout)
+
+    def visible(self, locator: tuple, timeout: Optional[float] = None):
+        """等待元素可见并返回该元素"""
+        return self.until(EC.visibility_of_element_located(locator), timeout)
+
+    def clickable(self, locator: tuple, timeout: Optional[float] = None):
+        """等待元素可点击并返回该元素"""
+        return self.until(EC.element_to_be_clickable(locator), timeout)
+
+    def enabled(self, element, timeout: Optional[float] = None) -> bool:
+        """
+        等待元素的 disabled 属性被移除
+
+        Args:
+            element: 页面元素
+            timeout: 超时时间（秒）
+
+        Returns:
+            True 如果元素已启用
+        """
+        return bool(self.check(lambda d: element.get_attribute("disabled") is None, timeout))
+
+    def gone(self, element, timeout: Optional[float] = None) -> bool:
+        """
+        等待元素从页面移除或隐藏（页面跳转、弹层关闭）
+
+        Args:
+            element: 页面元素
+            timeout: 超时时间（秒）
+
+        Returns:
+            True 如果元素已移除或隐藏
+        """
+        return bool(self.check(EC.invisibility_of_element(element), timeout))
+
+    def url_changes(self, old_url: str, timeout: Optional[float] = None) -> bool:
+        """
+        等待 URL 发生变化
+
+        Args:
+            old_url: 操作前的 URL
+            timeout: 超时时间（秒）
+
+        Returns:
+            True 如果 URL 已变化
+        """
+        return bool(self.check(EC.url_changes(old_url), timeout))
+
+    def alert(self, timeout: Optional[float] = None):
+        """
+        等待 Alert 弹窗出现
+
+        Args:
+            timeout: 超时时间（秒），为 None 时使用 alert_timeout
+
+        Returns:
+            Alert 对象，超时未出现返回 None
+        """
+        return self.check(EC.alert_is_present(), self.alert_timeout if timeout is None else timeout)
+
+    def accept_alert(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        等待 Alert 弹窗出现并点击确认
+
+        Args:
+            timeout: 超时时间（秒），为 None 时使用 alert_timeout
+
+        Returns:
+            弹窗文本，未出现弹窗时返回 None
+        """
+        alert = self.alert(timeout)
+        if alert is None:
+            logger.debug("未检测到 Alert 弹窗")
+            return None
+
+        alert_text = alert.text
+        logger.info(f"检测到 Alert 弹窗: {alert_text}")
+        alert.accept()
+        logger.info("已点击 Alert 确认按钮")
+        return alert_text
+
+    def _page_idle(self, driver) -> bool:
+        # 每次轮询都读取网络事件，避免性能日志积压
+        network_idle = self._network_idle()
+        try:
+            return bool(driver.execute_script(_PAGE_IDLE_SCRIPT, self.dom_ready)) and network_idle
+        except WebDriverException:
+            # 页面跳转过程中或有未处理的 Alert 时脚本无法执行，视为未就绪
+            return False
+
+    def _network_idle(self) -> bool:
+        """读取性能日志中的 CDP Network 事件，返回页面跳转和 Ajax 请求是否都已结束并保持了 network_quiet 秒"""
+        if not self.network_idle:
+            return True
+
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException as e:
+            logger.warning(f"无法读取浏览器性能日志，停用网络空闲检测: {e}")
+            self.network_idle = False
+            return True
+
+        now = time.monotonic()
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                if params.get("type") in _TRACKED_RESOURCE_TYPES:
+                    self._pending_requests[params.get("requestId")] = now
+                    self._last_network_activity = now
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                if self._pending_requests.pop(params.get("requestId"), None) is not None:
+                    self._last_network_activity = now
+
+        # 页面跳转后旧页面的请求可能收不到结束事件，超过 settle_timeout 的请求不再等待
+        for request_id, started in list(self._pending_requests.items()):
+            if now - started > self.settle_timeout:
+                del self._pending_requests[request_id]
+
+        return not self._pending_requests and now - self._last_network_activity >= self.network_quiet
+
+    def settled(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待页面加载完成且 jQuery/XHR 请求全部结束
+
+        Args:
+            timeout: 超时时间（秒），为 None 时使用 settle_timeout
+
+        Returns:
+            True 如果页面已空闲，超时返回 False（调用方通常继续执行，由后续元素等待兜底）
+        """
+        idle = self.check(self._page_idle, self.settle_timeout if timeout is None else timeout)
+        if not idle:
+            logger.debug("等待页面空闲超时")
+        return bool(idle)
+
+    def pace(self) -> None:
+        """保证相邻两次调用之间至少间隔 min_pacing 秒（只等待不足的部分）"""
+        now = time.monotonic()
+        if self._last_pace is not None and self.min_pacing > 0:
+            remaining = self.min_pacing - (now - self._last_pace)
+            if remaining > 0:
+                time.sleep(remaining)
+                now = time.monotonic()
+        self._last_pace = now
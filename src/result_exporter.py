@@ -1,13 +1,17 @@
 """
 结果导出模块
-支持导出结果到 Excel 文件
+支持导出结果到 Excel 文件；逐行写入时先追加到临时 JSONL 文件，结束时流式转换为 Excel/CSV
 """
 
-import pandas as pd
+import csv
+import json
+import math
+import threading
 import logging
+from openpyxl import Workbook
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
 
@@ -29,44 +33,12 @@ class ResultExporter:
         # 确保输出目录存在
         self.output_file.parent.mkdir(parents=True, exist_ok=True)
 
-    def export_results(self, results: List[Dict]) -> bool:
-        """
-        导出结果到 Excel 文件
-
-        Args:
-            results: 结果列表，每个结果是一个字典
-
-        Returns:
-            True 如果导出成功
-        """
-        try:
-            if not results:
-                logger.warning("结果列表为空，无需导出")
-                return False
-
-            # 创建 DataFrame
-            df = pd.DataFrame(results)
-
-            # 导出到 Excel
-            df.to_excel(self.output_file, index=False, engine='openpyxl')
-
-            logger.info(f"成功导出 {len(results)} 条结果到: {self.output_file}")
-            return True
-
-        except Exception as e:
-            logger.error(f"导出结果失败: {e}")
-            return False
-
-    def append_result(self, result: Dict, all_results: List[Dict]) -> None:
-        """
-        添加单条结果到结果列表
-
-        Args:
-            result: 单条结果字典
-            all_results: 所有结果列表
-        """
-        all_results.append(result)
-        logger.debug(f"添加结果: {result}")
+        # 逐行写入的临时文件：每条结果一行 JSON，记录每行的文件偏移量，结束时按原始行号顺序读回
+        self.partial_file = self.output_file.with_suffix(".partial.jsonl")
+        self._partial = None
+        self._offsets: Dict[int, int] = {}  # {行号: 临时文件中的偏移量}
+        self._columns: Dict[str, None] = {}  # 按首次出现顺序记录的列名
+        self._lock = threading.Lock()
 
     def create_result_entry(
         self,
@@ -96,3 +68,76 @@ class ResultExporter:
         }
 
         return result
+
+    def write_result(self, index: int, result: Dict) -> None:
+        """
+        写入单条结果（线程安全），立即追加到临时文件，内存中只保留偏移量
+
+        Args:
+            index: 原始行号（从 0 开始，决定最终文件中的顺序）
+            result: 结果字典
+        """
+        line = json.dumps(result, ensure_ascii=False, default=str).encode('utf-8') + b'\n'
+        with self._lock:
+            if self._partial is None:
+                self._partial = open(self.partial_file, 'wb')
+            self._offsets[index] = self._partial.tell()
+            self._partial.write(line)
+            self._partial.flush()
+            for column in result:
+                self._columns.setdefault(column, None)
+
+    def _iter_partial_rows(self):
+        """按行号顺序从临时文件中逐条读回结果"""
+        with open(self.partial_file, 'rb') as f:
+            for index in sorted(self._offsets):
+                f.seek(self._offsets[index])
+                result = json.loads(f.readline())
+                yield [self._cell(result.get(column)) for column in self._columns]
+
+    @staticmethod
+    def _cell(value: Any) -> Any:
+        """NaN 写成空单元格（与 DataFrame.to_excel 一致）"""
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return value
+
+    def finalize(self) -> bool:
+        """
+        把逐行写入的结果转换为最终文件（.csv 输出 CSV，其余输出 Excel），成功后删除临时文件
+
+        Returns:
+            True 如果导出成功；失败时临时文件保留，仍可查看已处理的结果
+        """
+        with self._lock:
+            if self._partial is not None:
+                self._partial.close()
+                self._partial = None
+
+        if not self._offsets:
+            logger.warning("结果列表为空，无需导出")
+            return False
+
+        try:
+            columns = list(self._columns)
+            if self.output_file.suffix.lower() == ".csv":
+                with open(self.output_file, 'w', encoding='utf-8-sig', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(columns)
+                    writer.writerows(self._iter_partial_rows())
+            else:
+                # 只写模式逐行写入，内存占用与行数无关
+                workbook = Workbook(write_only=True)
+                sheet = workbook.create_sheet()
+                sheet.append(columns)
+                for row in self._iter_partial_rows():
+                    sheet.append(row)
+                workbook.save(self.output_file)
+
+            self.partial_file.unlink()
+            logger.info(f"成功导出 {len(self._offsets)} 条结果到: {self.output_file}")
+            return True
+
+        except Exception as e:
+            logger.error(f"导出结果失败，已处理的结果保存在 {self.partial_file}: {e}")
+            return False
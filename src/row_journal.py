@@ -0,0 +1,151 @@
+"""
+处理进度日志模块
+每处理一行就向 JSONL 文件追加一条记录并立即落盘（fsync），程序崩溃或中断后可据此跳过已完成的行继续处理
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RowJournal:
+    """逐行处理进度日志（只追加）"""
+
+    STATUS_STARTED = "提交中"
+    STATUS_SUCCESS = "成功"
+    STATUS_FAILED = "失败"
+
+    def __init__(self, journal_path: str):
+        """
+        初始化进度日志
+
+        Args:
+            journal_path: 日志文件路径（JSONL 格式）
+        """
+        self.journal_path = Path(journal_path)
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(row: Dict[str, Any], seen: Dict[str, int]) -> str:
+        """
+        计算一行数据的指纹（行内容的 SHA-1，内容完全相同的行按出现次序追加序号区分）
+
+        Args:
+            row: 行数据
+            seen: 已出现的指纹计数，逐行读取时在同一次运行中共用
+
+        Returns:
+            行指纹
+        """
+        content = json.dumps(row, ensure_ascii=False, sort_keys=True, default=str)
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        seen[digest] = seen.get(digest, 0) + 1
+        return digest if seen[digest] == 1 else f"{digest}#{seen[digest]}"
+
+    @classmethod
+    def resume_status(cls, entry: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        续传时根据上次的最后一条记录决定如何处理该行
+
+        Args:
+            entry: load() 返回的该行记录，没有记录时为 None
+
+        Returns:
+            STATUS_SUCCESS: 已完成，跳过；
+            STATUS_STARTED: 已发出提交但结果未知，服务器可能已保存，跳过并提示人工核对；
+            None: 未处理或确定失败，重新处理
+        """
+        if entry and entry['status'] in (cls.STATUS_SUCCESS, cls.STATUS_STARTED):
+            return entry['status']
+        return None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        读取日志中每行数据的最后一条记录
+
+        Returns:
+            {指纹: 记录}；日志不存在时返回空字典，崩溃时写了一半的记录会被忽略
+        """
+        entries: Dict[str, Dict[str, Any]] = {}
+        if not self.journal_path.exists():
+            return entries
+
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.debug(f"忽略不完整的进度记录: {line.strip()[:80]}")
+                    continue
+                entries[entry['fp']] = entry
+        return entries
+
+    def rotate(self) -> Optional[Path]:
+        """
+        把已有的日志改名保存（不续传时开始新的日志，旧日志保留备查）
+
+        Returns:
+            旧日志的新路径，没有旧日志时返回 None
+        """
+        self.close()
+        if not self.journal_path.exists() or self.journal_path.stat().st_size == 0:
+            return None
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        archived = self.journal_path.with_name(f"{self.journal_path.stem}_{timestamp}{self.journal_path.suffix}")
+        self.journal_path.rename(archived)
+        logger.info(f"已保存上次的进度日志: {archived}")
+        return archived
+
+    def _open(self):
+        """以追加方式打开日志；上次崩溃留下不完整的最后一行时先补换行"""
+        needs_newline = False
+        if self.journal_path.exists() and self.journal_path.stat().st_size > 0:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        if needs_newline:
+            self._file.write('\n')
+
+    def record(self, fingerprint: str, index: int, status: str, message: str = "") -> None:
+        """
+        追加一条记录并落盘
+
+        Args:
+            fingerprint: 行指纹
+            index: 行号（从 1 开始，仅用于人工查看）
+            status: 状态（提交中/成功/失败）
+            message: 消息说明
+        """
+        line = json.dumps({
+            'fp': fingerprint,
+            'row': index,
+            'status': status,
+            'message': message,
+            'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }, ensure_ascii=False)
+
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """关闭日志文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,152 @@
+"""
+会话同步模块
+将浏览器登录后的 Cookie 同步到 requests 会话，供所有 HTTP 接口调用共用。
+WebDriver 不是线程安全的：读取浏览器 Cookie 需持有 driver_lock（填写浏览器的线程处理每行时也持有该锁），
+HTTP 请求本身不访问浏览器，可在任意线程（如字典查询线程池）中发送
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class SessionExpiredError(Exception):
+    """HTTP 会话已失效（或尚未同步），需要由 refresh() 重新从浏览器同步 Cookie"""
+
+    def __init__(self, generation: int):
+        super().__init__("HTTP 会话已失效")
+        self.generation = generation  # 发出请求时的同步代数
+
+
+class SessionBridge:
+    """浏览器会话与 requests 会话之间的 Cookie 同步桥"""
+
+    def __init__(self, driver, session: Optional[requests.Session] = None, login_url: Optional[str] = None):
+        """
+        初始化会话同步桥
+
+        Args:
+            driver: WebDriver 实例（Cookie 来源）
+            session: requests 会话，为 None 时新建
+            login_url: 登录页面URL，用于识别"会话失效被重定向到登录页"
+        """
+        self.driver = driver
+        self.session = session or requests.Session()
+        self.login_path = urlparse(login_url).path.rstrip("/") if login_url else "/login"
+        self.synced = False
+        self.refresh_count = 0
+        self._generation = 0  # 每同步一次加一，避免并发请求同时失效时重复同步
+        self.driver_lock = threading.RLock()  # 操作 driver 的线程持有，读取 Cookie 与浏览器填写互斥
+
+    @property
+    def generation(self) -> int:
+        """当前的同步代数（发出请求前读取，会话失效时传给 SessionExpiredError/refresh()）"""
+        return self._generation
+
+    def sync(self) -> None:
+        """从浏览器复制全部 Cookie 到 requests 会话（等待浏览器空闲）"""
+        with self.driver_lock:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        """执行 Cookie 同步（调用方需持有 driver_lock）"""
+        cookies = self.driver.get_cookies()
+        self.session.cookies.clear()
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain', ''),
+                path=cookie.get('path', '/')
+            )
+        self.synced = True
+        self._generation += 1
+        logger.info(f"已同步浏览器 Cookie 到 HTTP 会话（{len(cookies)} 个）")
+
+    def refresh(self, generation: int) -> None:
+        """
+        会话失效时重新同步 Cookie（需要读取浏览器，不能在字典查询线程池中调用）
+
+        Args:
+            generation: 发出请求时的同步代数，若其他线程已刷新过则跳过
+        """
+        with self.driver_lock:
+            if generation != self._generation:
+                return
+            if self.synced:
+                logger.warning("HTTP 会话已失效，重新从浏览器同步 Cookie")
+                self.refresh_count += 1
+            self._sync_locked()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        执行发送请求的函数，会话失效时在当前线程刷新 Cookie 后重试一次
+
+        Args:
+            func: 发送请求的函数（内部调用 request()）
+            *args, **kwargs: 透传给 func 的参数
+
+        Returns:
+            func 的返回值
+
+        Raises:
+            SessionExpiredError: 刷新后会话仍然失效
+        """
+        try:
+            return func(*args, **kwargs)
+        except SessionExpiredError as e:
+            self.refresh(e.generation)
+        return func(*args, **kwargs)
+
+    def is_session_expired(self, response: requests.Response) -> bool:
+        """
+        判断响应是否表示会话失效（401 或被重定向到登录页）
+
+        Args:
+            response: HTTP 响应
+
+        Returns:
+            True 如果会话已失效
+        """
+        if response.status_code == 401:
+            return True
+        if response.history and urlparse(response.url).path.rstrip("/") == self.login_path:
+            return True
+        return False
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        使用同步后的会话发送请求（不访问浏览器，可在任意线程调用）
+
+        Args:
+            method: HTTP 方法
+            url: 请求地址
+            **kwargs: 透传给 requests 的参数
+
+        Returns:
+            HTTP 响应
+
+        Raises:
+            SessionExpiredError: 尚未同步 Cookie 或会话已失效，由调用方通过 call()/refresh() 刷新后重试
+        """
+        generation = self._generation
+        if not self.synced:
+            raise SessionExpiredError(generation)
+
+        response = self.session.request(method, url, **kwargs)
+        if self.is_session_expired(response):
+            raise SessionExpiredError(generation)
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """发送 POST 请求，参见 request()"""
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """发送 GET 请求，参见 request()"""
+        return self.request("GET", url, **kwargs)
@@ -0,0 +1,117 @@
+"""
+单位映射模块
+把配置中的剂量单位、用法频率、给药途径映射编译成查找表（启动时加载一次），
+并与抗菌药详情页 HTML 中 <select> 的 <option> 列表核对；无法识别的值不再默认映射，而是计数并汇总报告
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class UnitRegistry:
+    """单位/途径/频率映射表"""
+
+    def __init__(self, mapping_config: Dict[str, Any]):
+        """
+        编译映射表
+
+        Args:
+            mapping_config: unit_mapping 配置，groups 下每组包含
+                fields（使用该组映射的下拉框ID）、options（选项文字 -> option value）、aliases（别名 -> 选项文字）
+
+        Raises:
+            ValueError: 别名指向不存在的选项
+        """
+        self.field_groups: Dict[str, str] = {}  # 下拉框ID -> 组名
+        self.options: Dict[str, Dict[str, str]] = {}  # 组名 -> {选项文字: option value}
+        self._lookup: Dict[str, Dict[str, str]] = {}  # 组名 -> {小写的选项文字或别名: option value}
+        self.unknown: Counter = Counter()  # (下拉框ID, 原始值) -> 出现次数
+        self._lock = threading.Lock()
+
+        for group, group_config in (mapping_config.get("groups") or {}).items():
+            options = {str(label): str(value) for label, value in (group_config.get("options") or {}).items()}
+            lookup = {self._key(label): value for label, value in options.items()}
+            for alias, label in (group_config.get("aliases") or {}).items():
+                if str(label) not in options:
+                    raise ValueError(f"单位映射 {group} 的别名 {alias} 指向不存在的选项: {label}")
+                lookup[self._key(alias)] = options[str(label)]
+
+            self.options[group] = options
+            self._lookup[group] = lookup
+            for field in group_config.get("fields") or []:
+                self.field_groups[field] = group
+
+    @staticmethod
+    def _key(value: Any) -> str:
+        """查找键：去除首尾空白并转为小写"""
+        return str(value).strip().lower()
+
+    def resolve(self, field: str, value: Any) -> Optional[str]:
+        """
+        把数据中的单位/途径/频率转换为下拉框的 option value
+
+        Args:
+            field: 下拉框ID（如 totalMedicineUnit、medicineWay）
+            value: 原始值（如 "mg"、"静滴"、"bid"）
+
+        Returns:
+            option value，无法识别时返回 None 并计入 unknown
+        """
+        group = self.field_groups.get(field)
+        option_value = self._lookup.get(group, {}).get(self._key(value)) if group else None
+        if option_value is None:
+            with self._lock:
+                self.unknown[(field, str(value).strip())] += 1
+        return option_value
+
+    def unknown_report(self) -> List[str]:
+        """
+        无法识别的值的汇总
+
+        Returns:
+            每项一行的描述，按出现次数从多到少排列
+        """
+        with self._lock:
+            items = self.unknown.most_common()
+        return [f"{field}: {value}（{count} 次）" for (field, value), count in items]
+
+    def validate_html(self, html_file: str) -> List[str]:
+        """
+        与页面 HTML 中下拉框的 option 列表核对（选项文字和 value 都必须一致）
+
+        Args:
+            html_file: 抗菌药详情页 HTML 文件路径
+
+        Returns:
+            不一致之处的描述列表，全部一致时为空列表
+        """
+        html = Path(html_file).read_text(encoding='utf-8', errors='replace')
+        problems = []
+        for field, group in self.field_groups.items():
+            page_options = self._parse_select_options(html, field)
+            if page_options is None:
+                problems.append(f"页面中没有下拉框 {field}")
+                continue
+            for label, value in self.options[group].items():
+                if (value, label) not in page_options:
+                    problems.append(f"{field} 的选项 {label}={value} 与页面不一致")
+        return problems
+
+    @staticmethod
+    def _parse_select_options(html: str, select_id: str) -> Optional[List[Tuple[str, str]]]:
+        """提取 <select id="select_id"> 中的 (value, 文字) 列表，找不到下拉框时返回 None"""
+        match = re.search(
+            r'<select[^>]*\bid="%s"[^>]*>(.*?)</select>' % re.escape(select_id), html, re.S | re.I
+        )
+        if not match:
+            return None
+        return [
+            (value, label.strip())
+            for value, label in re.findall(r'<option[^>]*\bvalue="([^"]*)"[^>]*>([^<]*)', match.group(1), re.I)
+        ]
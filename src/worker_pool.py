@@ -0,0 +1,128 @@
+"""
+多浏览器工作池模块
+N 个工作线程各自持有一个已登录的浏览器会话，从共享的数据行迭代器中逐条领取数据行，结果按领取顺序合并
+"""
+
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """多浏览器工作池"""
+
+    def __init__(
+        self,
+        worker_count: int,
+        create_worker: Callable[[int], Any],
+        process_row: Callable[[Any, Any], Any],
+        close_worker: Optional[Callable[[Any], None]] = None
+    ):
+        """
+        初始化工作池
+
+        Args:
+            worker_count: 工作线程（浏览器）数量
+            create_worker: 创建工作会话的函数，参数为工作编号（从 0 开始），负责启动浏览器、登录和页面导航
+            process_row: 处理一行数据的函数，参数为 (工作会话, 行数据)，返回处理结果（需自行捕获异常；
+                抛出异常表示该工作会话已不可用，工作线程停止领取数据行）
+            close_worker: 释放工作会话的函数（可选）
+        """
+        self.worker_count = max(1, worker_count)
+        self.create_worker = create_worker
+        self.process_row = process_row
+        self.close_worker = close_worker
+        self.active_workers = 0
+        self.processed: Dict[int, int] = {}  # 每个工作会话处理的行数
+        self._lock = threading.Lock()
+        self._task_lock = threading.Lock()  # 数据行迭代器（可能是生成器）不是线程安全的
+        self._task_error: Optional[BaseException] = None
+
+    def run(self, rows: Iterable[Any], primary: Any = None) -> List[Any]:
+        """
+        并行处理全部数据行
+
+        Args:
+            rows: 数据行（可以是生成器，工作线程按需逐条领取，无需预先读入全部数据）
+            primary: 已准备好的 0 号工作会话（可选，为 None 时同样通过 create_worker 创建）
+
+        Returns:
+            按领取顺序排列的结果列表；所有工作会话都不可用时，未领取的行仍留在 rows 迭代器中
+
+        Raises:
+            读取数据行时抛出的异常（所有工作线程结束后重新抛出）
+        """
+        tasks = enumerate(iter(rows), start=1)
+        results: Dict[int, Any] = {}
+        self._task_error = None
+        threads = []
+        for worker_id in range(self.worker_count):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(worker_id, primary if worker_id == 0 else None, tasks, results),
+                name=f"worker-{worker_id}",
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        logger.info(f"工作池处理完成，各工作会话处理行数: {self.processed}")
+        if self._task_error is not None:
+            raise self._task_error
+        return [results[index] for index in sorted(results)]
+
+    def _next_task(self, tasks: Iterator[Tuple[int, Any]]) -> Optional[Tuple[int, Any]]:
+        """领取下一行数据；数据读取完毕或读取出错时返回 None"""
+        with self._task_lock:
+            if self._task_error is not None:
+                return None
+            try:
+                return next(tasks)
+            except StopIteration:
+                return None
+            except Exception as e:
+                logger.error(f"读取数据行失败: {e}")
+                self._task_error = e
+                return None
+
+    def _worker_loop(self, worker_id: int, worker: Any, tasks: Iterator[Tuple[int, Any]],
+                     results: Dict[int, Any]) -> None:
+        """工作线程：准备会话后循环领取数据行，直到队列为空"""
+        owned = worker is None  # 由工作池创建的会话由工作池负责关闭
+        if owned:
+            try:
+                logger.info(f"工作会话 {worker_id} 启动中...")
+                worker = self.create_worker(worker_id)
+            except Exception as e:
+                logger.error(f"工作会话 {worker_id} 启动失败，由其他会话继续处理: {e}")
+                return
+
+        with self._lock:
+            self.active_workers += 1
+        logger.info(f"工作会话 {worker_id} 已就绪")
+
+        try:
+            while True:
+                task = self._next_task(tasks)
+                if task is None:
+                    break
+
+                index, row = task
+                try:
+                    results[index] = self.process_row(worker, row)
+                except Exception as e:
+                    logger.error(f"工作会话 {worker_id} 不可用，停止处理: {e}")
+                    break
+                with self._lock:
+                    self.processed[worker_id] = self.processed.get(worker_id, 0) + 1
+        finally:
+            if self.close_worker and owned:
+                try:
+                    self.close_worker(worker)
+                except Exception as e:
+                    logger.warning(f"关闭工作会话 {worker_id} 失败: {e}")
@@ -0,0 +1,77 @@
+"""
+数据读取测试
+验证 .xlsx 逐行读取时按列推断数字类型，与 pandas 读取结果类型一致
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from data_reader import DataReader  # noqa: E402
+
+
+def _write_workbook(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Sheet1"
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def test_numeric_text_columns_are_converted(tmp_path):
+    path = tmp_path / "input.xlsx"
+    _write_workbook(path, [
+        ["序号", "处方金额\n(元)", "药品品种数", "年龄", "科室", "数量", "规格"],
+        [1, "197.18", "5", "51岁", "0301", "3.00 盒", "50mg*12"],
+        [2, "200", "12", "6", "普外科门诊", "2", None],
+    ])
+
+    rows = DataReader(str(path)).read_data()
+
+    assert rows[0] == {"序号": 1, "处方金额": 197.18, "药品品种数": 5, "年龄": "51岁",
+                       "科室": "0301", "数量": "3.00 盒", "规格": "50mg*12"}
+    # 整列都是数字时才转换，出现小数的列整列为 float
+    assert type(rows[0]["药品品种数"]) is int
+    assert type(rows[1]["处方金额"]) is float and rows[1]["处方金额"] == 200.0
+    # 数字与文字混排的列保持文本（与 pandas 一致）
+    assert rows[1]["年龄"] == "6"
+    assert rows[1]["数量"] == "2"
+    assert rows[1]["规格"] is None
+
+
+def test_column_types_are_inferred_from_first_chunk(tmp_path):
+    path = tmp_path / "input.xlsx"
+    _write_workbook(path, [
+        ["金额", "科室"],
+        ["1", "0301"],
+        ["2", "0302"],
+        ["3.5", "普外科"],
+        ["x", "0303"],
+    ])
+
+    rows = DataReader(str(path), chunk_size=2).read_data()
+
+    # 第一批推断为数字列，之后出现的小数和文字不改变推断结果
+    assert [row["金额"] for row in rows] == [1, 2, 3.5, "x"]
+    assert [row["科室"] for row in rows] == [301, 302, "普外科", 303]
+
+
+def test_sample_workbook_types_match_pandas():
+    path = ROOT / "data" / "门诊2509.xlsx"
+    sheet_name = pd.ExcelFile(path).sheet_names[0]
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    expected = DataReader._iter_frame_values([df])
+
+    rows = list(DataReader(str(path), sheet_name=sheet_name).iter_rows())
+
+    assert len(rows) == len(df)
+    for row, values in zip(rows, expected):
+        for actual, value in zip(row.values(), values):
+            assert actual == value
+            assert type(actual) is type(value) or value is None
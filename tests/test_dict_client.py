@@ -0,0 +1,97 @@
+"""
+字典查询客户端测试
+在本地启动一个模拟 search_dict 接口的 http.server，验证 JSON 结果、以及以 200 返回登录页时按会话失效处理并计入失败数
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from dict_client import DictClient  # noqa: E402
+from session_bridge import SessionBridge, SessionExpiredError  # noqa: E402
+
+
+class _SearchDictHandler(BaseHTTPRequestHandler):
+    """模拟字典接口：/html/ 下以 200 返回登录页，其余返回一条诊断记录"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.startswith("/html/"):
+            body, content_type = "<html><form id='login'></form></html>".encode("utf-8"), "text/html"
+        else:
+            body = json.dumps([{"diag_name": "高血压", "diag_code": "I10"}], ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FakeDriver:
+    """只提供 get_cookies 的浏览器替身"""
+
+    def get_cookies(self):
+        return [{"name": "PHPSESSID", "value": "test-session", "path": "/"}]
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _SearchDictHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def bridge():
+    session_bridge = SessionBridge(_FakeDriver())
+    session_bridge.sync()
+    return session_bridge
+
+
+def _client(bridge, url):
+    client = DictClient(bridge, timeout=2, max_retries=1, backoff_base=0.01)
+    client.SEARCH_URL = url
+    return client
+
+
+def test_search_returns_json(server, bridge):
+    client = _client(bridge, f"{server}/search_dict")
+
+    assert client.search_sync("dict_diag", "高血压") == [{"diag_name": "高血压", "diag_code": "I10"}]
+    assert client.metrics()["failures"] == 0
+
+
+def test_non_json_response_is_counted_and_refreshes_session(server, bridge):
+    client = _client(bridge, f"{server}/html/search_dict")
+
+    with pytest.raises(SessionExpiredError):
+        client.search_sync("dict_diag", "高血压")
+
+    # 刷新 Cookie 后重试一次，两次都计入失败
+    assert bridge.refresh_count == 1
+    assert client.metrics()["failures"] == 2
+    assert client.metrics()["requests"] == 2
+
+
+def test_non_json_response_in_batch(server, bridge):
+    client = _client(bridge, f"{server}/html/search_dict")
+
+    results = client.search_many_sync([("dict_diag", "高血压"), ("dict_drug", "阿莫西林")])
+
+    assert all(isinstance(result, SessionExpiredError) for result in results)
+    assert bridge.refresh_count == 1
+    assert client.metrics()["failures"] == 4
@@ -0,0 +1,220 @@
+"""
+直接提交模块测试
+在本地启动一个模拟 saveOutpatient 接口的 http.server，验证参数组装、成功判断和各类错误的回退标记
+"""
+
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import pytest
+import requests
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from direct_submitter import DirectSubmitter, DirectSubmitError  # noqa: E402
+from session_bridge import SessionBridge  # noqa: E402
+
+
+class _SaveOutpatientHandler(BaseHTTPRequestHandler):
+    """模拟保存接口：按路径返回成功、拒绝保存、服务器错误或超时响应，并记录收到的表单参数"""
+
+    received = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = dict(parse_qsl(self.rfile.read(length).decode("utf-8"), keep_blank_values=True))
+        _SaveOutpatientHandler.received.append(form)
+
+        if self.path == "/slow/saveOutpatient":
+            time.sleep(1)
+        if self.path == "/error/saveOutpatient":
+            self._reply(500, {"success": False})
+        elif self.path == "/rejected/saveOutpatient":
+            self._reply(200, {"success": False, "msg": "保存失败：门诊号重复"})
+        else:
+            self._reply(200, {"success": True, "msg": "保存成功"})
+
+    def _reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端已超时断开
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FakeDriver:
+    """只提供 get_cookies 的浏览器替身"""
+
+    def get_cookies(self):
+        return [{"name": "JSESSIONID", "value": "test-session", "path": "/"}]
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _SaveOutpatientHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def bridge():
+    session_bridge = SessionBridge(_FakeDriver())
+    session_bridge.sync()
+    return session_bridge
+
+
+@pytest.fixture(scope="module")
+def form_elements():
+    with open(ROOT / "config" / "config.yaml", "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    return config["functions"]["outpatient"]["form_elements"]
+
+
+def _fields(form_elements):
+    """为每个配置的表单元素生成一个字段值（单选框、下拉框优先取配置的选项文本）"""
+    fields = []
+    for field_name, config in form_elements.items():
+        options = config.get("options") or {}
+        value = next(iter(options)) if options else f"{field_name}-值"
+        fields.append((field_name, value, config))
+    return fields
+
+
+def test_build_payload_covers_form_elements(bridge, form_elements):
+    submitter = DirectSubmitter(bridge, "http://127.0.0.1/saveOutpatient", extra_fields={"mjz_id": None, "drugsNum": 1})
+    payload = submitter.build_payload(_fields(form_elements))
+
+    for field_name, config in form_elements.items():
+        if config.get("type", "input") == "button":
+            assert config["value"] not in payload
+            continue
+        param = DirectSubmitter.param_name(config)
+        assert param in payload, field_name
+        if config.get("options"):
+            assert payload[param] == str(next(iter(config["options"].values())))
+        else:
+            assert payload[param] == f"{field_name}-值"
+
+    assert payload["mjz_id"] == ""
+    assert payload["drugsNum"] == "1"
+
+
+def test_build_payload_requires_param_for_unmapped_locator(bridge):
+    submitter = DirectSubmitter(bridge, "http://127.0.0.1/saveOutpatient")
+    with pytest.raises(DirectSubmitError):
+        submitter.build_payload([("备注", "x", {"type": "input", "locator": "xpath", "value": "//textarea"})])
+
+
+def test_submit_success(server, bridge, form_elements):
+    submitter = DirectSubmitter(bridge, f"{server}/saveOutpatient", success_pattern=r'"success":\s*true')
+    fields = _fields(form_elements)
+
+    text = submitter.submit(fields)
+
+    assert "保存成功" in text
+    assert submitter.submit_count == 1
+    assert _SaveOutpatientHandler.received[-1] == submitter.build_payload(fields)
+
+
+def test_submit_pattern_mismatch_does_not_fall_back(server, bridge, form_elements):
+    # 服务器已收到并答复，响应无法确认结果时不能改用浏览器重新提交
+    submitter = DirectSubmitter(bridge, f"{server}/saveOutpatient", success_pattern=r'"success":\s*false')
+    with pytest.raises(DirectSubmitError) as excinfo:
+        submitter.submit(_fields(form_elements))
+    assert excinfo.value.fallback is False
+    assert submitter.submit_count == 0
+
+
+def test_submit_failure_pattern_falls_back(server, bridge, form_elements):
+    submitter = DirectSubmitter(bridge, f"{server}/rejected/saveOutpatient",
+                                success_pattern=r'"success":\s*true', failure_pattern=r'"success":\s*false')
+    with pytest.raises(DirectSubmitError) as excinfo:
+        submitter.submit(_fields(form_elements))
+    assert excinfo.value.fallback is True
+    assert submitter.submit_count == 0
+
+
+def test_connect_error_falls_back(bridge, form_elements):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # 关闭后该端口无人监听
+    submitter = DirectSubmitter(bridge, f"http://127.0.0.1:{port}/saveOutpatient", timeout=2)
+    with pytest.raises(DirectSubmitError) as excinfo:
+        submitter.submit(_fields(form_elements))
+    assert excinfo.value.fallback is True
+
+
+def test_connection_aborted_after_send_does_not_fall_back(bridge, form_elements):
+    received = []
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+
+    def accept_and_drop():
+        # 读完整个请求后不回复直接断开（RemoteDisconnected / Connection aborted）
+        conn, _ = listener.accept()
+        with conn:
+            data = b""
+            while b"\r\n\r\n" not in data:
+                data += conn.recv(4096)
+            head, body = data.split(b"\r\n\r\n", 1)
+            length = next(int(line.split(b":")[1]) for line in head.split(b"\r\n")
+                          if line.lower().startswith(b"content-length:"))
+            while len(body) < length:
+                body += conn.recv(4096)
+            received.append(body)
+
+    thread = threading.Thread(target=accept_and_drop, daemon=True)
+    thread.start()
+    submitter = DirectSubmitter(bridge, f"http://127.0.0.1:{listener.getsockname()[1]}/saveOutpatient", timeout=2)
+    try:
+        with pytest.raises(DirectSubmitError) as excinfo:
+            submitter.submit(_fields(form_elements))
+    finally:
+        thread.join(timeout=2)
+        listener.close()
+
+    assert received, "服务器应已收到完整请求"
+    assert excinfo.value.fallback is False
+
+
+def test_name_resolution_failure_falls_back():
+    from urllib3.exceptions import MaxRetryError, NameResolutionError
+
+    reason = NameResolutionError("saveoutpatient.invalid", None, socket.gaierror("Name or service not known"))
+    error = requests.ConnectionError(MaxRetryError(None, "/saveOutpatient", reason))
+    assert DirectSubmitter.connection_not_established(error) is True
+    assert DirectSubmitter.connection_not_established(requests.ConnectTimeout()) is True
+    assert DirectSubmitter.connection_not_established(requests.ConnectionError("Connection aborted.")) is False
+
+
+def test_read_timeout_does_not_fall_back(server, bridge, form_elements):
+    submitter = DirectSubmitter(bridge, f"{server}/slow/saveOutpatient", timeout=0.2)
+    with pytest.raises(DirectSubmitError) as excinfo:
+        submitter.submit(_fields(form_elements))
+    assert excinfo.value.fallback is False
+
+
+def test_server_error_does_not_fall_back(server, bridge, form_elements):
+    submitter = DirectSubmitter(bridge, f"{server}/error/saveOutpatient")
+    with pytest.raises(DirectSubmitError) as excinfo:
+        submitter.submit(_fields(form_elements))
+    assert excinfo.value.fallback is False
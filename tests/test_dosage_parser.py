@@ -0,0 +1,70 @@
+"""
+用法用量解析测试
+固定样例数据中各种格式的单次剂量、频率和总用量（与原逐行解析结果一致），包括首尾空白和回退规则
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from dosage_parser import RESULT_COLUMNS, dosage_issues, parse_dosages  # noqa: E402
+
+
+CASES = [
+    # (用法用量, 规格, 数量) -> (dose_value, dose_unit, frequency, total_amount, total_unit)
+    # 规格 × 包装内数量 × 盒数
+    (('250mg bid', '250mg*12', '1.00 盒'), ('250', 'mg', 'bid', '3000', 'mg')),
+    (('0.1g qd', '0.1g*15', '2.00 盒'), ('0.1', 'g', 'qd', '3', 'g')),
+    (('62.5mg tid', '125mg*6', '3.00 盒'), ('62.5', 'mg', 'tid', '2250', 'mg')),
+    (('0.5g qd', '0.5g*4', '1.00 袋'), ('0.5', 'g', 'qd', '2', 'g')),
+    (('75mg tid', '50mg*12', '2 箱'), ('75', 'mg', 'tid', '1200', 'mg')),
+    # 规格无乘数、复合规格取第一个含量
+    (('0.5g st', '0.5g', '6.00 瓶'), ('0.5', 'g', 'st', '3', 'g')),
+    (('100ml qd', '100ml:0.5g:0.9g', '4.00 瓶'), ('100', 'ml', 'qd', '400', 'ml')),
+    # 直接单位、无单位数量、×/x 乘数
+    (('1g qd', '0.25g×12片', '10 片'), ('1', 'g', 'qd', '2.5', 'g')),
+    (('125mg q8h', '125 mg x 12', '3'), ('125', 'mg', 'q8h', '375', 'mg')),
+    (('2粒 每晚', '250mg*12', '1 个'), ('2', '粒', '每晚', '250', 'mg')),
+    # 数量本身是质量时直接作为总量
+    (('0.25g tid', '0.25g*12', '0.5g'), ('0.25', 'g', 'tid', '0.5', 'g')),
+    # 频率大小写不敏感
+    (('100mg BID', '', ''), ('100', 'mg', 'bid', '100', 'mg')),
+    # 回退到数量，再回退到单次剂量
+    (('1片 tid', '', '2.00 盒'), ('1', '片', 'tid', '2.00', '盒')),
+    (('', '', '5 支'), ('', '', '', '5', '支')),
+    (('口服', '未知规格', '适量'), ('', '', '', '', '')),
+    # 首尾空白由解析器自行去除
+    (('  185mg tid ', '  50mg*12 ', '  2.00 盒'), ('185', 'mg', 'tid', '1200', 'mg')),
+    (('100mg bid', None, '  3.00 片'), ('100', 'mg', 'bid', '3.00', '片')),
+    ((None, None, '\t4.00 瓶 '), ('', '', '', '4.00', '瓶')),
+]
+
+
+@pytest.mark.parametrize("source, expected", CASES)
+def test_parse_single_row(source, expected):
+    dosage, spec, quantity = source
+    parsed = parse_dosages([{'dosage': dosage, 'spec': spec, 'quantity': quantity}])[0]
+    assert tuple(parsed[column] for column in RESULT_COLUMNS) == expected
+
+
+def test_batch_matches_row_by_row_order():
+    rows = [dict(zip(('dosage', 'spec', 'quantity'), source)) for source, _ in CASES]
+    parsed = parse_dosages(rows)
+    assert [tuple(p[column] for column in RESULT_COLUMNS) for p in parsed] == [e for _, e in CASES]
+
+
+def test_empty_batch():
+    assert parse_dosages([]) == []
+
+
+def test_issues_report_unparsed_fields():
+    source = {'dosage': '口服', 'spec': '未知规格', 'quantity': '适量'}
+    issues = dosage_issues(source, parse_dosages([source])[0])
+    assert len(issues) == 3
+
+    source = {'dosage': '250mg bid', 'spec': '250mg*12', 'quantity': '1.00 盒'}
+    assert dosage_issues(source, parse_dosages([source])[0]) == []
@@ -0,0 +1,94 @@
+"""
+登录会话测试
+验证保存的 Cookie 记录了所属账号，更换账号时不会沿用上一个账号的会话
+"""
+
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+from login_handler import LoginHandler  # noqa: E402
+import main  # noqa: E402
+
+CHECK_URL = "http://127.0.0.1/entering/"
+
+
+class _FakeWaiter:
+    def settled(self):
+        pass
+
+
+class _FakeDriver:
+    """只记录 Cookie 的浏览器替身：写入 Cookie 后打开页面即视为已登录"""
+
+    def __init__(self):
+        self.cookies = []
+        self.current_url = ""
+        self.visited = []
+
+    def get(self, url):
+        self.visited.append(url)
+        self.current_url = url if self.cookies else "http://127.0.0.1/login"
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+    def get_cookies(self):
+        return [{"name": "PHPSESSID", "value": "abc"}]
+
+    def find_elements(self, by, value):
+        return []
+
+
+def _handler(tmp_path, username, driver=None):
+    login_config = {
+        "username": username,
+        "login_url": "http://127.0.0.1/login",
+        "success_indicator": {"type": "url_contains", "value": CHECK_URL},
+        "session": {"enabled": True, "cookie_file": str(tmp_path / "cookies.json")},
+    }
+    return LoginHandler(driver or _FakeDriver(), login_config, timeout=1, page_waiter=_FakeWaiter())
+
+
+def test_saved_session_is_restored_for_same_account(tmp_path):
+    _handler(tmp_path, "hospital_a").save_session()
+    saved = json.loads((tmp_path / "cookies.json").read_text(encoding="utf-8"))
+    assert saved == {"username": "hospital_a", "cookies": [{"name": "PHPSESSID", "value": "abc"}]}
+
+    driver = _FakeDriver()
+    assert _handler(tmp_path, "hospital_a", driver).restore_session() is True
+    assert driver.cookies == saved["cookies"]
+
+
+def test_saved_session_of_other_account_is_not_restored(tmp_path):
+    _handler(tmp_path, "hospital_a").save_session()
+
+    driver = _FakeDriver()
+    assert _handler(tmp_path, "hospital_b", driver).restore_session() is False
+    assert driver.cookies == []
+    assert driver.visited == []
+
+
+def test_legacy_cookie_list_is_not_restored(tmp_path):
+    (tmp_path / "cookies.json").write_text(json.dumps([{"name": "PHPSESSID", "value": "old"}]), encoding="utf-8")
+
+    driver = _FakeDriver()
+    assert _handler(tmp_path, "hospital_a", driver).restore_session() is False
+    assert driver.cookies == []
+
+
+def test_user_data_dir_is_keyed_by_account(tmp_path):
+    session_config = {"enabled": True, "user_data_dir": str(tmp_path / "profile")}
+
+    first = main.create_driver_manager({}, session_config, username="hospital_a").user_data_dir
+    second = main.create_driver_manager({}, session_config, username="hospital_b").user_data_dir
+    worker = main.create_driver_manager({}, session_config, 1, "hospital_a").user_data_dir
+
+    assert first != second
+    assert Path(first).parent == Path(second).parent == tmp_path / "profile"
+    assert Path(worker) == Path(first) / "worker1"
+    assert main.create_driver_manager({}, session_config).user_data_dir is None
@@ -0,0 +1,116 @@
+"""
+字典候选排序测试
+验证精确匹配优先、规格含量加分、编辑距离截断，以及剪枝后的选择结果与逐项精确打分一致
+"""
+
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import match_ranker  # noqa: E402
+from match_ranker import (  # noqa: E402
+    EDIT_DISTANCE_TOP_K, NGRAM_WEIGHT, SPEC_MATCH_BONUS,
+    _normalize, edit_similarity, ngram_similarity, parse_strength,
+    rank_candidates, select_best_match,
+)
+
+
+def _drug(name, spec=''):
+    return {'drug_name': name, 'spec': spec}
+
+
+def _spec_of(candidate):
+    return candidate['spec']
+
+
+def _exact_best(keyword, candidates, spec=None, spec_builder=None):
+    """参考实现：对每个候选项精确计算得分，得分相同时取接口返回顺序靠前的一项"""
+    target = _normalize(keyword)
+    target_strength = parse_strength(spec) if spec else None
+    best_score, best = None, None
+    for candidate in candidates:
+        name = _normalize(candidate['drug_name'])
+        if name == target:
+            score = 1.0
+        else:
+            score = (NGRAM_WEIGHT * ngram_similarity(target, name)
+                     + (1 - NGRAM_WEIGHT) * edit_similarity(target, name))
+        if target_strength is not None and spec_builder:
+            strength = parse_strength(spec_builder(candidate))
+            if strength is not None and abs(strength - target_strength) < 1e-6:
+                score += SPEC_MATCH_BONUS
+        if best_score is None or score > best_score + 1e-9:
+            best_score, best = score, candidate
+    return best
+
+
+def test_exact_name_beats_first_candidate():
+    candidates = [_drug('阿莫西林克拉维酸钾片'), _drug('阿莫西林胶囊'), _drug('阿莫西林')]
+    assert select_best_match('阿莫西林', candidates, 'drug_name') is candidates[2]
+
+
+def test_normalization_ignores_width_spaces_and_brackets():
+    candidates = [_drug('头孢克肟片'), _drug('头孢呋辛酯片（0.25g）')]
+    assert select_best_match(' 头孢呋辛酯片 ', candidates, 'drug_name') is candidates[1]
+
+
+def test_spec_strength_breaks_tie_between_same_names():
+    candidates = [_drug('阿莫西林胶囊', '0.25g*24'), _drug('阿莫西林胶囊', '500mg*24')]
+
+    assert select_best_match('阿莫西林胶囊', candidates, 'drug_name') is candidates[0]
+    best = select_best_match('阿莫西林胶囊', candidates, 'drug_name', spec='0.5g', spec_builder=_spec_of)
+    assert best is candidates[1]
+
+
+def test_ranked_scores_are_sorted_and_stable():
+    candidates = [_drug('甲硝唑片'), _drug('甲硝唑片'), _drug('左氧氟沙星片')]
+    ranked = rank_candidates('甲硝唑片', candidates, 'drug_name')
+
+    assert [match for _, match in ranked[:2]] == candidates[:2]
+    assert [score for score, _ in ranked] == sorted((score for score, _ in ranked), reverse=True)
+
+
+def test_candidates_past_top_k_still_win_when_their_bound_allows(monkeypatch):
+    # 前几项 n-gram 得分高但编辑距离差，截断之外的项仍须精确计算
+    decoys = [_drug('氨溴索氨溴索口服液')] * EDIT_DISTANCE_TOP_K
+    target = _drug('氨溴索口服液')
+    assert select_best_match('氨溴索口服', decoys + [target], 'drug_name') is target
+
+    monkeypatch.setattr(match_ranker, 'EDIT_DISTANCE_TOP_K', 0)
+    assert select_best_match('氨溴索口服', decoys + [target], 'drug_name') is target
+
+
+def test_pruned_candidates_score_at_most_their_exact_score():
+    candidates = [_drug('布洛芬缓释胶囊')] + [_drug(f'维生素{i}号片') for i in range(20)]
+    ranked = rank_candidates('布洛芬缓释胶囊', candidates, 'drug_name', spec='300mg', spec_builder=_spec_of)
+
+    assert ranked[0] == (1.0, candidates[0])
+    for score, candidate in ranked[1:]:
+        name = _normalize(candidate['drug_name'])
+        exact = (NGRAM_WEIGHT * ngram_similarity('布洛芬缓释胶囊', name)
+                 + (1 - NGRAM_WEIGHT) * edit_similarity('布洛芬缓释胶囊', name))
+        assert score <= exact + 1e-9
+
+
+def test_empty_candidates():
+    assert select_best_match('阿莫西林', [], 'drug_name') is None
+    assert rank_candidates('阿莫西林', [], 'drug_name') == []
+
+
+def test_matches_exhaustive_exact_scoring():
+    rng = random.Random(20240601)
+    alphabet = '阿莫西林头孢克肟胶囊片钾酸'
+    specs = ['100mg*10', '0.1g*12', '250mg', '0.5g', '']
+    for _ in range(2000):
+        keyword = ''.join(rng.choice(alphabet) for _ in range(rng.randint(2, 6)))
+        candidates = [
+            _drug(''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 8))), rng.choice(specs))
+            for _ in range(rng.randint(1, 15))
+        ]
+        for spec in (None, '100mg'):
+            expected = _exact_best(keyword, candidates, spec, _spec_of)
+            actual = select_best_match(keyword, candidates, 'drug_name', spec=spec, spec_builder=_spec_of)
+            assert actual is expected, (keyword, spec, candidates)
@@ -0,0 +1,115 @@
+"""
+处理进度日志测试
+验证行指纹、最后一条记录的读取，以及 --resume 时哪些行会被跳过（避免重复录入）
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+from row_journal import RowJournal  # noqa: E402
+from result_exporter import ResultExporter  # noqa: E402
+import main  # noqa: E402
+
+
+class _FakeWaiter:
+    def pace(self):
+        pass
+
+
+class _FakeFiller:
+    """按指定方式失败的表单填写器替身"""
+
+    def __init__(self, fill_result=True, submit_started=False, error=None):
+        self.fill_result = fill_result
+        self.error = error
+        self._submit_started = submit_started
+        self.submit_started = False
+        self.waiter = _FakeWaiter()
+
+    def fill_form(self, plan):
+        self.submit_started = self._submit_started
+        if self.error:
+            raise self.error
+        return self.fill_result
+
+    def handle_antibiotic_info(self, plan):
+        return True
+
+    def release_record_lock(self):
+        pass
+
+
+def test_fingerprint_ignores_key_order_and_numbers_duplicates():
+    seen = {}
+    first = RowJournal.fingerprint({"年龄": 30, "诊断": "高血压"}, seen)
+    same = RowJournal.fingerprint({"诊断": "高血压", "年龄": 30}, seen)
+    other = RowJournal.fingerprint({"诊断": "糖尿病", "年龄": 30}, seen)
+
+    assert same == f"{first}#2"
+    assert other != first and "#" not in other
+    # 新一次运行重新计数，指纹与上次一致
+    assert RowJournal.fingerprint({"诊断": "高血压", "年龄": 30}, {}) == first
+
+
+def test_load_keeps_last_entry_and_ignores_partial_line(tmp_path):
+    journal = RowJournal(str(tmp_path / "outpatient.jsonl"))
+    journal.record("a", 1, RowJournal.STATUS_STARTED)
+    journal.record("a", 1, RowJournal.STATUS_SUCCESS, "表单提交成功")
+    journal.record("b", 2, RowJournal.STATUS_STARTED)
+    journal.close()
+    with open(journal.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"fp": "b", "row": 2, "sta')  # 崩溃时写了一半
+
+    entries = journal.load()
+    assert entries["a"]["status"] == RowJournal.STATUS_SUCCESS
+    assert entries["b"]["status"] == RowJournal.STATUS_STARTED
+
+    # 续写时先补换行，新记录可以被正常读取
+    journal.record("c", 3, RowJournal.STATUS_FAILED, "数据错误")
+    journal.close()
+    assert journal.load()["c"]["status"] == RowJournal.STATUS_FAILED
+
+
+def test_resume_status():
+    assert RowJournal.resume_status(None) is None
+    assert RowJournal.resume_status({"status": RowJournal.STATUS_FAILED}) is None
+    assert RowJournal.resume_status({"status": RowJournal.STATUS_SUCCESS}) == RowJournal.STATUS_SUCCESS
+    assert RowJournal.resume_status({"status": RowJournal.STATUS_STARTED}) == RowJournal.STATUS_STARTED
+
+
+def _process(tmp_path, filler):
+    journal = RowJournal(str(tmp_path / "outpatient.jsonl"))
+    exporter = ResultExporter(str(tmp_path / "results.xlsx"))
+    fingerprint = RowJournal.fingerprint({"诊断": "高血压"}, {})
+    result = main.process_row(filler, exporter, 1, 1, {"诊断": "高血压"}, plan=None,
+                              journal=journal, fingerprint=fingerprint)
+    journal.close()
+    return result, RowJournal.resume_status(journal.load()[fingerprint])
+
+
+def test_failure_before_submit_is_retried_on_resume(tmp_path):
+    result, resume = _process(tmp_path, _FakeFiller(fill_result=False, submit_started=False))
+    assert result["处理状态"] == "失败"
+    assert resume is None
+
+
+def test_failure_after_submit_is_not_resubmitted(tmp_path):
+    result, resume = _process(tmp_path, _FakeFiller(fill_result=False, submit_started=True))
+    assert result["处理状态"] == "失败"
+    assert "人工核对" in result["处理消息"]
+    assert resume == RowJournal.STATUS_STARTED
+
+
+def test_error_after_submit_is_not_resubmitted(tmp_path):
+    _, resume = _process(tmp_path, _FakeFiller(submit_started=True, error=RuntimeError("alert 超时")))
+    assert resume == RowJournal.STATUS_STARTED
+
+
+def test_success_is_skipped_on_resume(tmp_path):
+    result, resume = _process(tmp_path, _FakeFiller(submit_started=True))
+    assert result["处理状态"] == "成功"
+    assert resume == RowJournal.STATUS_SUCCESS
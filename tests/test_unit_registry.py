@@ -0,0 +1,70 @@
+"""
+单位映射测试
+验证配置中的映射与抗菌药详情页选项一致、别名不区分大小写，以及无法识别的值被计数而不是默认映射
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from unit_registry import UnitRegistry  # noqa: E402
+
+
+def _config_mapping():
+    with open(ROOT / "config" / "config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)["unit_mapping"]
+
+
+def test_config_matches_detail_page_options():
+    mapping = _config_mapping()
+    registry = UnitRegistry(mapping)
+
+    assert registry.validate_html(str(ROOT / mapping["html_file"])) == []
+
+
+def test_validate_html_reports_mismatched_option(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text('<select id="unit"><option value="5">克</option><option value="7">毫克</option></select>',
+                    encoding="utf-8")
+    registry = UnitRegistry({"groups": {
+        "dose": {"fields": ["unit", "missing"], "options": {"克": "5", "毫克": "6"}},
+    }})
+
+    problems = registry.validate_html(str(page))
+    assert "unit 的选项 毫克=6 与页面不一致" in problems
+    assert "页面中没有下拉框 missing" in problems
+    assert len(problems) == 2
+
+
+def test_aliases_resolve_case_insensitively():
+    registry = UnitRegistry(_config_mapping())
+
+    assert registry.resolve("totalMedicineUnit", "MG") == "6"
+    assert registry.resolve("onceMeterUnit", " g ") == "5"
+    assert registry.resolve("onceMeterUnit", "ML") == "9"
+    assert registry.resolve("medicineFrequency", "BID") == "18"
+    assert registry.resolve("medicineWay", "静滴") == "26"
+    assert not registry.unknown
+
+
+def test_unknown_values_are_counted_not_defaulted():
+    registry = UnitRegistry(_config_mapping())
+
+    assert registry.resolve("totalMedicineUnit", "盒") is None
+    assert registry.resolve("totalMedicineUnit", " 盒") is None
+    assert registry.resolve("medicineWay", "舌下含服") is None
+    assert registry.resolve("notConfigured", "mg") is None
+
+    assert registry.unknown[("totalMedicineUnit", "盒")] == 2
+    assert registry.unknown_report()[0] == "totalMedicineUnit: 盒（2 次）"
+    assert len(registry.unknown_report()) == 3
+
+
+def test_alias_to_missing_option_is_rejected():
+    with pytest.raises(ValueError):
+        UnitRegistry({"groups": {"dose": {"options": {"克": "5"}, "aliases": {"mg": "毫克"}}}})